@@ -2,6 +2,8 @@ from sqlalchemy.orm import Session
 from app.services.minecraft import server_service
 from typing import List, Optional, Dict, Any
 from app.services.bitacora_service import BitacoraService
+from app.services.masterbridge_sync_service import sync_service
+from app.services.masterbridge_sync_scheduler import mb_sync_scheduler
 from database.models.server import Server
 
 class ServerController:
@@ -37,9 +39,33 @@ class ServerController:
     def get_server_stats(self, name: str):
         process = server_service.get_process(name)
         if process:
-            return process.get_stats()
+            stats = process.get_stats()
+            mb_sync = mb_sync_scheduler.stats(name)
+            if stats and mb_sync:
+                stats['mb_sync'] = mb_sync
+            from app.services.minecraft.stats_watcher import stats_watcher
+            stats_watch = stats_watcher.stats(name)
+            if stats and stats_watch:
+                stats['stats_watch'] = stats_watch
+            return stats
         return {"status": "OFFLINE", "cpu": 0, "ram": 0, "players": 0}
 
+    def get_server_stats_history(self, name: str, minutes: float = 10, resolution: float = None):
+        if not server_service.get_process(name):
+            return None
+        from app.services.minecraft.metrics_sampler import metrics_sampler
+        return {
+            "interval": metrics_sampler.interval,
+            "samples": metrics_sampler.get_history(name, minutes, resolution)
+        }
+
+    def search_logs(self, name: str, query: str = None, since: float = None, until: float = None,
+                    levels: List[str] = None, cursor: str = None, limit: int = 100):
+        process = server_service.get_process(name)
+        if not process:
+            return None
+        return process.log_index.search(query, since, until, levels, cursor, limit)
+
     def create_server(
         self, 
         db: Session, 
@@ -84,20 +110,18 @@ class ServerController:
         db.commit()
         db.refresh(server)
         
+        # The running process keeps its own copy; the launch plan is re-resolved from it
+        if any(key in data for key in ['ram_mb', 'mod_loader']):
+            process = server_service.get_process(name)
+            if process:
+                process.apply_settings(server.ram_mb, server.mod_loader)
+        
         # Reload MasterBridge client if configuration changed
         if mb_config_changed:
             process = server_service.get_process(name)
             if process:
-                if server.masterbridge_enabled:
-                    from app.services.minecraft.masterbridge_client import MasterBridgeClient
-                    process.masterbridge_client = MasterBridgeClient(
-                        ip=server.masterbridge_ip or '127.0.0.1',
-                        port=server.masterbridge_port or 8081
-                    )
-                    print(f"INFO: MasterBridge client updated for {name}")
-                else:
-                    process.masterbridge_client = None
-                    print(f"INFO: MasterBridge client disabled for {name}")
+                # Sync route: the old client's tasks can only be stopped from the event loop
+                server_service.call_in_loop(process.set_masterbridge, server_service.masterbridge_config(server))
         
         BitacoraService.add_log(db, "ADMIN", "SERVER_UPDATE", f"Updated server {name} with {list(data.keys())}")
         
@@ -105,6 +129,9 @@ class ServerController:
 
     def delete_server(self, db: Session, name: str):
         server_service.delete_server(db, name)
+        mb_sync_scheduler.forget(name)
+        from app.services.minecraft.resource_pack import resource_pack_cache
+        resource_pack_cache.drop(name)
         BitacoraService.add_log(db, "ADMIN", "SERVER_DELETE", f"Deleted server {name}")
         return True
 
@@ -142,19 +169,25 @@ class ServerController:
         BitacoraService.add_log_background("ADMIN", "SERVER_RESTART", f"Triggered restart for {name}")
         return True
 
-    async def send_command(self, name: str, command: str):
+    async def send_command(self, name: str, command: str) -> Optional[str]:
+        """Returns the command's response when it was sent over RCON"""
         process = server_service.get_process(name)
         if process:
-            await process.write(command)
+            response = await process.write(command)
             BitacoraService.add_log_background("ADMIN", "SERVER_COMMAND", f"Sent command to {name}: {command}")
-            return True
-        return False
+            return response
+        return None
     
-    def get_console_queue(self, name: str):
+    def get_console_queue(self, name: str, replay: bool = False):
         process = server_service.get_process(name)
         if process:
-            return process.subscribe_logs()
+            return process.subscribe_logs(replay)
         return None
+
+    def release_console_queue(self, name: str, queue):
+        process = server_service.get_process(name)
+        if process:
+            process.unsubscribe_logs(queue)
     
     async def export_server(self, db: Session, name: str) -> str:
         """Export a server as a ZIP file"""
@@ -165,11 +198,11 @@ class ServerController:
         return await server_service.import_server(db, file)
     
     # --- Player Management ---
-    def get_online_players(self, name: str):
+    async def get_online_players(self, name: str):
         """Get list of online players"""
         process = server_service.get_process(name)
         if process:
-            return process.get_online_players()
+            return await process.get_online_players()
         return []
 
     def get_recent_activity(self, name: str):
@@ -266,32 +299,39 @@ class ServerController:
             return await process.send_chat_message(text)
     
     # --- MasterBridge Data Retrieval ---
-    def get_mb_detailed_players(self, name: str):
-        """Get detailed player data from MasterBridge API"""
-        process = server_service.get_process(name)
-        if process and process.masterbridge_client:
-            return process.masterbridge_client.get_players()
-        return None
+    def get_mb_detailed_players(self, db: Session, server: Server, include_offline: bool = False):
+        """Players synced from MasterBridge (read from the database, see mb_sync_scheduler)"""
+        process = server_service.get_process(server.name)
+        if not process or not process.masterbridge_client:
+            return None
+        online = mb_sync_scheduler.online_uuids(server.name) if process.is_running() else set()
+        if online is None:
+            return None  # First sync hasn't completed yet
+        return sync_service.get_players(db, server.id, online, include_offline)
     
-    def get_mb_chat(self, name: str):
+    async def get_mb_chat(self, name: str):
         """Get chat log from MasterBridge API"""
         process = server_service.get_process(name)
         if process and process.masterbridge_client:
-            return process.masterbridge_client.get_chat()
+            return await process.masterbridge_client.get_chat()
         return None
     
-    def get_mb_achievements(self, name: str):
-        """Get player achievements from MasterBridge API"""
-        process = server_service.get_process(name)
+    def get_mb_achievements(self, db: Session, server: Server):
+        """Recorded player achievements (read from the database)"""
+        process = server_service.get_process(server.name)
         if process and process.masterbridge_client:
-            return process.masterbridge_client.get_achievements()
+            return sync_service.get_achievements(db, server.id)
         return None
+
+    def get_mb_sync_status(self, name: str):
+        """Sync lag and cost metrics of the MasterBridge -> database scheduler"""
+        return mb_sync_scheduler.stats(name)
     
-    def get_mb_full_state(self, name: str):
+    async def get_mb_full_state(self, name: str):
         """Get full server state from MasterBridge API"""
         process = server_service.get_process(name)
         if process and process.masterbridge_client:
-            return process.masterbridge_client.get_full_state()
+            return await process.masterbridge_client.get_full_state()
         return None
 
     # --- MasterBridge Actions ---
@@ -320,39 +360,40 @@ class ServerController:
         return False
 
     # --- Additional MasterBridge Data Methods ---
-    def get_mb_chat_log(self, name: str):
+    async def get_mb_chat_log(self, name: str):
         """Get complete chat log from MasterBridge"""
         process = server_service.get_process(name)
         if process and process.masterbridge_client:
-            return process.masterbridge_client.get_chat_log()
+            return await process.masterbridge_client.get_chat_log()
         return None
 
-    def get_mb_online_players_detailed(self, name: str):
+    async def get_mb_online_players_detailed(self, name: str):
         """Get detailed online players info from MasterBridge"""
         process = server_service.get_process(name)
         if process and process.masterbridge_client:
-            return process.masterbridge_client.get_online_players_detailed()
+            return await process.masterbridge_client.get_online_players_detailed()
         return None
 
-    def get_mb_server_status(self, name: str):
+    async def get_mb_server_status(self, name: str):
         """Get server status from MasterBridge"""
         process = server_service.get_process(name)
         if process and process.masterbridge_client:
-            return process.masterbridge_client.get_server_status()
+            return await process.masterbridge_client.get_server_status()
         return None
 
-    def get_mb_active_events(self, name: str):
+    async def get_mb_active_events(self, name: str):
         """Get active events from MasterBridge"""
         process = server_service.get_process(name)
         if process and process.masterbridge_client:
-            return process.masterbridge_client.get_active_events()
+            return await process.masterbridge_client.get_active_events()
         return None
 
-    def get_mb_resource_pack(self, name: str):
-        """Download resource pack from MasterBridge"""
+    async def get_mb_resource_pack(self, name: str):
+        """Resource pack from MasterBridge, cached on disk (CachedPack or None)"""
         process = server_service.get_process(name)
         if process and process.masterbridge_client:
-            return process.masterbridge_client.download_resource_pack()
+            from app.services.minecraft.resource_pack import resource_pack_cache
+            return await resource_pack_cache.get(name, process.masterbridge_client)
         return None
 
 
@@ -0,0 +1,190 @@
+"""
+MasterBridge -> Database Sync Scheduler
+Pulls each server's online players from its MasterBridge mod on a fixed
+interval, off the request path, and writes them with MasterBridgeSyncService.
+Every player's stored fields are fingerprinted, so a sync only writes players
+that changed since the last one. The GET routes read the database instead of
+calling the mod.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set
+
+from database.connection import SessionLocal
+from database.models.server import Server
+from app.services.masterbridge_sync_service import sync_service, player_fields
+
+# Seconds between syncs of a server
+MB_SYNC_INTERVAL = float(os.getenv("MB_SYNC_INTERVAL", "15"))
+# Per-server overrides, e.g. "survival=5,creative=60"
+MB_SYNC_INTERVALS = os.getenv("MB_SYNC_INTERVALS", "")
+# Every Nth sync writes all players regardless of fingerprints (repairs rows changed elsewhere)
+MB_SYNC_FULL_EVERY = int(os.getenv("MB_SYNC_FULL_EVERY", "20"))
+# How often the scheduler checks which servers are due
+TICK = 1.0
+
+
+def parse_intervals(spec: str) -> Dict[str, float]:
+    intervals = {}
+    for item in spec.split(","):
+        name, _, seconds = item.partition("=")
+        try:
+            intervals[name.strip()] = float(seconds)
+        except ValueError:
+            continue
+    return intervals
+
+
+def fingerprint(player_data: Dict) -> str:
+    return hashlib.sha1(json.dumps(player_fields(player_data), sort_keys=True).encode()).hexdigest()
+
+
+class SyncState:
+    """Per-server schedule, fingerprints and metrics"""
+
+    def __init__(self):
+        self.next_run = 0.0
+        self.cycles = 0
+        self.hashes: Dict[str, str] = {}  # uuid -> fingerprint of the last written fields
+        self.online: Optional[Set[str]] = None  # uuids in the last successful fetch
+        self.last_sync_at: Optional[float] = None
+        self.last_duration_ms = 0.0
+        self.last_db_ms = 0.0
+        self.runs = 0
+        self.unchanged_runs = 0
+        self.rows_written = 0
+        self.rows_skipped = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def stats(self, interval: float) -> Dict:
+        return {
+            "interval": interval,
+            "lag_seconds": round(time.time() - self.last_sync_at, 1) if self.last_sync_at else None,
+            "last_sync_at": self.last_sync_at,
+            "last_duration_ms": round(self.last_duration_ms, 2),
+            "last_db_ms": round(self.last_db_ms, 2),
+            "runs": self.runs,
+            "unchanged_runs": self.unchanged_runs,
+            "rows_written": self.rows_written,
+            "rows_skipped": self.rows_skipped,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+class MasterBridgeSyncScheduler:
+    def __init__(self, interval: float = MB_SYNC_INTERVAL):
+        self.interval = interval
+        self.intervals = parse_intervals(MB_SYNC_INTERVALS)
+        self._states: Dict[str, SyncState] = {}
+        self._server_ids: Dict[str, int] = {}
+        self._processes = None
+        self._task = None
+
+    def start(self, processes: Dict):
+        """Start scheduling. `processes` is the live name -> MinecraftProcess registry."""
+        self._processes = processes
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def interval_for(self, name: str) -> float:
+        return self.intervals.get(name, self.interval)
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            due = [
+                name for name, process in list(self._processes.items())
+                if process.masterbridge_client and process.is_running()
+                and now >= self._state(name).next_run
+            ]
+            if due:
+                results = await asyncio.gather(*(self.sync_server(name) for name in due), return_exceptions=True)
+                for name, result in zip(due, results):
+                    if isinstance(result, Exception):
+                        print(f"ERROR: MasterBridge sync of {name} failed: {result}")
+            await asyncio.sleep(TICK)
+
+    def _state(self, name: str) -> SyncState:
+        state = self._states.get(name)
+        if state is None:
+            state = self._states[name] = SyncState()
+        return state
+
+    async def sync_server(self, name: str):
+        process = self._processes.get(name)
+        state = self._state(name)
+        state.next_run = time.monotonic() + self.interval_for(name)
+        started = time.perf_counter()
+        try:
+            data = await process.masterbridge_client.get_online_players_detailed()
+            if data is None:
+                raise RuntimeError("MasterBridge unavailable")
+
+            players = {p['uuid']: p for p in data if p.get('uuid') and p.get('name')}
+            hashes = {uuid: fingerprint(p) for uuid, p in players.items()}
+            full = state.cycles % MB_SYNC_FULL_EVERY == 0
+            changed = [players[uuid] for uuid, h in hashes.items() if full or state.hashes.get(uuid) != h]
+
+            state.last_db_ms = 0.0
+            if changed:
+                db_started = time.perf_counter()
+                counts = await asyncio.get_event_loop().run_in_executor(None, self._write, name, changed)
+                state.last_db_ms = (time.perf_counter() - db_started) * 1000
+                state.rows_written += counts["inserted"] + counts["updated"]
+                state.rows_skipped += counts["unchanged"]
+            else:
+                state.unchanged_runs += 1
+            state.rows_skipped += len(players) - len(changed)
+
+            # Only after the write succeeded, so a failed batch is retried next time
+            state.hashes.update(hashes)
+            state.online = set(players)
+            state.cycles += 1
+            state.runs += 1
+            state.last_sync_at = time.time()
+            state.last_error = None
+        except Exception as e:
+            state.errors += 1
+            state.last_error = str(e)
+            if not isinstance(e, RuntimeError):
+                raise
+        finally:
+            state.last_duration_ms = (time.perf_counter() - started) * 1000
+
+    def _write(self, name: str, players: List[Dict]) -> Dict[str, int]:
+        db = SessionLocal()
+        try:
+            server_id = self._server_ids.get(name)
+            if server_id is None:
+                server = db.query(Server.id).filter(Server.name == name).first()
+                if not server:
+                    raise RuntimeError(f"Server {name} not in database")
+                server_id = self._server_ids[name] = server.id
+            return sync_service.sync_players(db, server_id, players)
+        finally:
+            db.close()
+
+    def online_uuids(self, name: str) -> Optional[Set[str]]:
+        """Players online at the last successful sync; None if the server hasn't synced yet"""
+        state = self._states.get(name)
+        return state.online if state else None
+
+    def stats(self, name: str) -> Optional[Dict]:
+        state = self._states.get(name)
+        return state.stats(self.interval_for(name)) if state else None
+
+    def forget(self, name: str):
+        self._states.pop(name, None)
+        self._server_ids.pop(name, None)
+
+
+mb_sync_scheduler = MasterBridgeSyncScheduler() # Singleton
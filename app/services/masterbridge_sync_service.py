@@ -1,131 +1,177 @@
 """
 Service to sync MasterBridge data with database
 """
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
 from database.models.players.player import Player
 from database.models.players.player_detail import PlayerDetail
 from database.models.players.player_achievement import PlayerAchievement
-from database.models.server import Server
+from database.upsert import upsert
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 import logging
 
 logger = logging.getLogger(__name__)
 
+# PlayerDetail columns filled from /api/online-players
+DETAIL_COLUMNS = ("health", "xp_level", "position_x", "position_y", "position_z")
+DETAIL_DEFAULTS = {c: PlayerDetail.__table__.c[c].default.arg for c in DETAIL_COLUMNS}
+
+
+def _parse_position(pos) -> Optional[tuple]:
+    """`pos` is {"x", "y", "z"} (current mod) or "x, y, z" (older builds)"""
+    try:
+        if isinstance(pos, dict):
+            return tuple(int(float(pos[axis])) for axis in ("x", "y", "z"))
+        if isinstance(pos, str):
+            x, y, z = (int(float(v)) for v in pos.split(","))
+            return x, y, z
+    except (KeyError, TypeError, ValueError):
+        pass
+    return None
+
+
+def _detail_values(player_data: Dict) -> Dict:
+    values = {}
+    if player_data.get("health") is not None:
+        values["health"] = int(round(float(player_data["health"])))
+    level = player_data.get("level", player_data.get("xp_level"))
+    if level is not None:
+        values["xp_level"] = int(level)
+    position = _parse_position(player_data.get("pos"))
+    if position:
+        values["position_x"], values["position_y"], values["position_z"] = position
+    return values
+
+
+def player_fields(player_data: Dict) -> Dict:
+    """The part of a MasterBridge player entry that is stored in the database"""
+    return {"name": player_data.get("name"), "uuid": player_data.get("uuid"), **_detail_values(player_data)}
+
+
 class MasterBridgeSyncService:
     """Service to synchronize MasterBridge API data with database"""
-    
+
     @staticmethod
-    def sync_players(db: Session, server_id: int, mb_players: List[Dict]) -> None:
+    def sync_players(db: Session, server_id: int, mb_players: List[Dict]) -> Dict[str, int]:
         """
         Sync player data from MasterBridge to database
-        
+
+        Existing rows for the server are loaded in one query and diffed in
+        memory; new and changed players are written with one upsert per table,
+        all in a single transaction.
+
         Args:
             db: Database session
             server_id: ID of the server
             mb_players: List of player dictionaries from MasterBridge API
+
+        Returns:
+            Counts of inserted, updated and unchanged players
         """
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
         if not mb_players:
-            return
-            
+            return counts
+
+        # Last entry wins if the mod reports a player twice
+        incoming = {}
         for player_data in mb_players:
-            try:
-                username = player_data.get('name')
-                uuid = player_data.get('uuid')
-                
-                if not username or not uuid:
-                    continue
-                
-                # Find or create player for this server
-                player = db.query(Player).filter(
-                    Player.uuid == uuid,
-                    Player.server_id == server_id
-                ).first()
-                
-                if not player:
-                    player = Player(
-                        uuid=uuid,
-                        server_id=server_id,
-                        name=username,
-                        created_at=datetime.utcnow(),
-                        updated_at=datetime.utcnow()
-                    )
-                    db.add(player)
-                    db.flush()  # Get the ID
-                else:
-                    # Update username and timestamp
-                    player.name = username
-                    player.updated_at = datetime.utcnow()
-                    db.flush()
-                
-                # Update or create player details
-                if not player.detail:
-                    detail = PlayerDetail(
-                        player_uuid=player.uuid,
-                        player_server_id=player.server_id
-                    )
-                    db.add(detail)
+            if player_data.get('name') and player_data.get('uuid'):
+                incoming[player_data['uuid']] = player_data
+
+        try:
+            existing = {
+                row.uuid: row for row in db.query(
+                    Player.uuid, Player.name,
+                    *(getattr(PlayerDetail, c) for c in DETAIL_COLUMNS),
+                    PlayerDetail.player_uuid.label("detail_uuid")
+                ).outerjoin(PlayerDetail, and_(
+                    PlayerDetail.player_uuid == Player.uuid,
+                    PlayerDetail.server_id == Player.server_id
+                )).filter(Player.server_id == server_id)
+            }
+
+            now = datetime.utcnow()
+            player_rows, detail_rows = [], []
+            for uuid, player_data in incoming.items():
+                name = player_data['name']
+                detail = _detail_values(player_data)
+                current = existing.get(uuid)
+                has_detail = current is not None and current.detail_uuid is not None
+
+                player_changed = current is None or current.name != name
+                detail_changed = not has_detail or any(getattr(current, c) != v for c, v in detail.items())
+                if current is None:
+                    counts["inserted"] += 1
+                elif player_changed or detail_changed:
+                    counts["updated"] += 1
                 else:
-                    detail = player.detail
-                
-                # Update from MasterBridge data
-                detail.last_dimension = player_data.get('dimension', 'minecraft:overworld')
-                detail.last_position = player_data.get('pos', '0, 0, 0')
-                # Note: PlayerDetail might not have level field, check schema
-                
-                db.commit()
-                
-            except Exception as e:
-                logger.error(f"Error syncing player {player_data.get('name')}: {e}")
-                db.rollback()
-    
+                    counts["unchanged"] += 1
+
+                if player_changed:
+                    player_rows.append({"uuid": uuid, "server_id": server_id, "name": name,
+                                        "created_at": now, "updated_at": now})
+                if detail_changed:
+                    # Fields the mod didn't send keep their stored (or default) value
+                    base = {c: getattr(current, c) for c in DETAIL_COLUMNS} if has_detail else DETAIL_DEFAULTS
+                    detail_rows.append({"player_uuid": uuid, "server_id": server_id, **base, **detail})
+
+            # created_at isn't in the update set, so existing players keep theirs
+            upsert(db, Player, player_rows, ("uuid", "server_id"), ("name", "updated_at"))
+            upsert(db, PlayerDetail, detail_rows, ("player_uuid", "server_id"), DETAIL_COLUMNS)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error syncing players for server {server_id}: {e}")
+            db.rollback()
+            raise
+
+        return counts
+
     @staticmethod
-    def sync_achievements(db: Session, server_id: int, mb_achievements: Dict[str, List[str]]) -> None:
+    def get_players(db: Session, server_id: int, online_uuids: Set[str], include_offline: bool = False) -> List[Dict]:
         """
-        Sync achievements from MasterBridge to database
-        
-        Args:
-            db: Database session
-            server_id: ID of the server
-            mb_achievements: Dict mapping player names to achievement lists
+        Players of a server in the MasterBridge /api/online-players shape, plus
+        `online`, `playtime` and `updated_at`. Only the players online at the last
+        sync unless `include_offline` is set.
         """
-        if not mb_achievements:
-            return
-        
-        for username, achievement_list in mb_achievements.items():
-            try:
-                # Find player by username and server
-                player = db.query(Player).filter(
-                    Player.name == username,
-                    Player.server_id == server_id
-                ).first()
-                
-                if not player:
-                    continue
-                
-                # Sync achievements
-                for achievement_name in achievement_list:
-                    # Check if achievement already recorded
-                    existing = db.query(PlayerAchievement).filter(
-                        PlayerAchievement.player_uuid == player.uuid,
-                        PlayerAchievement.player_server_id == player.server_id,
-                        PlayerAchievement.achievement_name == achievement_name
-                    ).first()
-                    
-                    if not existing:
-                        new_achievement = PlayerAchievement(
-                            player_uuid=player.uuid,
-                            player_server_id=player.server_id,
-                            achievement_name=achievement_name,
-                            unlocked_at=datetime.utcnow()
-                        )
-                        db.add(new_achievement)
-                
-                db.commit()
-                
-            except Exception as e:
-                logger.error(f"Error syncing achievements for {username}: {e}")
-                db.rollback()
+        if not include_offline and not online_uuids:
+            return []
+        rows = db.query(Player, PlayerDetail).outerjoin(PlayerDetail, and_(
+            PlayerDetail.player_uuid == Player.uuid,
+            PlayerDetail.server_id == Player.server_id
+        )).filter(Player.server_id == server_id)
+        if not include_offline:
+            rows = rows.filter(Player.uuid.in_(list(online_uuids)))
+        rows = rows.order_by(Player.name)
 
-sync_service = MasterBridgeSyncService()
+        players = []
+        for player, detail in rows:
+            entry = {
+                "name": player.name,
+                "uuid": player.uuid,
+                "online": player.uuid in online_uuids,
+                "updated_at": player.updated_at,
+            }
+            if detail:
+                entry.update({
+                    "health": detail.health,
+                    "level": detail.xp_level,
+                    "pos": {"x": detail.position_x, "y": detail.position_y, "z": detail.position_z},
+                    "playtime": detail.total_playtime_seconds or 0,
+                })
+            players.append(entry)
+        return players
 
+    @staticmethod
+    def get_achievements(db: Session, server_id: int) -> Dict[str, List[str]]:
+        """Player name -> recorded achievement ids (recorded from advancement files by PlayerStatsSyncer)"""
+        achievements: Dict[str, List[str]] = {}
+        rows = db.query(Player.name, PlayerAchievement.achievement_id).join(PlayerAchievement, and_(
+            PlayerAchievement.player_uuid == Player.uuid,
+            PlayerAchievement.server_id == Player.server_id
+        )).filter(Player.server_id == server_id).order_by(PlayerAchievement.unlocked_at)
+        for name, achievement_id in rows:
+            achievements.setdefault(name, []).append(achievement_id)
+        return achievements
+
+sync_service = MasterBridgeSyncService()
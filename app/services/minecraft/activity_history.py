@@ -0,0 +1,149 @@
+"""
+Activity History Index
+Builds logs/user_connections.log from archived logs/*.log.gz. Each archive is
+parsed exactly once: its events are written to a cache file keyed by archive
+name, size and mtime. Uncached archives are parsed in a shared process pool
+(spawned, not forked: the manager process has threads, an event loop and
+open sockets) and every stage streams to disk instead of holding events in
+memory.
+"""
+import glob
+import gzip
+import multiprocessing
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+# Newest archives included in the history file
+HISTORY_ARCHIVES = int(os.getenv("HISTORY_ARCHIVES", "10"))
+CACHE_DIR_NAME = ".activity_cache"
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max(1, min(4, os.cpu_count() or 1)),
+                                    mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def format_event(event: dict) -> str:
+    return f"{event.get('timestamp')} | {event.get('type')} | {event.get('user')} | {event.get('reason')}\n"
+
+
+def archive_date(path: str) -> str:
+    """Date of an archive from its name (2024-01-31-1.log.gz), else from its mtime"""
+    date_part = os.path.basename(path).split('.')[0].rsplit('-', 1)[0]
+    if not re.match(r'\d{4}-\d{2}-\d{2}', date_part):
+        date_part = datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d')
+    return date_part
+
+
+def iter_event_lines(lines: Iterable[str], date_part: str, mod_loader: str = "VANILLA") -> Iterator[str]:
+    """Formatted history lines for every player event in `lines`"""
+    from app.services.minecraft.player_manager import PlayerManager
+
+    player_manager = PlayerManager(mod_loader)
+    for line in lines:
+        event = player_manager.parse_log_line(line, update_state=False)
+        if not event:
+            continue
+        if event.get('timestamp'):
+            event['timestamp'] = f"{date_part}T{event['timestamp']}"
+        yield format_event(event)
+
+
+def parse_archive(gz_path: str, cache_path: str, mod_loader: str = "VANILLA") -> int:
+    """Parse one archive into its cache file. Runs in a worker process."""
+    count = 0
+    tmp_path = cache_path + ".tmp"
+    with gzip.open(gz_path, 'rt', encoding='utf-8', errors='replace') as src, \
+            open(tmp_path, 'w', encoding='utf-8') as out:
+        for event_line in iter_event_lines(src, archive_date(gz_path), mod_loader):
+            out.write(event_line)
+            count += 1
+    os.replace(tmp_path, cache_path)
+    return count
+
+
+def _cache_name(gz_path: str) -> str:
+    st = os.stat(gz_path)
+    return f"{os.path.basename(gz_path)}.{st.st_size}.{st.st_mtime_ns}.events"
+
+
+def build_history_file(working_dir: str, target_file: str, mod_loader: str = "VANILLA"):
+    log_dir = os.path.join(working_dir, "logs")
+    if not os.path.exists(log_dir):
+        return
+
+    cache_dir = os.path.join(log_dir, CACHE_DIR_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(target_file), exist_ok=True)
+
+    gz_files = glob.glob(os.path.join(log_dir, "*.log.gz"))
+    gz_files.sort(key=os.path.getmtime, reverse=True)
+    # Oldest first so the history file is chronological
+    archives = [(gz, os.path.join(cache_dir, _cache_name(gz))) for gz in reversed(gz_files[:HISTORY_ARCHIVES])]
+
+    missing = [(gz, cache) for gz, cache in archives if not os.path.exists(cache)]
+    if len(missing) > 1:
+        global _pool
+        try:
+            pool = _get_pool()
+            futures = [(gz, cache, pool.submit(parse_archive, gz, cache, mod_loader)) for gz, cache in missing]
+            failed = []
+            for gz, cache, future in futures:
+                try:
+                    future.result()
+                except BrokenProcessPool as e:
+                    # A worker died (or couldn't start); retry inline, new pool next time
+                    print(f"WARN: Process pool failed on archive {gz}, parsing inline: {e}")
+                    _pool = None
+                    failed.append((gz, cache))
+                except Exception as e:
+                    print(f"WARN: Failed to process archive {gz}: {e}")
+            missing = failed
+        except Exception as e:
+            print(f"WARN: Process pool unavailable, parsing archives inline: {e}")
+    for gz, cache in missing:
+        if os.path.exists(cache):
+            continue
+        try:
+            parse_archive(gz, cache, mod_loader)
+        except Exception as e:
+            print(f"WARN: Failed to process archive {gz}: {e}")
+
+    # Drop cache entries of archives that were deleted, rewritten or fell out of the window
+    wanted = {os.path.basename(cache) for _, cache in archives}
+    for name in os.listdir(cache_dir):
+        if name not in wanted:
+            try: os.remove(os.path.join(cache_dir, name))
+            except OSError: pass
+
+    tmp_target = target_file + ".tmp"
+    try:
+        with open(tmp_target, "w", encoding="utf-8") as out:
+            for _, cache in archives:
+                if not os.path.exists(cache):
+                    continue
+                with open(cache, "r", encoding="utf-8") as f:
+                    shutil.copyfileobj(f, out)
+
+            # latest.log is still being written to, so it is never cached
+            latest_log = os.path.join(log_dir, "latest.log")
+            if os.path.exists(latest_log):
+                try:
+                    date_part = datetime.fromtimestamp(os.path.getmtime(latest_log)).strftime('%Y-%m-%d')
+                    with open(latest_log, 'r', encoding='utf-8', errors='replace') as f:
+                        out.writelines(iter_event_lines(f, date_part, mod_loader))
+                except Exception as e:
+                    print(f"WARN: Failed to process latest.log for history: {e}")
+        os.replace(tmp_target, target_file)
+    except Exception as e:
+        print(f"ERROR: Could not write history file: {e}")
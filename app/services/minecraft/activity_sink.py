@@ -0,0 +1,108 @@
+"""
+Buffered Activity Log Writer
+Collects join/leave/kick/ban lines for logs/user_connections.log in memory and
+appends them in batches from a background task, off the log reader's path.
+The file is compressed and rotated once it grows past a size cap.
+"""
+import asyncio
+import gzip
+import os
+import shutil
+from datetime import datetime
+from typing import List
+
+# Flush when this many lines are pending...
+ACTIVITY_FLUSH_LINES = int(os.getenv("ACTIVITY_FLUSH_LINES", "50"))
+# ...or after this many seconds, whichever comes first
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "2"))
+# Rotate user_connections.log into a .gz once it exceeds this size
+ACTIVITY_LOG_MAX_BYTES = int(os.getenv("ACTIVITY_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+
+
+class ActivitySink:
+    def __init__(
+        self,
+        path: str,
+        flush_lines: int = ACTIVITY_FLUSH_LINES,
+        flush_interval: float = ACTIVITY_FLUSH_INTERVAL,
+        max_bytes: int = ACTIVITY_LOG_MAX_BYTES
+    ):
+        self.path = path
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self._pending: List[str] = []
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def write(self, line: str):
+        self._pending.append(line)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts/CLI): write through
+            self.flush_sync()
+            return
+
+        if len(self._pending) >= self.flush_lines:
+            self._wake.set()
+        if self._task is None:
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while self._pending:
+                if len(self._pending) < self.flush_lines:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                self._wake.clear()
+                await self.flush()
+        finally:
+            self._task = None
+
+    async def flush(self):
+        lines, self._pending = self._pending, []
+        if lines:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_lines, lines)
+
+    def flush_sync(self):
+        lines, self._pending = self._pending, []
+        if lines:
+            self._write_lines(lines)
+
+    def _write_lines(self, lines: List[str]):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+        except Exception as e:
+            print(f"WARN: Failed to write to activity log: {e}")
+
+    def _rotate(self):
+        # Named *.log.<stamp>.gz so the server-archive glob (*.log.gz) never picks it up
+        stamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+        archive = f"{self.path}.{stamp}.gz"
+        with open(self.path, "rb") as src, gzip.open(archive, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(self.path)
+        print(f"INFO: Rotated activity log to {os.path.basename(archive)}")
+
+
+def read_tail_lines(path: str, count: int, block_size: int = 8192) -> List[str]:
+    """Last `count` lines of a text file, reading backwards from the end"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        # count + 1 newlines guarantee `count` complete lines
+        while pos > 0 and data.count(b"\n") <= count:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    return lines[-count:]
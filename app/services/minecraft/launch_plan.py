@@ -0,0 +1,154 @@
+"""
+Cached Launch Plan
+Resolving how to start a modern Forge server means rewriting user_jvm_args.txt
+and walking the whole libraries/ tree for unix_args.txt/win_args.txt. The
+result is persisted per server in .launch_plan.json and reused until the
+libraries directory, the JVM args file or the server record changes.
+"""
+import json
+import os
+from typing import Dict, List, Optional
+
+PLAN_FILE = ".launch_plan.json"
+# Bumped when the plan layout changes so old files are re-resolved
+PLAN_VERSION = 1
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class LaunchPlanner:
+    def __init__(self, working_dir: str):
+        self.working_dir = working_dir
+        self.plan_path = os.path.join(working_dir, PLAN_FILE)
+        self.args_file = os.path.join(working_dir, "user_jvm_args.txt")
+        self.libraries_dir = os.path.join(working_dir, "libraries")
+        self._plan: Optional[Dict] = None
+
+    def _fingerprint(self, ram_mb: int, jar_path: str, mod_loader: str) -> Dict:
+        return {
+            "version": PLAN_VERSION,
+            "ram_mb": ram_mb,
+            "jar_path": jar_path,
+            "mod_loader": mod_loader,
+            "run_script": os.path.exists(os.path.join(self.working_dir, "run.bat"))
+                          or os.path.exists(os.path.join(self.working_dir, "run.sh")),
+            # Installing/updating Forge adds a version directory under net/minecraftforge/forge
+            "libraries": _mtime(self.libraries_dir),
+            "forge_libraries": _mtime(os.path.join(self.libraries_dir, "net", "minecraftforge", "forge")),
+            "jvm_args": _mtime(self.args_file),
+        }
+
+    def resolve(self, ram_mb: int, jar_path: str, mod_loader: str = "VANILLA") -> List[str]:
+        """The java command line, from cache when nothing it depends on changed"""
+        fingerprint = self._fingerprint(ram_mb, jar_path, mod_loader)
+        plan = self._load()
+        if plan and plan.get("fingerprint") == fingerprint and self._still_valid(plan):
+            return list(plan["cmd"])
+
+        plan = self._build(ram_mb, jar_path)
+        # Re-read: _build may have just rewritten user_jvm_args.txt
+        plan["fingerprint"] = self._fingerprint(ram_mb, jar_path, mod_loader)
+        self._save(plan)
+        return list(plan["cmd"])
+
+    def invalidate(self):
+        self._plan = None
+        try:
+            os.remove(self.plan_path)
+        except OSError:
+            pass
+
+    def _still_valid(self, plan: Dict) -> bool:
+        args_path = plan.get("args_path")
+        return not args_path or os.path.exists(os.path.join(self.working_dir, args_path))
+
+    def _load(self) -> Optional[Dict]:
+        if self._plan is None:
+            try:
+                with open(self.plan_path, "r") as f:
+                    self._plan = json.load(f)
+            except (OSError, ValueError):
+                return None
+        return self._plan
+
+    def _save(self, plan: Dict):
+        self._plan = plan
+        try:
+            tmp_path = self.plan_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(plan, f, indent=2)
+            os.replace(tmp_path, self.plan_path)
+        except Exception as e:
+            print(f"WARN: Failed to persist launch plan: {e}")
+
+    def _build(self, ram_mb: int, jar_path: str) -> Dict:
+        has_run_script = os.path.exists(os.path.join(self.working_dir, "run.bat")) or \
+                         os.path.exists(os.path.join(self.working_dir, "run.sh"))
+
+        if os.path.exists(self.args_file) and has_run_script:
+            jvm_opts = self._write_jvm_args(ram_mb)
+            args_path = self._find_forge_args()
+            if args_path:
+                return {
+                    "type": "FORGE_ARGS",
+                    "cmd": [
+                        "java",
+                        # Memory args are in user_jvm_args.txt now, so we don't repeat them here
+                        f"@{os.path.basename(self.args_file)}",
+                        f"@{args_path}",
+                        "nogui"
+                    ],
+                    "args_path": args_path,
+                    "jvm_opts": jvm_opts,
+                }
+            print("DEBUG: Modern Forge detected but args file not found. Trying standard JAR start as fallback.")
+
+        jvm_opts = [f"-Xmx{ram_mb}M", f"-Xms{ram_mb}M"]  # Same as Xmx for optimal performance
+        return {
+            "type": "JAR",
+            "cmd": ["java", *jvm_opts, "-jar", jar_path, "nogui"],
+            "args_path": None,
+            "jvm_opts": jvm_opts,
+        }
+
+    def _write_jvm_args(self, ram_mb: int) -> List[str]:
+        """Set -Xmx/-Xms in user_jvm_args.txt, touching the file only if they differ"""
+        lines = []
+        try:
+            with open(self.args_file, "r") as f:
+                lines = f.readlines()
+        except: pass
+
+        memory_args = [f"-Xmx{ram_mb}M", f"-Xms{ram_mb}M"]
+        current = [l.strip() for l in lines if l.strip().startswith(("-Xmx", "-Xms"))]
+        if current != memory_args:
+            # Filter out old memory args
+            new_lines = [l for l in lines if not l.strip().startswith("-Xmx") and not l.strip().startswith("-Xms")]
+            # Append new memory args (same for Xms and Xmx = best practice for Minecraft)
+            new_lines.append(f"\n{memory_args[0]}\n")
+            new_lines.append(f"{memory_args[1]}\n")
+            with open(self.args_file, "w") as f:
+                f.writelines(new_lines)
+            lines = new_lines
+
+        return [l.strip() for l in lines if l.strip() and not l.strip().startswith("#")]
+
+    def _find_forge_args(self) -> Optional[str]:
+        """unix_args.txt/win_args.txt below libraries/, relative to the working dir"""
+        if not os.path.exists(self.libraries_dir):
+            return None
+        # Look where the Forge installer puts it before falling back to the full walk
+        forge_dir = os.path.join(self.libraries_dir, "net", "minecraftforge")
+        for search_root in (forge_dir, self.libraries_dir):
+            if not os.path.exists(search_root):
+                continue
+            for root, dirs, files in os.walk(search_root):
+                for file in files:
+                    if (file == "win_args.txt" or file == "unix_args.txt") and "minecraftforge" in root:
+                        return os.path.relpath(os.path.join(root, file), self.working_dir)
+        return None
@@ -0,0 +1,60 @@
+"""
+Process Liveness Watcher
+Processes spawned by the manager report their exit through the asyncio child
+watcher (process.wait()). Recovered orphans are not our children, so a single
+shared poller checks all of them at a fixed cadence.
+"""
+import asyncio
+import os
+import psutil
+from typing import Callable, Dict, Tuple
+
+# Seconds between liveness checks of recovered (orphan) processes
+ORPHAN_POLL_INTERVAL = float(os.getenv("ORPHAN_POLL_INTERVAL", "2"))
+
+
+class ProcessWatcher:
+    """One background task that watches every recovered server process"""
+
+    def __init__(self, interval: float = ORPHAN_POLL_INTERVAL):
+        self.interval = interval
+        self._watched: Dict[int, Tuple[psutil.Process, Callable[[], None]]] = {}
+        self._task = None
+
+    def watch(self, pid: int, on_exit: Callable[[], None]) -> bool:
+        """Call on_exit once when pid exits. Returns False if it is already gone."""
+        try:
+            proc = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            return False
+
+        self._watched[pid] = (proc, on_exit)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._poll())
+        return True
+
+    def unwatch(self, pid: int):
+        self._watched.pop(pid, None)
+
+    @staticmethod
+    def _is_alive(proc: psutil.Process) -> bool:
+        # is_running() also compares create_time, so a recycled PID counts as dead
+        try:
+            return proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
+            return False
+
+    async def _poll(self):
+        while self._watched:
+            await asyncio.sleep(self.interval)
+            for pid, (proc, on_exit) in list(self._watched.items()):
+                if self._is_alive(proc):
+                    continue
+                self._watched.pop(pid, None)
+                try:
+                    on_exit()
+                except Exception as e:
+                    print(f"ERROR: Exit callback for PID {pid} failed: {e}")
+
+
+process_watcher = ProcessWatcher() # Singleton
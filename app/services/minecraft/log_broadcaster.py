@@ -0,0 +1,124 @@
+"""
+Console log fan-out
+Bounded per-subscriber buffers so a slow or dead console viewer can never
+stall the log reader or grow memory without limit. The last lines are also
+kept in a shared ring so new viewers can be replayed the recent console.
+"""
+import asyncio
+import os
+from collections import deque
+from typing import List, Set
+
+# Lines kept per subscriber before the oldest ones are dropped
+DEFAULT_BUFFER_LINES = int(os.getenv("CONSOLE_BUFFER_LINES", "1000"))
+# Lines replayed to a viewer when it connects
+DEFAULT_REPLAY_LINES = int(os.getenv("CONSOLE_REPLAY_LINES", "500"))
+
+
+class SubscriptionClosed(Exception):
+    """Raised by LogSubscription.get() once the subscription was closed"""
+
+
+class LogSubscription:
+    """Ring buffer of console lines for a single viewer (drop-oldest policy)"""
+
+    def __init__(self, maxlen: int = DEFAULT_BUFFER_LINES):
+        self._buffer = deque(maxlen=maxlen)
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.dropped = 0  # Lines lost since the last take_dropped()
+        self.total_dropped = 0
+
+    def push(self, line: str):
+        if self.closed:
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+            self.total_dropped += 1
+        self._buffer.append(line)
+        self._ready.set()
+
+    async def get(self) -> str:
+        """Wait for the next line"""
+        while not self._buffer:
+            if self.closed:
+                raise SubscriptionClosed()
+            self._ready.clear()
+            await self._ready.wait()
+        return self._buffer.popleft()
+
+    async def get_batch(self, max_lines: int, max_delay: float) -> List[str]:
+        """
+        Wait for at least one line, then give more lines `max_delay` seconds to
+        arrive unless `max_lines` are already buffered. Returns up to `max_lines`.
+        """
+        while not self._buffer:
+            if self.closed:
+                raise SubscriptionClosed()
+            self._ready.clear()
+            await self._ready.wait()
+        if len(self._buffer) < max_lines and max_delay > 0 and not self.closed:
+            await asyncio.sleep(max_delay)
+        count = min(max_lines, len(self._buffer))
+        return [self._buffer.popleft() for _ in range(count)]
+
+    def drain(self) -> List[str]:
+        """Pop every buffered line without waiting"""
+        lines = list(self._buffer)
+        self._buffer.clear()
+        return lines
+
+    def take_dropped(self) -> int:
+        """Return the number of lines dropped since the last call and reset it"""
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    def __len__(self):
+        return len(self._buffer)
+
+
+class LogBroadcaster:
+    """Publishes console lines to every subscriber without ever awaiting a consumer"""
+
+    def __init__(self, buffer_lines: int = DEFAULT_BUFFER_LINES, replay_lines: int = DEFAULT_REPLAY_LINES):
+        self.buffer_lines = buffer_lines
+        self._subscribers: Set[LogSubscription] = set()
+        self._history = deque(maxlen=replay_lines)
+
+    def subscribe(self, replay: bool = False) -> LogSubscription:
+        """New subscriber; with `replay` its buffer starts with the recent history"""
+        sub = LogSubscription(self.buffer_lines)
+        if replay:
+            for line in list(self._history)[-self.buffer_lines:]:
+                sub.push(line)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: LogSubscription):
+        self._subscribers.discard(sub)
+        sub.close()
+
+    def publish(self, line: str):
+        self._history.append(line)
+        for sub in self._subscribers:
+            sub.push(line)
+
+    def close_all(self):
+        for sub in list(self._subscribers):
+            self.unsubscribe(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def get_stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "buffered_lines": sum(len(s) for s in self._subscribers),
+            "dropped_lines": sum(s.total_dropped for s in self._subscribers),
+            "history_lines": len(self._history),
+        }
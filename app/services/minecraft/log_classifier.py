@@ -0,0 +1,129 @@
+"""
+Console Log Classifier
+Single-pass detection of player events (join, leave, kick, ban...) in server
+console lines. Lines are rejected by one literal prefilter first, survivors are
+matched against a single alternation regex with named groups.
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Timestamp formats:
+#   Vanilla/Fabric "[12:34:56] [Server thread/INFO]: ..."
+#   Paper          "[12:34:56 INFO]: ..."
+#   Forge          "[12Jan2024 12:34:56.789] [Server thread/INFO] [minecraft/DedicatedServer]: ..."
+DEFAULT_TIMESTAMP = r'^\[(?:\d{2}[A-Za-z]{3}\d{4} )?(\d{2}:\d{2}:\d{2})'
+
+# (kind, regex template, prefilter literal)
+# "{p}" is replaced with the format's separator before the player name.
+# Order matters: at a given position the first alternative wins.
+BASE_PATTERNS: List[Tuple[str, str, str]] = [
+    ("uuid", r'UUID of player (?P<uuid_user>\S+) is (?P<uuid_uuid>[a-f0-9-]+)', "UUID of player"),
+    ("login", r'{p}(?P<login_user>\S+)\[/(?P<login_ip>[0-9.]+):\d+\]\slogged\sin', "logged in"),
+    ("join", r'{p}(?P<join_user>\S+)\sjoined\sthe\sgame', "joined the game"),
+    ("lost", r'{p}(?P<lost_user>\S+)\slost\sconnection:\s(?P<lost_reason>.*)', "lost connection"),
+    ("left", r'{p}(?P<left_user>\S+)\sleft\sthe\sgame', "left the game"),
+    ("kick", r'Kicked (?P<kick_user>[a-zA-Z0-9_]+): (?P<kick_reason>.*)', "Kicked "),
+    ("ban-ip", r'Banned IP (?P<ban_ip_user>[0-9.]+): (?P<ban_ip_reason>.*)', "Banned "),
+    ("ban", r'Banned (?!IP )(?P<ban_user>[a-zA-Z0-9_]+): (?P<ban_reason>.*)', "Banned "),
+    ("unban-ip", r'Unbanned IP (?P<unban_ip_user>[0-9.]+)', "Unbanned "),
+    ("unban", r'Unbanned (?!IP )(?P<unban_user>[a-zA-Z0-9_]+)', "Unbanned "),
+]
+
+
+class LogMatch(NamedTuple):
+    kind: str
+    fields: Dict[str, str]  # Group values without the kind prefix: user, ip, reason, uuid
+    timestamp: Optional[str]
+
+
+class LogFormat:
+    """Line format of a server flavour plus the patterns classified on it"""
+
+    def __init__(
+        self,
+        name: str,
+        timestamp: str = DEFAULT_TIMESTAMP,
+        name_prefix: str = r':\s',
+        patterns: List[Tuple[str, str, str]] = None
+    ):
+        self.name = name
+        self.timestamp = timestamp
+        self.name_prefix = name_prefix
+        self.patterns = list(patterns if patterns is not None else BASE_PATTERNS)
+
+    def add_pattern(self, kind: str, regex: str, literal: str):
+        """
+        Register an extra pattern. Group names must be prefixed with the
+        kind (dashes as underscores), e.g. kind "death" -> (?P<death_user>...)
+        """
+        self.patterns.append((kind, regex, literal))
+
+
+LOG_FORMATS: Dict[str, LogFormat] = {
+    "VANILLA": LogFormat("VANILLA"),
+    "PAPER": LogFormat("PAPER"),
+    "FORGE": LogFormat("FORGE"),
+    # Fabric/Quilt loggers may print "[Server thread/INFO] (Minecraft) Steve joined the game"
+    "FABRIC": LogFormat("FABRIC", name_prefix=r'(?::|\(Minecraft\))\s'),
+}
+
+
+def _group_key(kind: str) -> str:
+    return "k_" + kind.replace("-", "_")
+
+
+class LogClassifier:
+    def __init__(self, log_format: LogFormat):
+        self.log_format = log_format
+        self._timestamp = re.compile(log_format.timestamp)
+
+        literals = []
+        alternatives = []
+        self._kinds = {}
+        for kind, template, literal in log_format.patterns:
+            key = _group_key(kind)
+            self._kinds[key] = (kind, key[2:] + "_")
+            alternatives.append(f"(?P<{key}>{template.replace('{p}', log_format.name_prefix)})")
+            if literal not in literals:
+                literals.append(literal)
+
+        self._prefilter = re.compile("|".join(re.escape(l) for l in literals))
+        self._combined = re.compile("|".join(alternatives))
+
+    def classify(self, line: str) -> Optional[LogMatch]:
+        """Return the player event found in the line, or None (the common case)"""
+        if not self._prefilter.search(line):
+            return None
+
+        match = self._combined.search(line)
+        if not match:
+            return None
+
+        kind, group_prefix = self._kinds[match.lastgroup]
+        fields = {
+            name[len(group_prefix):]: value
+            for name, value in match.groupdict().items()
+            if value is not None and name.startswith(group_prefix)
+        }
+
+        ts_match = self._timestamp.search(line)
+        return LogMatch(kind, fields, ts_match.group(1) if ts_match else None)
+
+
+_classifiers: Dict[str, LogClassifier] = {}
+
+
+def register_pattern(mod_loader: str, kind: str, regex: str, literal: str):
+    """Add a pattern to a loader's format and rebuild its shared classifier"""
+    LOG_FORMATS[mod_loader.upper()].add_pattern(kind, regex, literal)
+    _classifiers.pop(mod_loader.upper(), None)
+
+
+def get_classifier(mod_loader: str = "VANILLA") -> LogClassifier:
+    """Shared classifier for a mod loader (unknown loaders use the vanilla format)"""
+    key = (mod_loader or "VANILLA").upper()
+    if key not in LOG_FORMATS:
+        key = "VANILLA"
+    if key not in _classifiers:
+        _classifiers[key] = LogClassifier(LOG_FORMATS[key])
+    return _classifiers[key]
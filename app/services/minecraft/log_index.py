@@ -0,0 +1,372 @@
+"""
+Server Log Index
+Per-server SQLite FTS5 database (database/instance/log_index/<server>.db) with
+every console line. Live lines are appended in batches from the log pipeline;
+archived logs/*.log.gz are backfilled in the background, each archive once.
+Searches by time range, level and phrase never touch the compressed files.
+"""
+import asyncio
+import glob
+import gzip
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.services.minecraft.activity_history import archive_date
+
+LOG_INDEX_DIR = os.getenv(
+    "LOG_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+                 "database", "instance", "log_index")
+)
+# Live lines are committed when this many are pending or after this many seconds
+LOG_INDEX_FLUSH_LINES = int(os.getenv("LOG_INDEX_FLUSH_LINES", "200"))
+LOG_INDEX_FLUSH_INTERVAL = float(os.getenv("LOG_INDEX_FLUSH_INTERVAL", "1"))
+# Rows per transaction while backfilling archives
+BACKFILL_BATCH = 5000
+MAX_PAGE_SIZE = 1000
+# Slack (seconds) when replacing live rows by the archive that contains them
+LIVE_OVERLAP_SLACK = 2
+
+LEVELS = ("TRACE", "DEBUG", "INFO", "WARN", "ERROR", "FATAL")
+
+# [12:34:56] / [12:34:56 INFO] (vanilla, paper) or [12Jan2024 12:34:56.789] (forge)
+TIME_RE = re.compile(r'^\[(?:(\d{2}[A-Za-z]{3}\d{4}) )?(\d{2}):(\d{2}):(\d{2})')
+LEVEL_RE = re.compile(r'[/ ](TRACE|DEBUG|INFO|WARN|WARNING|ERROR|FATAL|SEVERE)\]')
+LEVEL_ALIASES = {"WARNING": "WARN", "SEVERE": "ERROR"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    level TEXT,
+    source TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lines_ts ON lines(ts);
+CREATE INDEX IF NOT EXISTS idx_lines_source_ts ON lines(source, ts);
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    line_count INTEGER NOT NULL
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5(text, content='lines', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS lines_ai AFTER INSERT ON lines BEGIN
+    INSERT INTO lines_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS lines_ad AFTER DELETE ON lines BEGIN
+    INSERT INTO lines_fts(lines_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def parse_level(line: str) -> Optional[str]:
+    match = LEVEL_RE.search(line)
+    if not match:
+        return None
+    level = match.group(1)
+    return LEVEL_ALIASES.get(level, level)
+
+
+class LogIndex:
+    def __init__(self, name: str, working_dir: str, index_dir: str = LOG_INDEX_DIR):
+        self.name = name
+        self.working_dir = working_dir
+        self.index_dir = index_dir
+        self.path = os.path.join(index_dir, f"{name}.db")
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None  # Opened by the first flush, backfill or search
+        self.fts = True
+
+        self._pending: List[tuple] = []
+        self._last_live_ts: Optional[float] = None
+        self._wake = asyncio.Event()
+        self._task = None
+        self.backfilling = False
+
+    def _db(self) -> sqlite3.Connection:
+        """The connection, created on first use; call with self._lock held, off the event loop"""
+        if self._conn is None:
+            os.makedirs(self.index_dir, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: phrase queries fall back to LIKE scans
+                print(f"WARN: SQLite FTS5 unavailable, log search for {self.name} will not be indexed")
+                self.fts = False
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    # --- Live lines ---
+
+    def append(self, line: str):
+        if not line:
+            return
+        self._pending.append((self._live_time(line), parse_level(line), "live", line))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+
+        if len(self._pending) >= LOG_INDEX_FLUSH_LINES:
+            self._wake.set()
+        if self._task is None:
+            self._task = loop.create_task(self._run())
+
+    def _live_time(self, line: str) -> float:
+        """Time from the line's [HH:MM:SS] prefix (today), so search ranges match the log"""
+        now = time.time()
+        today = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        ts = self._line_time(line, today, self._last_live_ts if self._last_live_ts is not None else now)
+        if ts > now + 3600:
+            # Written before midnight, read after it
+            ts -= 86400
+        self._last_live_ts = ts
+        return ts
+
+    async def _run(self):
+        try:
+            while self._pending:
+                if len(self._pending) < LOG_INDEX_FLUSH_LINES:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=LOG_INDEX_FLUSH_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                self._wake.clear()
+                rows, self._pending = self._pending, []
+                if rows:
+                    await asyncio.get_running_loop().run_in_executor(None, self._insert, rows)
+        finally:
+            self._task = None
+
+    def flush_sync(self):
+        rows, self._pending = self._pending, []
+        if rows:
+            self._insert(rows)
+
+    def _insert(self, rows: List[tuple]):
+        try:
+            with self._lock, self._db() as conn:
+                conn.executemany("INSERT INTO lines (ts, level, source, text) VALUES (?, ?, ?, ?)", rows)
+        except Exception as e:
+            print(f"WARN: Failed to index log lines for {self.name}: {e}")
+
+    # --- Archive backfill ---
+
+    def backfill(self) -> int:
+        """Index every logs/*.log.gz not indexed yet (or changed since). Returns lines added."""
+        log_dir = os.path.join(self.working_dir, "logs")
+        archives = sorted(glob.glob(os.path.join(log_dir, "*.log.gz")), key=os.path.getmtime)
+        with self._lock:
+            known = {row[0]: (row[1], row[2]) for row in self._db().execute("SELECT name, size, mtime_ns FROM sources")}
+
+        added = 0
+        self.backfilling = True
+        try:
+            for gz_path in archives:
+                name = os.path.basename(gz_path)
+                st = os.stat(gz_path)
+                if known.get(name) == (st.st_size, st.st_mtime_ns):
+                    continue
+                try:
+                    added += self._index_archive(gz_path, name, st)
+                except Exception as e:
+                    print(f"WARN: Failed to index archive {gz_path}: {e}")
+        finally:
+            self.backfilling = False
+        return added
+
+    def _index_archive(self, gz_path: str, name: str, st: os.stat_result) -> int:
+        with self._lock, self._db() as conn:
+            # Archive was rewritten: drop what was indexed from the old one
+            conn.execute("DELETE FROM lines WHERE source = ?", (name,))
+
+        day = datetime.strptime(archive_date(gz_path), "%Y-%m-%d")
+        last_ts = None
+        first_ts = None
+        count = 0
+        batch = []
+        with gzip.open(gz_path, "rt", encoding="utf-8", errors="replace") as f:
+            for raw in f:
+                line = raw.rstrip("\r\n")
+                if not line:
+                    continue
+                ts = self._line_time(line, day, last_ts)
+                if last_ts is not None and ts < last_ts - 3600:
+                    # Clock went backwards by a lot: the log crossed midnight
+                    day += timedelta(days=1)
+                    ts += 86400
+                last_ts = ts
+                if first_ts is None:
+                    first_ts = ts
+                batch.append((ts, parse_level(line), name, line))
+                if len(batch) >= BACKFILL_BATCH:
+                    self._insert(batch)
+                    count += len(batch)
+                    batch = []
+        if batch:
+            self._insert(batch)
+            count += len(batch)
+
+        with self._lock, self._db() as conn:
+            if first_ts is not None:
+                # These lines were indexed live while the server ran; the archive now holds them
+                conn.execute(
+                    "DELETE FROM lines WHERE source = 'live' AND ts BETWEEN ? AND ?",
+                    (first_ts - LIVE_OVERLAP_SLACK, last_ts + LIVE_OVERLAP_SLACK)
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO sources (name, size, mtime_ns, line_count) VALUES (?, ?, ?, ?)",
+                (name, st.st_size, st.st_mtime_ns, count)
+            )
+        return count
+
+    @staticmethod
+    def _line_time(line: str, day: datetime, last_ts: Optional[float]) -> float:
+        match = TIME_RE.match(line)
+        if not match:
+            # Continuation lines (stack traces) inherit the previous timestamp
+            return last_ts if last_ts is not None else day.timestamp()
+        date_str, hh, mm, ss = match.groups()
+        if date_str:
+            try:
+                day = datetime.strptime(date_str, "%d%b%Y")
+            except ValueError:
+                pass
+        return day.replace(hour=int(hh), minute=int(mm), second=int(ss)).timestamp()
+
+    # --- Search ---
+
+    def search(
+        self,
+        query: str = None,
+        since: float = None,
+        until: float = None,
+        levels: List[str] = None,
+        cursor: str = None,
+        limit: int = 100
+    ) -> Dict:
+        """Newest first. `cursor` is the next_cursor of the previous page."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where, params = [], []
+        with self._lock:
+            conn = self._db()  # Sets self.fts
+
+        if query:
+            if self.fts:
+                where.append("l.id IN (SELECT rowid FROM lines_fts WHERE lines_fts MATCH ?)")
+                # Whole input as one phrase; FTS5 escapes quotes by doubling them
+                params.append('"' + query.replace('"', '""') + '"')
+            else:
+                where.append("l.text LIKE ? ESCAPE '\\'")
+                params.append("%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if since is not None:
+            where.append("l.ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("l.ts <= ?")
+            params.append(until)
+        if levels:
+            where.append(f"l.level IN ({', '.join('?' for _ in levels)})")
+            params.extend(levels)
+        if cursor:
+            try:
+                cursor_ts, cursor_id = cursor.split(":", 1)
+                cursor_ts, cursor_id = float(cursor_ts), int(cursor_id)
+            except ValueError:
+                raise ValueError("Invalid cursor")
+            where.append("(l.ts < ? OR (l.ts = ? AND l.id < ?))")
+            params.extend([cursor_ts, cursor_ts, cursor_id])
+
+        sql = "SELECT l.id, l.ts, l.level, l.source, l.text FROM lines l"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY l.ts DESC, l.id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        started = time.perf_counter()
+        with self._lock:
+            rows = conn.execute(sql, params).fetchall()
+        took_ms = (time.perf_counter() - started) * 1000
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1][1]!r}:{rows[-1][0]}" if has_more else None
+        return {
+            "results": [
+                {
+                    "time": datetime.fromtimestamp(ts).isoformat(),
+                    "level": level,
+                    "source": source,
+                    "line": text
+                }
+                for _, ts, level, source, text in rows
+            ],
+            "next_cursor": next_cursor,
+            "took_ms": round(took_ms, 2),
+            "backfilling": self.backfilling
+        }
+
+    def close(self):
+        self.flush_sync()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_indexes: Dict[str, LogIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def get_log_index(name: str, working_dir: str) -> LogIndex:
+    with _registry_lock:
+        index = _indexes.get(name)
+        if index is None:
+            index = _indexes[name] = LogIndex(name, working_dir)
+        return index
+
+
+def drop_log_index(name: str):
+    """Close and delete a server's index (server deleted)"""
+    with _registry_lock:
+        index = _indexes.pop(name, None)
+    path = index.path if index else os.path.join(LOG_INDEX_DIR, f"{name}.db")
+    if index:
+        index.close()
+    for suffix in ("", "-wal", "-shm"):
+        try: os.remove(path + suffix)
+        except OSError: pass
+
+
+def flush_all():
+    for index in list(_indexes.values()):
+        index.flush_sync()
+
+
+async def backfill_all(processes: Dict):
+    """Backfill every server's archives, one server at a time, off the event loop"""
+    loop = asyncio.get_running_loop()
+    for name, process in list(processes.items()):
+        try:
+            index = get_log_index(name, process.working_dir)
+            added = await loop.run_in_executor(None, index.backfill)
+            if added:
+                print(f"INFO: Indexed {added} archived log lines for {name}")
+        except Exception as e:
+            print(f"WARN: Log index backfill failed for {name}: {e}")
@@ -0,0 +1,86 @@
+"""
+Incremental latest.log reader
+Keeps the byte offset and inode of a server's latest.log and only parses bytes
+appended since the previous poll. Used to derive status and online players for
+recovered servers whose stdout we don't own. A log seen for the first time is
+only read from its last LOG_STATE_TAIL_BYTES, like the old per-poll tail.
+"""
+import os
+from typing import Optional, Set
+
+from app.services.minecraft.log_classifier import get_classifier
+
+# Bytes read from the end of a log seen for the first time
+LOG_STATE_TAIL_BYTES = 50000
+
+# Markers, checked in this order on every line
+DONE_MARKERS = ("Done (", "Done preparing level")
+STOPPING_MARKERS = ("Stopping server", "Stopping the server")
+TERMINATED_MARKERS = ("Awaiting termination", "All RegionFile I/O tasks to complete")
+
+
+class LogStateReader:
+    def __init__(self, log_path: str, mod_loader: str = "VANILLA"):
+        self.log_path = log_path
+        self.classifier = get_classifier(mod_loader)
+        self._inode: Optional[int] = None
+        self._offset = 0
+        self._partial = b""
+        self._skip_line = False
+        self._reset_state()
+
+    def _reset_state(self):
+        self.status = "STARTING"
+        self.online: Set[str] = set()
+
+    def poll(self) -> Optional["LogStateReader"]:
+        """Parse whatever was appended since the last call. Returns None if the log doesn't exist."""
+        try:
+            st = os.stat(self.log_path)
+        except OSError:
+            return None
+
+        # New file (first attach, rotation) or truncated in place: start over from the tail
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            self._inode = st.st_ino
+            self._offset = max(0, st.st_size - LOG_STATE_TAIL_BYTES)
+            self._partial = b""
+            self._reset_state()
+            self._skip_line = self._offset > 0  # The tail starts mid-line
+
+        if st.st_size == self._offset:
+            return self
+
+        with open(self.log_path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(st.st_size - self._offset)
+        self._offset += len(chunk)
+
+        data = self._partial + chunk
+        lines = data.split(b"\n")
+        # Last element is an incomplete line (or b"" when data ends with a newline)
+        self._partial = lines.pop()
+        if self._skip_line and lines:
+            lines.pop(0)
+            self._skip_line = False
+
+        for raw in lines:
+            self._apply(raw.decode("utf-8", errors="ignore"))
+        return self
+
+    def _apply(self, line: str):
+        if any(m in line for m in DONE_MARKERS):
+            self.status = "ONLINE"
+        if any(m in line for m in STOPPING_MARKERS):
+            self.status = "STOPPING"
+        if any(m in line for m in TERMINATED_MARKERS):
+            self.status = "OFFLINE"
+
+        match = self.classifier.classify(line.strip())
+        if not match:
+            return
+        user = match.fields.get("user")
+        if match.kind in ("join", "login"):
+            self.online.add(user)
+        elif match.kind in ("lost", "left"):
+            self.online.discard(user)
@@ -1,13 +1,142 @@
 """
 MasterBridge API Client
-Connects to MasterBridge Fabric mod API for enhanced server monitoring
+Connects to MasterBridge Fabric mod API for enhanced server monitoring.
+All clients share one pooled httpx.AsyncClient (keep-alive connections);
+each server gets its own concurrency limit so a slow mod can't take the
+whole pool, and every endpoint has its own timeout. Read endpoints are cached
+per server for a short TTL and concurrent identical reads share one request.
+A circuit breaker per client stops sending requests to a mod that keeps
+failing; a background probe closes it again once the mod answers.
 """
-import requests
+import asyncio
+import hashlib
+import os
+import time
+import httpx
 from typing import Optional, Dict, List
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Connection pool shared by every MasterBridge client
+MB_MAX_CONNECTIONS = int(os.getenv("MB_MAX_CONNECTIONS", "100"))
+MB_MAX_KEEPALIVE = int(os.getenv("MB_MAX_KEEPALIVE", "50"))
+# Requests in flight per server
+MB_CONCURRENCY = int(os.getenv("MB_CONCURRENCY", "4"))
+# Seconds to establish a connection; a dead mod should fail fast
+MB_CONNECT_TIMEOUT = float(os.getenv("MB_CONNECT_TIMEOUT", "1"))
+
+DEFAULT_TIMEOUT = 5.0
+ENDPOINT_TIMEOUTS = {
+    "/api/full-state": 2.0,
+    "/api/online-players": 2.0,
+    "/api/server-status": 2.0,
+    "/api/active-events": 2.0,
+    "/api/chat-log": 3.0,
+    "/pack.zip": 30.0,
+}
+# Read size when streaming pack.zip to disk
+PACK_CHUNK_SIZE = 64 * 1024
+
+# Seconds a read endpoint's response is reused (0 disables caching for it)
+CACHE_TTLS = {
+    "/api/full-state": float(os.getenv("MB_TTL_STATE", "1")),
+    "/api/online-players": float(os.getenv("MB_TTL_PLAYERS", "1")),
+    "/api/server-status": float(os.getenv("MB_TTL_STATUS", "2")),
+    "/api/chat-log": float(os.getenv("MB_TTL_CHAT", "2")),
+    "/api/active-events": float(os.getenv("MB_TTL_EVENTS", "2")),
+}
+
+# Consecutive connection failures/timeouts that open the circuit
+MB_BREAKER_THRESHOLD = int(os.getenv("MB_BREAKER_THRESHOLD", "3"))
+# Seconds between recovery probes while the circuit is open
+MB_PROBE_INTERVAL = float(os.getenv("MB_PROBE_INTERVAL", "5"))
+
+_http: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The shared pooled client (created on first use, inside the event loop)"""
+    global _http
+    if _http is None or _http.is_closed:
+        _http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MB_MAX_CONNECTIONS, max_keepalive_connections=MB_MAX_KEEPALIVE),
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=MB_CONNECT_TIMEOUT),
+        )
+    return _http
+
+
+async def close_http_client():
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+class BridgeUnavailable(Exception):
+    """Raised instead of sending a request while the circuit is open"""
+
+
+class CircuitBreaker:
+    """CLOSED -> OPEN after `threshold` consecutive failures; OPEN -> CLOSED when a probe succeeds"""
+
+    def __init__(self, threshold: int = MB_BREAKER_THRESHOLD, probe_interval: float = MB_PROBE_INTERVAL):
+        self.threshold = threshold
+        self.probe_interval = probe_interval
+        self.state = "CLOSED"
+        self.failures = 0
+        self.rejected = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._probe_task = None
+        self._stopped = False  # Owning client closed: no new probe loops
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == "OPEN"
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != "CLOSED":
+            logger.info("MasterBridge reachable again, circuit closed")
+        self.state = "CLOSED"
+        self.opened_at = None
+
+    def record_failure(self, error: str, probe):
+        """`probe` is an async callable returning True once the bridge is back"""
+        self.failures += 1
+        self.last_error = error
+        if self.state == "CLOSED" and self.failures >= self.threshold:
+            self.state = "OPEN"
+            self.opened_at = time.time()
+            logger.warning(f"MasterBridge failed {self.failures} times in a row, circuit opened: {error}")
+            if not self._stopped and (self._probe_task is None or self._probe_task.done()):
+                self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop(probe))
+
+    async def _probe_loop(self, probe):
+        while self.is_open:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                if await probe():
+                    self.record_success()
+            except Exception:
+                pass
+
+    def snapshot(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened_at": self.opened_at,
+            "last_error": self.last_error,
+            "rejected": self.rejected,
+        }
+
+    def stop(self):
+        self._stopped = True
+        if self._probe_task:
+            self._probe_task.cancel()
+
+
 class MasterBridgeClient:
     """Client to interact with MasterBridge Fabric mod API"""
     
@@ -20,9 +149,116 @@ class MasterBridgeClient:
             port: Port where MasterBridge mod is listening
         """
         self.base_url = f"http://{ip}:{port}"
-        self.timeout = 5  # seconds
+        self.timeout = DEFAULT_TIMEOUT  # seconds, for endpoints without their own
+        self._semaphore = None
+        self.breaker = CircuitBreaker()
+        # endpoint -> (expires_at, response); endpoint -> in-flight request
+        self._cache: Dict[str, tuple] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_coalesced = 0
+        self.snapshot_hits = 0
+        # Push/poll ingestion (MB_STREAM_MODE); created on first use inside the event loop
+        self.stream = None
+        self.closed = False  # close() called: ingestion must not start again
+        # Last successful /api/server-status response, read by get_stats() without I/O
+        self.last_server_status: Optional[Dict] = None
+
+    def _timeout_for(self, endpoint: str) -> httpx.Timeout:
+        return httpx.Timeout(ENDPOINT_TIMEOUTS.get(endpoint, self.timeout), connect=MB_CONNECT_TIMEOUT)
+
+    async def _send(self, method: str, endpoint: str, data: Dict = None, probe: bool = False) -> httpx.Response:
+        # Known-dead bridge: fail immediately instead of waiting for a timeout
+        if self.breaker.is_open and not probe:
+            self.breaker.rejected += 1
+            raise BridgeUnavailable(f"MasterBridge at {self.base_url} is unavailable (circuit open)")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(MB_CONCURRENCY)
+        try:
+            async with self._semaphore:
+                response = await get_http_client().request(
+                    method, f"{self.base_url}{endpoint}", json=data, timeout=self._timeout_for(endpoint)
+                )
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            if not probe:
+                self.breaker.record_failure(f"{type(e).__name__}: {e}", self.is_available)
+            raise
+        if response.status_code >= 500:
+            if not probe:
+                self.breaker.record_failure(f"HTTP {response.status_code}", self.is_available)
+        else:
+            self.breaker.record_success()
+        return response
         
-    def _make_request(self, endpoint: str, method: str = "GET", data: Dict = None) -> Optional[Dict]:
+    async def _make_request(self, endpoint: str, method: str = "GET", data: Dict = None) -> Optional[Dict]:
+        """GET of a cacheable endpoint goes through the TTL cache, everything else straight out"""
+        if method == "GET":
+            snapshot = self._ensure_stream().get(endpoint)
+            if snapshot is not None:
+                self.snapshot_hits += 1
+                return snapshot
+        if method == "GET" and CACHE_TTLS.get(endpoint):
+            return await self._cached_request(endpoint)
+        result = await self._fetch(endpoint, method, data)
+        if method == "POST" and result is not None:
+            # Actions (kick, ban, events...) change what the read endpoints return
+            self._cache.clear()
+        return result
+
+    async def _cached_request(self, endpoint: str) -> Optional[Dict]:
+        cached = self._cache.get(endpoint)
+        if cached and cached[0] > time.monotonic():
+            self.cache_hits += 1
+            return cached[1]
+
+        inflight = self._inflight.get(endpoint)
+        if inflight:
+            self.cache_coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.cache_misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[endpoint] = future
+        try:
+            result = await self._fetch(endpoint)
+            # Failures aren't cached, the next caller tries again
+            if result is not None:
+                self._cache[endpoint] = (time.monotonic() + CACHE_TTLS[endpoint], result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            # Only this caller went away (_fetch never raises otherwise); coalesced
+            # waiters see a failed read, like any other, instead of being cancelled too
+            if not future.done():
+                future.set_result(None)
+            raise
+        finally:
+            self._inflight.pop(endpoint, None)
+
+    def _ensure_stream(self):
+        if self.stream is None:
+            from app.services.minecraft.masterbridge_stream import MasterBridgeStream
+            self.stream = MasterBridgeStream(self)
+            if not self.closed:
+                self.stream.start()
+        return self.stream
+
+    def start_stream(self):
+        """Start push ingestion now instead of on the first request (no-op when MB_STREAM_MODE=off)"""
+        self._ensure_stream()
+
+    def cache_stats(self) -> Dict:
+        lookups = self.cache_hits + self.cache_misses + self.cache_coalesced
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "coalesced": self.cache_coalesced,
+            "snapshot_hits": self.snapshot_hits,
+            "hit_ratio": round((self.cache_hits + self.cache_coalesced) / lookups, 3) if lookups else None,
+        }
+
+    async def _fetch(self, endpoint: str, method: str = "GET", data: Dict = None) -> Optional[Dict]:
         """
         Make HTTP request to MasterBridge API
         
@@ -36,54 +272,52 @@ class MasterBridgeClient:
         """
         url = f"{self.base_url}{endpoint}"
         
+        if method not in ("GET", "POST"):
+            logger.error(f"Unsupported HTTP method: {method}")
+            return None
         try:
-            if method == "GET":
-                response = requests.get(url, timeout=self.timeout)
-            elif method == "POST":
-                response = requests.post(url, json=data, timeout=self.timeout)
-            else:
-                logger.error(f"Unsupported HTTP method: {method}")
-                return None
-            
+            response = await self._send(method, endpoint, data if method == "POST" else None)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.Timeout:
+        except BridgeUnavailable:
+            return None
+        except httpx.TimeoutException:
             logger.warning(f"MasterBridge request to {url} timed out")
             return None
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             logger.warning(f"Could not connect to MasterBridge at {url}")
             return None
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"MasterBridge request failed: {e}")
             return None
         except Exception as e:
             logger.error(f"Unexpected error in MasterBridge request: {e}")
             return None
     
-    def get_full_state(self) -> Optional[Dict]:
+    async def get_full_state(self) -> Optional[Dict]:
         """
         Get full server state
         
         Returns:
             Dict with: online_count, max_players, motd, version, mspt, players_names
         """
-        return self._make_request("/api/full-state")
+        return await self._make_request("/api/full-state")
     
-    def get_players(self) -> Optional[List[Dict]]:
+    async def get_players(self) -> Optional[List[Dict]]:
         """
         Get list of online players from full-state endpoint
         
         Returns:
             List of dicts with player names: [{"name": "player1"}, {"name": "player2"}]
         """
-        state = self.get_full_state()
+        state = await self.get_full_state()
         if state and 'players' in state:
             # Convert list of names to list of dicts with name field
             players = state.get('players', [])
             return [{'name': name} for name in players] if isinstance(players, list) else []
         return None
     
-    def get_chat(self) -> Optional[List[Dict]]:
+    async def get_chat(self) -> Optional[List[Dict]]:
         """
         Get chat messages - MasterBridge mod doesn't have a chat history endpoint
         Chat messages are sent via POST /api/send only
@@ -94,7 +328,7 @@ class MasterBridgeClient:
         # MasterBridge mod does not expose chat history
         return []
     
-    def send_chat_message(self, text: str) -> bool:
+    async def send_chat_message(self, text: str) -> bool:
         """
         Send a chat message to the game
         
@@ -105,10 +339,10 @@ class MasterBridgeClient:
             True if successful, False otherwise
         """
         data = {"text": text}
-        result = self._make_request("/api/send", method="POST", data=data)
+        result = await self._make_request("/api/send", method="POST", data=data)
         return result is not None and result.get("status") == "ok"
     
-    def is_available(self) -> bool:
+    async def is_available(self) -> bool:
         """
         Check if MasterBridge API is available
         
@@ -116,105 +350,168 @@ class MasterBridgeClient:
             True if API responds, False otherwise
         """
         try:
-            response = requests.get(f"{self.base_url}/api/full-state", timeout=2)
+            response = await self._send("GET", "/api/full-state", probe=True)
             return response.status_code == 200
-        except:
+        except Exception:
             return False
 
+    def health(self) -> Dict:
+        """Circuit breaker state for the UI"""
+        return self.breaker.snapshot()
+
+    def close(self):
+        """Stop the probe loop and the ingestion task (delete_server, set_masterbridge)"""
+        self.closed = True
+        self.breaker.stop()
+        if self.stream:
+            self.stream.stop()
+
     # --- Moderation ---
-    def kick_player(self, name: str, reason: str = "Kicked by operator") -> bool:
+    async def kick_player(self, name: str, reason: str = "Kicked by operator") -> bool:
         """Kick a player via MasterBridge"""
         data = {"name": name, "reason": reason}
-        result = self._make_request("/api/kick", method="POST", data=data)
+        result = await self._make_request("/api/kick", method="POST", data=data)
         return result is not None and result.get("status") == "ok"
 
-    def ban_player(self, name: str, reason: str = "Banned by admin") -> bool:
+    async def ban_player(self, name: str, reason: str = "Banned by admin") -> bool:
         """Ban a player via MasterBridge"""
         data = {"name": name, "reason": reason}
-        result = self._make_request("/api/ban", method="POST", data=data)
+        result = await self._make_request("/api/ban", method="POST", data=data)
         return result is not None and result.get("status") == "ok"
 
-    def unban_player(self, name: str) -> bool:
+    async def unban_player(self, name: str) -> bool:
         """Unban a player via MasterBridge"""
         data = {"name": name}
-        result = self._make_request("/api/unban", method="POST", data=data)
+        result = await self._make_request("/api/unban", method="POST", data=data)
         return result is not None and result.get("status") == "ok"
 
     # --- Events & Gameplay ---
-    def trigger_event(self, context_data: Dict) -> bool:
+    async def trigger_event(self, context_data: Dict) -> bool:
         """Trigger a generic chaos event"""
         # The Java code accepts a ctx and passes it to ChaosController.handleEvent
         # We assume it accepts a JSON body
-        result = self._make_request("/api/events", method="POST", data=context_data)
+        result = await self._make_request("/api/events", method="POST", data=context_data)
         return result is not None
 
-    def trigger_cinematic(self, type_name: str, target: str, difficulty: int = 1) -> bool:
+    async def trigger_cinematic(self, type_name: str, target: str, difficulty: int = 1) -> bool:
         """Trigger a cinematic event"""
         data = {
             "type": type_name,
             "target": target,
             "difficulty": difficulty
         }
-        result = self._make_request("/api/cinematics", method="POST", data=data)
+        result = await self._make_request("/api/cinematics", method="POST", data=data)
         return result is not None and "activada" in str(result.get("status", ""))
 
-    def trigger_paranoia(self, target: str, duration: int = 60) -> bool:
+    async def trigger_paranoia(self, target: str, duration: int = 60) -> bool:
         """Trigger a paranoia event"""
         data = {
             "target": target,
             "duration": duration
         }
-        result = self._make_request("/api/paranoia", method="POST", data=data)
+        result = await self._make_request("/api/paranoia", method="POST", data=data)
         return result is not None and "activada" in str(result.get("status", ""))
 
-    def trigger_special_event(self, event_type: str, target: str) -> bool:
+    async def trigger_special_event(self, event_type: str, target: str) -> bool:
         """Trigger a special event (e.g. admin_coliseum)"""
         data = {
             "type": event_type,
             "target": target
         }
-        result = self._make_request("/api/special-events", method="POST", data=data)
+        result = await self._make_request("/api/special-events", method="POST", data=data)
         return result is not None and "activada" in str(result.get("status", ""))
 
     # --- Additional Endpoints ---
-    def get_chat_log(self) -> Optional[List[Dict]]:
+    async def get_chat_log(self) -> Optional[List[Dict]]:
         """Get complete chat history from MasterBridge"""
-        return self._make_request("/api/chat-log")
+        return await self._make_request("/api/chat-log")
 
-    def get_online_players_detailed(self) -> Optional[List[Dict]]:
+    async def get_online_players_detailed(self) -> Optional[List[Dict]]:
         """
         Get detailed information about online players
         
         Returns:
             List of dicts with: name, uuid, ping, health, food, level, dimension, pos
         """
-        return self._make_request("/api/online-players")
+        return await self._make_request("/api/online-players")
 
-    def get_server_status(self) -> Optional[Dict]:
+    async def get_server_status(self) -> Optional[Dict]:
         """
         Get detailed server status
         
         Returns:
             Dict with: online_players, max_players, motd, version, mspt
         """
-        return self._make_request("/api/server-status")
+        status = await self._make_request("/api/server-status")
+        if status is not None:
+            self.last_server_status = status
+        return status
 
-    def get_active_events(self) -> Optional[Dict]:
+    async def get_active_events(self) -> Optional[Dict]:
         """
         Get all currently active events
         
         Returns:
             Dict with: wave_events, cinematics, special_event_active
         """
-        return self._make_request("/api/active-events")
+        return await self._make_request("/api/active-events")
+
+    async def download_resource_pack(self, dest_path: str, etag: str = None,
+                                     last_modified: str = None) -> Optional[Dict]:
+        """
+        Stream the server resource pack (ZIP) to dest_path, chunk by chunk
+
+        Args:
+            dest_path: File to write; only replaced once the download is complete
+            etag, last_modified: Validators of the copy already on disk, if any
+
+        Returns:
+            {"modified": False} if the copy on disk is still current, else
+            {"modified": True, "etag", "last_modified", "size", "sha1"}; None if failed
+        """
+        if self.breaker.is_open:
+            return None
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
 
-    def download_resource_pack(self) -> Optional[bytes]:
-        """Download server resource pack as ZIP"""
-        url = f"{self.base_url}/pack.zip"
+        loop = asyncio.get_running_loop()
+        tmp_path = f"{dest_path}.part"
         try:
-            response = requests.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            return response.content
+            async with get_http_client().stream("GET", f"{self.base_url}/pack.zip", headers=headers,
+                                                timeout=self._timeout_for("/pack.zip")) as response:
+                if response.status_code == 304:
+                    self.breaker.record_success()
+                    return {"modified": False}
+                response.raise_for_status()
+                size = 0
+                # Hashed while streaming, so the pack is never read back; disk writes go to the executor
+                digest = hashlib.sha1()
+                f = await loop.run_in_executor(None, open, tmp_path, "wb")
+                try:
+                    async for chunk in response.aiter_bytes(PACK_CHUNK_SIZE):
+                        digest.update(chunk)
+                        await loop.run_in_executor(None, f.write, chunk)
+                        size += len(chunk)
+                finally:
+                    await loop.run_in_executor(None, f.close)
+                await loop.run_in_executor(None, os.replace, tmp_path, dest_path)
+            self.breaker.record_success()
+            return {
+                "modified": True,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "size": size,
+                "sha1": digest.hexdigest(),
+            }
         except Exception as e:
+            if isinstance(e, (httpx.TimeoutException, httpx.TransportError)):
+                self.breaker.record_failure(f"{type(e).__name__}: {e}", self.is_available)
             logger.error(f"Failed to download resource pack: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
             return None
@@ -0,0 +1,159 @@
+"""
+MasterBridge Push Ingestion
+Optional mode (MB_STREAM_MODE) where one background task per server keeps a
+live snapshot of the mod's read endpoints, so UI polls are answered from
+memory instead of each becoming a round-trip to the mod.
+
+- "sse": hold a Server-Sent Events connection to /api/stream. Each event is
+  named after a read endpoint ("full-state", "online-players", ...) and
+  carries its JSON body; "chat" events append one message to the chat log.
+  If the mod has no stream endpoint, the task falls back to polling.
+- "poll": refresh every snapshot endpoint once per MB_POLL_INTERVAL, no
+  matter how many viewers are polling the manager.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Dict
+
+import httpx
+
+from app.services.minecraft.masterbridge_client import get_http_client, MB_CONNECT_TIMEOUT
+
+# "off", "sse" or "poll"
+MB_STREAM_MODE = os.getenv("MB_STREAM_MODE", "off").lower()
+MB_STREAM_PATH = os.getenv("MB_STREAM_PATH", "/api/stream")
+# Seconds between refreshes in polling mode
+MB_POLL_INTERVAL = float(os.getenv("MB_POLL_INTERVAL", "2"))
+# Longest wait between stream reconnect attempts
+MB_STREAM_MAX_BACKOFF = 30.0
+# Chat messages kept when the log is built from "chat" events
+CHAT_LOG_LIMIT = 200
+
+SNAPSHOT_ENDPOINTS = (
+    "/api/full-state",
+    "/api/online-players",
+    "/api/server-status",
+    "/api/chat-log",
+    "/api/active-events",
+)
+
+
+class MasterBridgeStream:
+    def __init__(self, client, mode: str = MB_STREAM_MODE):
+        self.client = client
+        self.mode = mode
+        self._snapshot: Dict[str, tuple] = {}  # endpoint -> (received_at, data)
+        self._task = None
+        self.connected = False  # Stream connection currently open
+        self.events_received = 0
+        self.upstream_requests = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("sse", "poll")
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+        self.connected = False
+
+    def get(self, endpoint: str):
+        """Snapshot value, or None if there isn't a current one"""
+        entry = self._snapshot.get(endpoint)
+        if not entry:
+            return None
+        # A live stream pushes changes, so its values don't age; polled values do
+        if self.connected or time.monotonic() - entry[0] <= 3 * MB_POLL_INTERVAL:
+            return entry[1]
+        return None
+
+    def _store(self, endpoint: str, data):
+        self._snapshot[endpoint] = (time.monotonic(), data)
+        if endpoint == "/api/server-status":
+            self.client.last_server_status = data
+
+    async def _run(self):
+        if self.mode == "sse":
+            await self._run_sse()
+        await self._run_poll()
+
+    async def _run_sse(self):
+        """Returns only when the mod has no stream endpoint (switch to polling)"""
+        backoff = 1.0
+        url = f"{self.client.base_url}{MB_STREAM_PATH}"
+        while True:
+            try:
+                self.upstream_requests += 1
+                timeout = httpx.Timeout(None, connect=MB_CONNECT_TIMEOUT)
+                async with get_http_client().stream("GET", url, timeout=timeout,
+                                                    headers={"Accept": "text/event-stream"}) as response:
+                    if response.status_code in (404, 405, 501):
+                        print(f"INFO: MasterBridge at {self.client.base_url} has no event stream, polling instead")
+                        return
+                    response.raise_for_status()
+                    self.connected = True
+                    backoff = 1.0
+                    await self._consume(response)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"DEBUG: MasterBridge stream for {self.client.base_url} dropped: {e}")
+            finally:
+                self.connected = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MB_STREAM_MAX_BACKOFF)
+
+    async def _consume(self, response):
+        event, data_lines = None, []
+        async for line in response.aiter_lines():
+            if line.startswith(":"):
+                continue  # Comment / keep-alive
+            if line == "":
+                if data_lines:
+                    self._apply(event or "message", "\n".join(data_lines))
+                event, data_lines = None, []
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+
+    def _apply(self, event: str, raw: str):
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return
+        self.events_received += 1
+        if event == "chat":
+            _, chat = self._snapshot.get("/api/chat-log", (0, []))
+            chat = (list(chat) if isinstance(chat, list) else []) + [data]
+            self._store("/api/chat-log", chat[-CHAT_LOG_LIMIT:])
+        elif f"/api/{event}" in SNAPSHOT_ENDPOINTS:
+            self._store(f"/api/{event}", data)
+
+    async def _run_poll(self):
+        while True:
+            for endpoint in SNAPSHOT_ENDPOINTS:
+                # Through the client: per-server concurrency limit and circuit breaker apply
+                if self.client.breaker.is_open:
+                    break
+                self.upstream_requests += 1
+                data = await self.client._fetch(endpoint)
+                if data is not None:
+                    self._store(endpoint, data)
+            await asyncio.sleep(MB_POLL_INTERVAL)
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "mode": self.mode,
+            "connected": self.connected,
+            "events_received": self.events_received,
+            "upstream_requests": self.upstream_requests,
+            "snapshot_age": {e: round(now - t, 1) for e, (t, _) in self._snapshot.items()},
+        }
@@ -0,0 +1,184 @@
+"""
+Background Metrics Sampler
+One asyncio task samples every running server at a fixed interval using
+persistent psutil.Process handles (so cpu_percent() is meaningful) and keeps
+the history in fixed-size array-backed ring buffers.
+"""
+import asyncio
+import os
+import time
+import psutil
+from array import array
+from typing import Dict, List, Optional
+
+# Seconds between samples
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "5"))
+# Samples kept per server (default: 1 hour at 5s)
+METRICS_HISTORY = int(os.getenv("METRICS_HISTORY", "720"))
+
+FIELDS = ("time", "cpu", "ram", "threads", "fds", "read_bytes", "write_bytes")
+# Cumulative counters are downsampled by taking the last value instead of the mean
+COUNTER_FIELDS = ("read_bytes", "write_bytes")
+
+
+class MetricRing:
+    """Column-oriented ring buffer, one array('d') per field"""
+
+    def __init__(self, size: int = METRICS_HISTORY):
+        self.size = size
+        self._cols = {f: array('d', bytes(8 * size)) for f in FIELDS}
+        self._next = 0
+        self.count = 0
+
+    def append(self, sample: Dict[str, float]):
+        i = self._next
+        for f in FIELDS:
+            self._cols[f][i] = sample.get(f, 0.0)
+        self._next = (i + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def _row(self, i: int) -> Dict[str, float]:
+        return {f: self._cols[f][i] for f in FIELDS}
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        if not self.count:
+            return None
+        return self._row((self._next - 1) % self.size)
+
+    def since(self, start: float) -> List[Dict[str, float]]:
+        """Samples with time >= start, oldest first"""
+        rows = []
+        first = (self._next - self.count) % self.size
+        for n in range(self.count):
+            i = (first + n) % self.size
+            if self._cols["time"][i] >= start:
+                rows.append(self._row(i))
+        return rows
+
+    def clear(self):
+        self._next = 0
+        self.count = 0
+
+
+class _ServerSampler:
+    def __init__(self, history: int):
+        self.pid: Optional[int] = None
+        self.proc: Optional[psutil.Process] = None
+        self.ring = MetricRing(history)
+
+    def attach(self, pid: int):
+        if pid == self.pid:
+            return
+        self.pid = pid
+        self.proc = psutil.Process(pid)
+        self.proc.cpu_percent()  # Prime: the first call always returns 0.0
+        self.ring.clear()
+
+    def sample(self) -> Dict[str, float]:
+        proc = self.proc
+        with proc.oneshot():
+            sample = {
+                "time": time.time(),
+                "cpu": proc.cpu_percent(),
+                "ram": proc.memory_info().rss / (1024 * 1024),
+                "threads": proc.num_threads(),
+            }
+            try:
+                sample["fds"] = proc.num_fds() if hasattr(proc, "num_fds") else proc.num_handles()
+            except (psutil.AccessDenied, AttributeError):
+                sample["fds"] = 0
+            try:
+                io = proc.io_counters()
+                sample["read_bytes"] = io.read_bytes
+                sample["write_bytes"] = io.write_bytes
+            except (psutil.AccessDenied, AttributeError):
+                pass
+        self.ring.append(sample)
+        return sample
+
+
+class MetricsSampler:
+    def __init__(self, interval: float = METRICS_INTERVAL, history: int = METRICS_HISTORY):
+        self.interval = interval
+        self.history = history
+        self._servers: Dict[str, _ServerSampler] = {}
+        self._processes = None
+        self._task = None
+
+    def start(self, processes: Dict):
+        """Start sampling. `processes` is the live name -> MinecraftProcess registry."""
+        self._processes = processes
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                # psutil reads /proc synchronously; keep it off the event loop
+                await loop.run_in_executor(None, self._sample_all)
+            except Exception as e:
+                print(f"ERROR: Metrics sampling failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def _sample_all(self):
+        for name, process in list(self._processes.items()):
+            pid = process._get_pid() if process.is_running() else None
+            sampler = self._servers.get(name)
+            if not pid:
+                if sampler:
+                    sampler.pid = sampler.proc = None
+                continue
+            if sampler is None:
+                sampler = self._servers[name] = _ServerSampler(self.history)
+            try:
+                sampler.attach(pid)
+                sampler.sample()
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                sampler.pid = sampler.proc = None
+
+        for name in list(self._servers):
+            if name not in self._processes:
+                del self._servers[name]
+
+    def get_latest(self, name: str, pid: int = None) -> Optional[Dict[str, float]]:
+        """Latest sample for a server, or None if it hasn't been sampled (for this pid)"""
+        sampler = self._servers.get(name)
+        if not sampler or (pid is not None and sampler.pid != pid):
+            return None
+        return sampler.ring.latest()
+
+    def get_history(self, name: str, minutes: float = 10, resolution: float = None) -> List[Dict[str, float]]:
+        """
+        Samples of the last `minutes`, oldest first. With `resolution` (seconds)
+        samples are averaged into buckets of that width.
+        """
+        sampler = self._servers.get(name)
+        if not sampler:
+            return []
+        rows = sampler.ring.since(time.time() - minutes * 60)
+        if not resolution or resolution <= self.interval:
+            return rows
+
+        buckets: Dict[int, List[Dict[str, float]]] = {}
+        for row in rows:
+            buckets.setdefault(int(row["time"] // resolution), []).append(row)
+
+        result = []
+        for key in sorted(buckets):
+            group = buckets[key]
+            merged = {"time": key * resolution}
+            for f in FIELDS[1:]:
+                if f in COUNTER_FIELDS:
+                    merged[f] = group[-1][f]
+                else:
+                    merged[f] = sum(r[f] for r in group) / len(group)
+            result.append(merged)
+        return result
+
+
+metrics_sampler = MetricsSampler() # Singleton
@@ -1,122 +1,261 @@
-
 import os
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 from sqlalchemy.orm import Session
+from database.connection import SessionLocal
+from database.models.players.player import Player
 from database.models.players.player_stat import PlayerStat
 from database.models.players.player_achievement import PlayerAchievement
+from database.upsert import upsert
+from app.services.minecraft.server_properties import read_server_properties
 
 logger = logging.getLogger(__name__)
 
+# Worker threads for multi-player syncs, and players handled per session/transaction
+STATS_SYNC_WORKERS = int(os.getenv("STATS_SYNC_WORKERS", "4"))
+STATS_SYNC_BATCH = int(os.getenv("STATS_SYNC_BATCH", "25"))
+
+def get_world_dir(server_path: str) -> str:
+    """The level-name folder (server.properties is parsed once per modification)"""
+    level_name = read_server_properties(server_path).get("level-name") or "world"
+    return os.path.join(server_path, level_name)
+
 class PlayerStatsSyncer:
-    def __init__(self, server_path: str, server_id: int):
+    def __init__(self, server_path: str, server_id: int, session_factory=SessionLocal):
         self.server_path = server_path
         self.server_id = server_id
+        self.session_factory = session_factory
+        # file path -> (mtime_ns, size) at the last successful sync
+        self._synced: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def world_dir(self) -> str:
+        return get_world_dir(self.server_path)
+
+    def _changed(self, path: str) -> Optional[Tuple[int, int]]:
+        """Current (mtime_ns, size) if the file exists and changed since its last sync"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        signature = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if self._synced.get(path) == signature:
+                return None
+        return signature
 
-    def sync_player_stats(self, db: Session, player_uuid: str):
+    def sync_player_stats(self, db: Session, player_uuid: str) -> int:
         """
         Reads stats and advancements from the world folder and updates the DB.
+        Files unchanged since their last sync are skipped. Returns rows written.
         """
-        # 1. Stats (stats/uuid.json)
-        # Location: world/stats/uuid.json (Standard) or just "stats" in server root sometimes?
-        # Usually it's in the default level-name folder.
-        
-        # We need to find the world folder.
-        # Assuming server.properties "level-name"
-        level_name = "world"
-        props_path = os.path.join(self.server_path, "server.properties")
-        if os.path.exists(props_path):
-            try:
-                with open(props_path, "r") as f:
-                    for line in f:
-                        if line.strip().startswith("level-name="):
-                            level_name = line.strip().split("=")[1]
-            except: pass
-            
-        world_dir = os.path.join(self.server_path, level_name)
-        stats_file = os.path.join(world_dir, "stats", f"{player_uuid}.json")
-        
-        if os.path.exists(stats_file):
+        synced = {}
+        written = 0
+        if self._ensure_players(db, [player_uuid]):
+            written = self._sync_player(db, player_uuid, synced)
+        db.commit()
+        self._mark_synced(synced)
+        return written
+
+    def _sync_player(self, db: Session, player_uuid: str, synced: Dict[str, Tuple[int, int]]) -> int:
+        """Stage one player's changes in `db`; files read are added to `synced` (marked after commit)"""
+        world_dir = self.world_dir
+        written = 0
+        # 1. Stats (stats/uuid.json), 2. Advancements (advancements/uuid.json)
+        for folder, sync_file in (("stats", self._sync_stats_file),
+                                  ("advancements", self._sync_advancements_file)):
+            path = os.path.join(world_dir, folder, f"{player_uuid}.json")
+            signature = self._changed(path)
+            if not signature:
+                continue
             try:
-                self._sync_stats_file(db, player_uuid, stats_file)
-            except Exception as e:
-                logger.error(f"Failed to sync stats for {player_uuid}: {e}")
-
-        # 2. Advancements (advancements/uuid.json)
-        adv_file = os.path.join(world_dir, "advancements", f"{player_uuid}.json")
-        if os.path.exists(adv_file):
-             try:
-                self._sync_advancements_file(db, player_uuid, adv_file)
-             except Exception as e:
-                logger.error(f"Failed to sync advancements for {player_uuid}: {e}")
-
-    def _sync_stats_file(self, db: Session, player_uuid: str, stats_file: str):
+                written += sync_file(db, player_uuid, path)
+                synced[path] = signature
+            except (OSError, ValueError) as e:
+                # Unreadable or half-written file: retried on the next sync
+                logger.error(f"Failed to sync {folder} for {player_uuid}: {e}")
+        return written
+
+    def _usercache_names(self) -> Dict[str, str]:
+        """uuid -> name from the server's usercache.json"""
+        try:
+            with open(os.path.join(self.server_path, "usercache.json"), 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entries, list):
+            return {}
+        return {
+            entry["uuid"]: entry["name"] for entry in entries
+            if isinstance(entry, dict) and entry.get("uuid") and entry.get("name")
+        }
+
+    def _ensure_players(self, db: Session, player_uuids: List[str]) -> List[str]:
+        """
+        The UUIDs that have a players row to hang stats on. Missing rows are
+        created from usercache.json; players it doesn't know are left out (their
+        files stay unsynced and are retried once the player has joined).
+        """
+        known = {
+            player_uuid for (player_uuid,) in db.query(Player.uuid).filter(
+                Player.server_id == self.server_id, Player.uuid.in_(player_uuids)
+            )
+        }
+        missing = [player_uuid for player_uuid in player_uuids if player_uuid not in known]
+        if missing:
+            names = self._usercache_names()
+            rows = [
+                {"uuid": player_uuid, "server_id": self.server_id, "name": names[player_uuid]}
+                for player_uuid in missing if player_uuid in names
+            ]
+            upsert(db, Player, rows, ("uuid", "server_id"), ())
+            known.update(row["uuid"] for row in rows)
+            if len(rows) < len(missing):
+                logger.debug(f"Skipping stats of {len(missing) - len(rows)} unknown players on server {self.server_id}")
+        return [player_uuid for player_uuid in player_uuids if player_uuid in known]
+
+    def _mark_synced(self, synced: Dict[str, Tuple[int, int]]):
+        with self._lock:
+            self._synced.update(synced)
+
+    def _sync_stats_file(self, db: Session, player_uuid: str, stats_file: str) -> int:
         with open(stats_file, 'r') as f:
             data = json.load(f)
-            
+
         stats_data = data.get("stats", {})
-        
+
         # Flatten stats
         # Format: {"minecraft:custom": {"minecraft:jump": 10}, "minecraft:mined": {...}}
-        
-        # We want to store key="mined.stone", value=10
-        # or key="custom.jump", value=10
-        
+        # Stored as key="mined.stone", value=10 or key="custom.jump", value=10
+        values = {}
         for category, items in stats_data.items():
             cat_name = category.replace("minecraft:", "")
             for stat_key, value in items.items():
                 s_key = stat_key.replace("minecraft:", "")
-                full_key = f"{cat_name}.{s_key}"
-                
-                # Check exist
-                stat_entry = db.query(PlayerStat).filter_by(
-                    player_uuid=player_uuid,
-                    server_id=self.server_id,
-                    stat_key=full_key
-                ).first()
-                
-                if stat_entry:
-                    stat_entry.stat_value = value
-                else:
-                    new_stat = PlayerStat(
-                        player_uuid=player_uuid,
-                        server_id=self.server_id,
-                        stat_key=full_key,
-                        stat_value=value
-                    )
-                    db.add(new_stat)
-        
-        db.commit()
+                values[f"{cat_name}.{s_key}"] = value
+
+        # All of the player's stats in one query: stat_key -> (id, value)
+        existing = {
+            key: (stat_id, value) for stat_id, key, value in db.query(
+                PlayerStat.id, PlayerStat.stat_key, PlayerStat.stat_value
+            ).filter_by(player_uuid=player_uuid, server_id=self.server_id)
+        }
+
+        inserts, updates = [], []
+        for full_key, value in values.items():
+            current = existing.get(full_key)
+            if current is None:
+                inserts.append({
+                    "player_uuid": player_uuid,
+                    "server_id": self.server_id,
+                    "stat_key": full_key,
+                    "stat_value": value
+                })
+            elif current[1] != value:
+                updates.append({"id": current[0], "stat_value": value})
 
-    def _sync_advancements_file(self, db: Session, player_uuid: str, adv_file: str):
+        if inserts:
+            db.bulk_insert_mappings(PlayerStat, inserts)
+        if updates:
+            db.bulk_update_mappings(PlayerStat, updates)
+        return len(inserts) + len(updates)
+
+    def _sync_advancements_file(self, db: Session, player_uuid: str, adv_file: str) -> int:
         with open(adv_file, 'r') as f:
             data = json.load(f)
-            
+
         # Format: {"minecraft:story/mine_stone": {"done": true, "criteria": {...}}}
-        
+        recorded = {
+            achievement_id for (achievement_id,) in db.query(PlayerAchievement.achievement_id).filter_by(
+                player_uuid=player_uuid, server_id=self.server_id
+            )
+        }
+
+        new_rows = []
         for adv_id, info in data.items():
-            if not info.get("done", False):
+            # "DataVersion" is an int, not an advancement
+            if not isinstance(info, dict) or not info.get("done", False):
                 continue
-                
+
             # Formatting ID
             clean_id = adv_id.replace("minecraft:", "")
-            
-            # Check exist
-            entry = db.query(PlayerAchievement).filter_by(
-                player_uuid=player_uuid, 
-                server_id=self.server_id, 
-                achievement_id=clean_id
-            ).first()
-            
-            if not entry:
-                # Try to get a pretty name/desc? Hard without mapping.
-                # Just store ID for now.
-                new_adv = PlayerAchievement(
-                    player_uuid=player_uuid,
-                    server_id=self.server_id,
-                    achievement_id=clean_id,
-                    name=clean_id.split("/")[-1].replace("_", " ").title()
-                )
-                db.add(new_adv)
-        
-        db.commit()
+            if clean_id in recorded:
+                continue
+            recorded.add(clean_id)
+
+            # Try to get a pretty name/desc? Hard without mapping.
+            # Just store ID for now.
+            new_rows.append({
+                "player_uuid": player_uuid,
+                "server_id": self.server_id,
+                "achievement_id": clean_id,
+                "name": clean_id.split("/")[-1].replace("_", " ").title()
+            })
+
+        if new_rows:
+            db.bulk_insert_mappings(PlayerAchievement, new_rows)
+        return len(new_rows)
+
+    def known_uuids(self) -> List[str]:
+        """UUIDs with a stats or advancements file in the world folder"""
+        uuids = set()
+        world_dir = self.world_dir
+        for folder in ("stats", "advancements"):
+            try:
+                names = os.listdir(os.path.join(world_dir, folder))
+            except OSError:
+                continue
+            uuids.update(n[:-5] for n in names if n.endswith(".json"))
+        return sorted(uuids)
+
+    def sync_players(self, player_uuids: Iterable[str], workers: int = STATS_SYNC_WORKERS,
+                     batch_size: int = STATS_SYNC_BATCH) -> int:
+        """
+        Sync many players: batches of `batch_size` players run on `workers`
+        threads, each batch in its own session and transaction. Returns rows written.
+        """
+        player_uuids = list(player_uuids)
+        batches = [player_uuids[i:i + batch_size] for i in range(0, len(player_uuids), batch_size)]
+        if not batches:
+            return 0
+        if len(batches) == 1 or workers <= 1:
+            return sum(self._sync_batch(batch) for batch in batches)
+        with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+            return sum(pool.map(self._sync_batch, batches))
+
+    def sync_all(self) -> int:
+        """Sync every player in the world folder (unchanged files cost one stat() each)"""
+        return self.sync_players(self.known_uuids())
+
+    def _sync_batch(self, player_uuids: List[str]) -> int:
+        db = self.session_factory()
+        synced = {}
+        try:
+            written = sum(
+                self._sync_player(db, player_uuid, synced) for player_uuid in self._ensure_players(db, player_uuids)
+            )
+            db.commit()
+            self._mark_synced(synced)
+            return written
+        except Exception as e:
+            logger.error(f"Failed to sync stats batch of {len(player_uuids)} players: {e}")
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+
+
+_syncers: Dict[int, PlayerStatsSyncer] = {}
+_syncers_lock = threading.Lock()
+
+def get_stats_syncer(server_path: str, server_id: int) -> PlayerStatsSyncer:
+    """Shared syncer per server, so the mtime/size bookkeeping survives between syncs"""
+    with _syncers_lock:
+        syncer = _syncers.get(server_id)
+        if syncer is None or syncer.server_path != server_path:
+            syncer = _syncers[server_id] = PlayerStatsSyncer(server_path, server_id)
+        return syncer
@@ -2,25 +2,78 @@ import asyncio
 import os
 import psutil
 import subprocess
-import re
 import json
+import time
+from collections import deque
 from typing import Dict, Optional, List
 from datetime import datetime
 from asyncio import subprocess as async_subprocess
 from app.services.minecraft.player_manager import PlayerManager
+from app.services.minecraft.log_broadcaster import LogBroadcaster, LogSubscription
+from app.services.minecraft.liveness import process_watcher
+from app.services.minecraft.log_state import LogStateReader
+from app.services.minecraft.metrics_sampler import metrics_sampler
+from app.services.minecraft.activity_history import build_history_file
+from app.services.minecraft.activity_sink import ActivitySink, read_tail_lines
+from app.services.minecraft.launch_plan import LaunchPlanner
+from app.services.minecraft.log_index import LogIndex, get_log_index
+from app.services.minecraft.log_classifier import get_classifier
+from app.services.minecraft.rcon import rcon_pool, RconError, RconNotSent
+from app.services.minecraft.status_ping import status_poller
+from app.services.minecraft.query import query_poller
+from app.services.player_event_writer import player_event_writer, PERSISTED_TYPES
+
+# Max bytes buffered for a single stdout line (mod stack traces can be long)
+STDOUT_LINE_LIMIT = 1024 * 1024
+# Seconds without a "Done" marker before a STARTING server is assumed ONLINE
+STARTUP_ONLINE_FALLBACK = 60
+# Recent activity keys remembered for de-duplication
+ACTIVITY_DEDUP_WINDOW = 256
+# "rcon": use RCON for commands when the server enables it, "stdin": always use stdin
+COMMAND_TRANSPORT = os.getenv("COMMAND_TRANSPORT", "rcon").lower()
+
+def index_java_processes() -> Dict[str, int]:
+    """Map working directory -> PID for every running java process, in one process table pass"""
+    index = {}
+    try:
+        for p in psutil.process_iter(['pid', 'name', 'cwd']):
+            try:
+                if p.info['name'] and 'java' in p.info['name'].lower():
+                    p_cwd = p.info['cwd']
+                    if p_cwd:
+                        index.setdefault(os.path.abspath(p_cwd), p.info['pid'])
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                pass
+    except Exception as e:
+        print(f"Error scanning for PID: {e}")
+    return index
 
 class MinecraftProcess:
-    def __init__(self, name: str, ram_mb: int, jar_path: str, working_dir: str, masterbridge_config: Dict = None):
+    def __init__(self, name: str, ram_mb: int, jar_path: str, working_dir: str, masterbridge_config: Dict = None, mod_loader: str = "VANILLA", server_id: Optional[int] = None):
         self.name = name
+        self.server_id = server_id # Database id; player events are only persisted when known
         self.ram_mb = ram_mb
         self.jar_path = jar_path
         self.working_dir = working_dir
+        self.mod_loader = mod_loader
         self.process: Optional[async_subprocess.Process] = None
-        self.log_subscribers: List[asyncio.Queue] = []
+        # Liveness is tracked in memory and flipped once by the exit watchers
+        self._pid: Optional[int] = None
+        self._alive = False
+        self._exit_event = asyncio.Event()
+        self._log_state: Optional[LogStateReader] = None # Incremental latest.log state (recovered processes)
+        self.log_broadcaster = LogBroadcaster()
         self._status = "OFFLINE" # OFFLINE, STARTING, ONLINE, STOPPING
         self.current_players = 0
-        self.player_manager = PlayerManager()
-        self.recent_activity = [] # List of {type, user, reason, time}
+        self.player_manager = PlayerManager(mod_loader)
+        self.recent_activity = [] # List of {type, user, reason, time}; history merged in by load_activity_history()
+        self._activity_sink = ActivitySink(os.path.join(working_dir, "logs", "user_connections.log"))
+        # Dedup window for activity events: O(1) lookups instead of scanning recent_activity
+        self._activity_keys = set()
+        self._activity_order = deque(maxlen=ACTIVITY_DEDUP_WINDOW)
+        self._launch_planner = LaunchPlanner(working_dir)
+        self._log_index: Optional[LogIndex] = None # Opened on the first console line or search
+        self.launch_overhead_ms: Optional[float] = None # Time spent in start() before the JVM was exec'd
         
         # MasterBridge integration
         self.masterbridge_client = None
@@ -47,11 +100,12 @@ class MinecraftProcess:
                 self.masterbridge_client = None
         else:
             print(f"DEBUG: MasterBridge NOT enabled for {name} (config={masterbridge_config})")
-        
-        # Load activity history on startup
-        try:
-            self.load_activity_history()
-        except: pass
+
+    @property
+    def log_index(self) -> LogIndex:
+        if self._log_index is None:
+            self._log_index = get_log_index(self.name, self.working_dir)
+        return self._log_index
 
     @property
     def status(self):
@@ -65,10 +119,12 @@ class MinecraftProcess:
             print(f"Server {self.name} is already running.")
             return
 
+        launch_started = time.perf_counter()
         print(f"DEBUG: Starting server {self.name}")
         print(f"DEBUG: Working dir: {self.working_dir}")
         print(f"DEBUG: Jar path: {self.jar_path}")
         self._status = "STARTING"
+        self._log_state = None
 
         # Rotate latest.log to prevent reading old "Stopping" status
         log_file = os.path.join(self.working_dir, "logs", "latest.log")
@@ -81,74 +137,8 @@ class MinecraftProcess:
             except Exception as e:
                 print(f"WARN: Failed to rotate latest.log: {e}")
 
-        # --- FORGE STARTUP LOGIC ---
-        cmd = []
-        is_modern_forge = False
-        
-        # Check for modern Forge structure
-        args_file = os.path.join(self.working_dir, "user_jvm_args.txt")
-        run_bat = os.path.join(self.working_dir, "run.bat")
-        run_sh = os.path.join(self.working_dir, "run.sh")
-        
-        has_run_script = os.path.exists(run_bat) or os.path.exists(run_sh)
-        
-        if os.path.exists(args_file) and has_run_script:
-            is_modern_forge = True
-            
-            # --- Configure RAM in user_jvm_args.txt ---
-            # Read existing
-            lines = []
-            try:
-                with open(args_file, "r") as f:
-                    lines = f.readlines()
-            except: pass
-            
-            # Filter out old memory args
-            new_lines = [l for l in lines if not l.strip().startswith("-Xmx") and not l.strip().startswith("-Xms")]
-            
-            # Append new memory args (same for Xms and Xmx = best practice for Minecraft)
-            new_lines.append(f"\n-Xmx{self.ram_mb}M\n")
-            new_lines.append(f"-Xms{self.ram_mb}M\n")
-            
-            with open(args_file, "w") as f:
-                f.writelines(new_lines)
-                
-            # --- Construct Command ---
-            # Find the win_args.txt (or unix_args.txt)
-            win_args_path = None
-            libraries_dir = os.path.join(self.working_dir, "libraries")
-            if os.path.exists(libraries_dir):
-                for root, dirs, files in os.walk(libraries_dir):
-                    for file in files:
-                        if (file == "win_args.txt" or file == "unix_args.txt") and "minecraftforge" in root:
-                            win_args_path = os.path.join(root, file)
-                            break
-                    if win_args_path: break
-            
-            if win_args_path:
-                rel_win_args = os.path.relpath(win_args_path, self.working_dir)
-                cmd = [
-                    "java",
-                    # Memory args are in user_jvm_args.txt now, so we don't repeat them here
-                    f"@{os.path.basename(args_file)}",
-                    f"@{rel_win_args}",
-                    "nogui"
-                ]
-            else:
-                 print("DEBUG: Modern Forge detected but args file not found. Trying standard JAR start as fallback.")
-                 is_modern_forge = False # Fallback to jar
-        else:
-             is_modern_forge = False
-
-        if not is_modern_forge:
-             cmd = [
-                "java",
-                f"-Xmx{self.ram_mb}M",
-                f"-Xms{self.ram_mb}M",  # Same as Xmx for optimal performance
-                "-jar",
-                self.jar_path,
-                "nogui"
-            ]
+        # --- LAUNCH PLAN (cached Forge/JAR command resolution) ---
+        cmd = self._launch_planner.resolve(self.ram_mb, self.jar_path, self.mod_loader)
         
         print(f"DEBUG: Command: {' '.join(cmd)}")
         
@@ -158,16 +148,21 @@ class MinecraftProcess:
                 cwd=self.working_dir,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT
+                stderr=subprocess.STDOUT,
+                limit=STDOUT_LINE_LIMIT
             )
-            print(f"DEBUG: Process started with PID {self.process.pid}")
+            self.launch_overhead_ms = (time.perf_counter() - launch_started) * 1000
+            print(f"DEBUG: Process started with PID {self.process.pid} (manager overhead before exec: {self.launch_overhead_ms:.1f}ms)")
+            self._mark_alive(self.process.pid)
             
             # --- Persist PID ---
             pid_file = os.path.join(self.working_dir, "server.pid")
             with open(pid_file, "w") as f:
                 f.write(str(self.process.pid))
                 
-            asyncio.create_task(self._tail_log_file())
+            # stdout is the primary log source for processes we spawned;
+            # latest.log tailing is only used for recovered processes.
+            asyncio.create_task(self._read_stdout())
         except FileNotFoundError:
             print(f"Error: Working directory or Java not found for {self.name}")
             self.process = None
@@ -182,15 +177,41 @@ class MinecraftProcess:
         # Start background task to monitor process and ensure status cleanup
         asyncio.create_task(self._monitor_process())
 
+    def set_masterbridge(self, masterbridge_config: Optional[Dict]):
+        """Replace the MasterBridge client. Event loop thread only: it stops the old client's tasks."""
+        if self.masterbridge_client:
+            self.masterbridge_client.close()
+            self.masterbridge_client = None
+        if masterbridge_config and masterbridge_config.get('enabled'):
+            from app.services.minecraft.masterbridge_client import MasterBridgeClient
+            self.masterbridge_client = MasterBridgeClient(
+                ip=masterbridge_config.get('ip', '127.0.0.1'),
+                port=masterbridge_config.get('port', 8081)
+            )
+            self.masterbridge_client.start_stream()
+            print(f"INFO: MasterBridge client updated for {self.name}")
+        else:
+            print(f"INFO: MasterBridge client disabled for {self.name}")
+
+    def apply_settings(self, ram_mb: int, mod_loader: str):
+        """Take edited server settings; the launch plan's fingerprint picks them up on the next start"""
+        self.ram_mb = ram_mb
+        if mod_loader != self.mod_loader:
+            self.mod_loader = mod_loader
+            self.player_manager.classifier = get_classifier(mod_loader)
+
     async def _monitor_process(self):
         """Monitor process and ensure state is updated when it dies"""
         if not self.process:
             return
             
+        process = self.process
         try:
             # Wait for process to finish
-            await self.process.wait()
+            await process.wait()
             print(f"INFO: Process for {self.name} has terminated")
+            self._on_process_exit(process.pid)
+            await rcon_pool.close(self.name)
             
             # Give tail_log a moment to finish cleanup
             await asyncio.sleep(1)
@@ -215,7 +236,7 @@ class MinecraftProcess:
                 if self.process:
                     await asyncio.wait_for(self.process.wait(), timeout=10.0)
                 else:
-                    self._wait_for_pid_exit(timeout=10.0)
+                    await asyncio.wait_for(self._exit_event.wait(), timeout=10.0)
             except asyncio.TimeoutError:
                 print(f"WARN: Server {self.name} didn't stop gracefully, killing...")
                 self.kill()
@@ -226,17 +247,8 @@ class MinecraftProcess:
         except Exception as e:
             print(f"ERROR: Error stopping server {self.name}: {e}")
             self.kill()  # Force kill on error
+        await rcon_pool.close(self.name)
             
-    def _wait_for_pid_exit(self, timeout=10.0):
-        import time
-        start = time.time()
-        pid = self._get_pid()
-        if not pid: return
-        while time.time() - start < timeout:
-            if not psutil.pid_exists(pid):
-                return
-            time.sleep(0.5)
-
     def kill(self):
         print(f"INFO: Force killing server {self.name}")
         pid = self._get_pid()
@@ -257,10 +269,30 @@ class MinecraftProcess:
             except: pass
         self.process = None
         self._status = "OFFLINE"
+        status_poller.forget(self.name)
+        query_poller.forget(self.name)
+        if self._pid:
+            process_watcher.unwatch(self._pid)
+        self._pid = None
+        self._alive = False
+        self._exit_event.set()
         print(f"INFO: Cleanup complete for {self.name} - status set to OFFLINE")
 
+    def _mark_alive(self, pid: int):
+        self._pid = pid
+        self._alive = True
+        self._exit_event = asyncio.Event()
+
+    def _on_process_exit(self, pid: int):
+        """Called exactly once per process by the exit watcher"""
+        if pid != self._pid:
+            return # A newer process has replaced it already
+        self._alive = False
+        self._exit_event.set()
+
     def _get_pid(self):
         if self.process: return self.process.pid
+        if self._pid: return self._pid
         pid_file = os.path.join(self.working_dir, "server.pid")
         if os.path.exists(pid_file):
             try:
@@ -269,34 +301,44 @@ class MinecraftProcess:
             except: pass
         return None
 
-    async def write(self, command: str):
+    async def write(self, command: str) -> Optional[str]:
+        """
+        Run a console command. Goes through RCON when server.properties enables it
+        (returning the response text), otherwise through stdin (returning None).
+        """
+        if COMMAND_TRANSPORT == "rcon" and self.is_running():
+            client = rcon_pool.get(self.name, self.working_dir)
+            if client:
+                try:
+                    response = await client.command(command)
+                    # RCON output doesn't reach the console log; show it to console viewers
+                    for line in response.splitlines():
+                        self.log_broadcaster.publish(f"[RCON] {line}")
+                    return response
+                except RconNotSent as e:
+                    print(f"DEBUG: {e}; sending '{command}' to {self.name} via stdin")
+                except RconError as e:
+                    # The command may already have run, so it is not sent a second time
+                    print(f"WARN: RCON command on {self.name} failed: {e}")
+                    return None
+
         if self.process and self.process.stdin:
             self.process.stdin.write(f"{command}\n".encode())
             await self.process.stdin.drain()
         else:
-            print(f"WARNING: Cannot write to {self.name} (Recovered process has no stdin access)")
+            print(f"WARNING: Cannot write to {self.name} (Recovered process has no stdin access and RCON is not enabled)")
+        return None
 
-    def _add_activity(self, type: str, user: str, reason: str = None, timestamp: str = None):
-         if not hasattr(self, 'recent_activity'): self.recent_activity = []
-         
+    def _add_activity(self, type: str, user: str, reason: str = None, timestamp: str = None) -> bool:
+         """Record an activity entry. Returns False if it duplicates a recent one."""
          if not timestamp:
              timestamp = datetime.now().isoformat()
          
-         is_dup = False
-         for item in self.recent_activity[:10]: # Check last 10
-             if item['type'] == type and item['user'] == user and item['timestamp'] == timestamp:
-                 is_dup = True
-                 break
-         
-         if is_dup: return
+         if not self._remember_activity((type, user, timestamp)):
+             return False
 
-         log_file = os.path.join(self.working_dir, "logs", "user_connections.log")
-         try:
-             os.makedirs(os.path.dirname(log_file), exist_ok=True)
-             with open(log_file, "a", encoding="utf-8") as f:
-                 f.write(f"{timestamp} | {type} | {user} | {reason or ''}\n")
-         except Exception as e:
-             print(f"WARN: Failed to write to activity log: {e}")
+         # Buffered; flushed to user_connections.log by a background task
+         self._activity_sink.write(f"{timestamp} | {type} | {user} | {reason or ''}\n")
 
          self.recent_activity.insert(0, {
              "type": type,
@@ -306,13 +348,28 @@ class MinecraftProcess:
          })
          if len(self.recent_activity) > 50:
              self.recent_activity.pop()
+         return True
+    
+    def _remember_activity(self, key) -> bool:
+        """Add key to the recent-activity dedup window. Returns False if it was already seen."""
+        if key in self._activity_keys:
+            return False
+        if len(self._activity_order) == self._activity_order.maxlen:
+            self._activity_keys.discard(self._activity_order[0])
+        self._activity_order.append(key)
+        self._activity_keys.add(key)
+        return True
+
+    def flush_activity(self):
+        """Write buffered activity lines now (used on shutdown)"""
+        self._activity_sink.flush_sync()
     
     # --- Player Management Methods ---
-    def get_online_players(self):
+    async def get_online_players(self):
         # Try MasterBridge first if enabled
         if self.masterbridge_client:
             try:
-                mb_players = self.masterbridge_client.get_players()
+                mb_players = await self.masterbridge_client.get_players()
                 if mb_players is not None:
                     # Transform MasterBridge format to expected format
                     result = []
@@ -334,11 +391,28 @@ class MinecraftProcess:
             except Exception as e:
                 print(f"WARN: MasterBridge get_players failed for {self.name}: {e}, falling back to log parsing")
         
+        # UDP Query: authoritative name list whenever the server exposes the query port
+        query_players = query_poller.get_players(self.name)
+        if query_players is not None:
+            self._reconcile_players(query_players)
+            return self.player_manager.get_players()
+        
         # Fallback to log parsing
         players = self.player_manager.get_players()
         print(f"DEBUG: Process {self.name} get_online_players (log parsing): {len(players)} players ({players})")
         return players
     
+    def _reconcile_players(self, names: List[str]):
+        """Make player_manager match an authoritative player list, keeping known details"""
+        online = set(names)
+        for username in [p["username"] for p in self.player_manager.get_players()]:
+            if username not in online:
+                self.player_manager.remove_player(username)
+        for username in names:
+            if not self.player_manager.get_player(username):
+                self.player_manager.add_player(username, {'joined_at': None, 'uuid': None})
+        self.current_players = len(online)
+
     async def kick_player(self, username: str):
         if not self.is_running() or self._status != "ONLINE":
             return False
@@ -346,7 +420,7 @@ class MinecraftProcess:
         # Try MasterBridge first
         if self.masterbridge_client:
             try:
-                if self.masterbridge_client.kick_player(username):
+                if await self.masterbridge_client.kick_player(username):
                     print(f"INFO: Kicked player {username} from {self.name} via MasterBridge")
                     return True
             except Exception as e:
@@ -363,7 +437,7 @@ class MinecraftProcess:
         # Try MasterBridge first
         if self.masterbridge_client:
             try:
-                if self.masterbridge_client.ban_player(username, reason):
+                if await self.masterbridge_client.ban_player(username, reason):
                     print(f"INFO: Banned player {username} from {self.name} via MasterBridge")
                     # We still update local files for redundancy
             except Exception as e:
@@ -484,7 +558,7 @@ class MinecraftProcess:
         # MasterBridge unban
         if self.masterbridge_client:
             try:
-                self.masterbridge_client.unban_player(username)
+                await self.masterbridge_client.unban_player(username)
             except: pass
 
         # Run command if online
@@ -551,7 +625,7 @@ class MinecraftProcess:
         """Send a chat message to the game via MasterBridge API"""
         if self.masterbridge_client:
             try:
-                success = self.masterbridge_client.send_chat_message(text)
+                success = await self.masterbridge_client.send_chat_message(text)
                 if success:
                     print(f"INFO: Sent chat message to {self.name} via MasterBridge: {text}")
                     return True
@@ -566,28 +640,26 @@ class MinecraftProcess:
     # --- MasterBridge Event Triggers ---
     async def trigger_event(self, context_data: Dict) -> bool:
         if self.masterbridge_client:
-             return self.masterbridge_client.trigger_event(context_data)
+             return await self.masterbridge_client.trigger_event(context_data)
         return False
         
     async def trigger_cinematic(self, type_name: str, target: str, difficulty: int = 1) -> bool:
         if self.masterbridge_client:
-             return self.masterbridge_client.trigger_cinematic(type_name, target, difficulty)
+             return await self.masterbridge_client.trigger_cinematic(type_name, target, difficulty)
         return False
 
     async def trigger_paranoia(self, target: str, duration: int = 60) -> bool:
         if self.masterbridge_client:
-             return self.masterbridge_client.trigger_paranoia(target, duration)
+             return await self.masterbridge_client.trigger_paranoia(target, duration)
         return False
 
     async def trigger_special_event(self, event_type: str, target: str) -> bool:
         if self.masterbridge_client:
-             return self.masterbridge_client.trigger_special_event(event_type, target)
+             return await self.masterbridge_client.trigger_special_event(event_type, target)
         return False
 
     def is_process_alive(self):
-        pid = self._get_pid()
-        if not pid: return False
-        return psutil.pid_exists(pid)
+        return self._alive
 
     def is_running(self):
         return self.is_process_alive()
@@ -610,77 +682,122 @@ class MinecraftProcess:
         return None
 
     def _initialize_history_file(self, target_file):
-        import gzip
-        import glob
-        
-        log_dir = os.path.join(self.working_dir, "logs")
-        if not os.path.exists(log_dir): return
-        
-        os.makedirs(os.path.dirname(target_file), exist_ok=True)
-        
-        gz_files = glob.glob(os.path.join(log_dir, "*.log.gz"))
-        gz_files.sort(key=os.path.getmtime, reverse=True)
-        gz_to_read = gz_files[:10]
-        
-        events = []
-        
-        for gz_file in reversed(gz_to_read):
-            try:
-                base = os.path.basename(gz_file)
-                date_part = base.split('.')[0].rsplit('-', 1)[0]
-                if not re.match(r'\d{4}-\d{2}-\d{2}', date_part):
-                     date_part = datetime.fromtimestamp(os.path.getmtime(gz_file)).strftime('%Y-%m-%d')
-                
-                with gzip.open(gz_file, 'rt', encoding='utf-8', errors='replace') as f:
-                    for line in f:
-                        event = self._parse_line_event(line, default_date=date_part)
-                        if event:
-                            events.append(event)
-            except Exception as e:
-                print(f"WARN: Failed to process archive {gz_file}: {e}")
-
-        latest_log = os.path.join(log_dir, "latest.log")
-        if os.path.exists(latest_log):
-             try:
-                date_part = datetime.fromtimestamp(os.path.getmtime(latest_log)).strftime('%Y-%m-%d')
-                with open(latest_log, 'r', encoding='utf-8', errors='replace') as f:
-                    for line in f:
-                        event = self._parse_line_event(line, default_date=date_part)
-                        if event:
-                            events.append(event)
-             except Exception as e:
-                 print(f"WARN: Failed to process latest.log for history: {e}")
-                
+        build_history_file(self.working_dir, target_file, self.mod_loader)
+
+    async def load_activity_history(self):
+        """Load the recent activity history without blocking the event loop"""
         try:
-            with open(target_file, "w", encoding="utf-8") as f:
-                for e in events:
-                    f.write(f"{e.get('timestamp')} | {e.get('type')} | {e.get('user')} | {e.get('reason')}\n")
+            entries = await asyncio.get_running_loop().run_in_executor(None, self.read_activity_history)
         except Exception as e:
-            print(f"ERROR: Could not write history file: {e}")
-
-    def load_activity_history(self):
+            print(f"WARN: Failed to load activity history for {self.name}: {e}")
+            return
+        # Merged on the loop: events seen live in the meantime are newer and stay first
+        for entry in entries:
+            if self._remember_activity((entry["type"], entry["user"], entry["timestamp"])):
+                self.recent_activity.append(entry)
+        del self.recent_activity[50:]
+
+    def read_activity_history(self) -> List[Dict]:
+        """Newest-first entries of user_connections.log, building it from the logs if missing (blocking)"""
         log_file = os.path.join(self.working_dir, "logs", "user_connections.log")
         if not os.path.exists(log_file):
             self._initialize_history_file(log_file)
             
+        entries = []
         if os.path.exists(log_file):
-            try:
-                with open(log_file, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-                    self.recent_activity = []
-                    for line in reversed(lines[-100:]):
-                        parts = line.strip().split(" | ")
-                        if len(parts) >= 3:
-                            self.recent_activity.append({
-                                "timestamp": parts[0],
-                                "type": parts[1],
-                                "user": parts[2],
-                                "reason": parts[3] if len(parts) > 3 else None
-                            })
-            except Exception as e:
-                print(f"WARN: Failed to load activity history: {e}")
+            # Only the tail is needed; don't read years of history into memory
+            lines = read_tail_lines(log_file, 100)
+            for line in reversed(lines):
+                parts = line.strip().split(" | ")
+                if len(parts) >= 3:
+                    entries.append({
+                        "timestamp": parts[0],
+                        "type": parts[1],
+                        "user": parts[2],
+                        "reason": parts[3] if len(parts) > 3 else None
+                    })
+        return entries
+
+    async def _read_stdout(self):
+        """Read console output straight from the JVM stdout pipe"""
+        process = self.process
+        if not process or not process.stdout:
+            return
+
+        loop = asyncio.get_event_loop()
+        fallback = loop.call_later(STARTUP_ONLINE_FALLBACK, self._mark_online_if_starting)
+
+        try:
+            while True:
+                try:
+                    line = await process.stdout.readline()
+                except ValueError:
+                    # Line exceeded STDOUT_LINE_LIMIT; the reader already discarded it
+                    print(f"WARN: Dropped oversized console line for {self.name}")
+                    continue
+
+                if not line:
+                    break
+
+                cleaned_line = line.decode('utf-8', errors='replace').strip()
+                if cleaned_line:
+                    self._handle_log_line(cleaned_line)
+        except Exception as e:
+            print(f"ERROR: Error reading stdout for {self.name}: {e}")
+        finally:
+            fallback.cancel()
+
+        # EOF on stdout means the JVM closed its end; wait for the exit code
+        try:
+            await process.wait()
+        except Exception:
+            pass
+
+        print(f"INFO: Console stream finished for {self.name}, calling cleanup")
+        if self.process is process:
+            self._cleanup_pid()
+        self.current_players = 0
+
+    def _mark_online_if_starting(self):
+        if self._status == "STARTING" and self.is_running():
+            print(f"INFO: Server {self.name} running for >{STARTUP_ONLINE_FALLBACK}s without errors, setting to ONLINE")
+            self._status = "ONLINE"
+
+    def _handle_log_line(self, cleaned_line: str):
+        """Update status/player state from a console line and fan it out to subscribers"""
+        print(f"[{self.name}] {cleaned_line}")
+        
+        if "Done (" in cleaned_line:
+            print(f"INFO: Server {self.name} is now ONLINE")
+            self._status = "ONLINE"
+        elif "Dedicated server took" in cleaned_line:
+            print(f"INFO: Server {self.name} is now ONLINE (Forge detected)")
+            self._status = "ONLINE"
+        elif "Server started" in cleaned_line:
+            print(f"INFO: Server {self.name} is now ONLINE (generic detection)")
+            self._status = "ONLINE"
+        elif "Stopping server" in cleaned_line or "Stopping the server" in cleaned_line:
+            self._status = "STOPPING"
+            print(f"INFO: Server {self.name} is now STOPPING")
+        
+        event = self._parse_line_event(cleaned_line)
+        if event:
+            # "logged in"/"joined" and "lost connection"/"left" pairs dedupe to one event
+            is_new = self._add_activity(event['type'], event['user'], event.get('reason'), event.get('timestamp'))
+            if is_new and self.server_id is not None and event['type'] in PERSISTED_TYPES:
+                self._persist_event(event)
+
+        self.log_broadcaster.publish(cleaned_line)
+        self.log_index.append(cleaned_line)
+
+    def _persist_event(self, event: Dict):
+        """Queue the event for the batched database writer (see player_event_writer)"""
+        # IP is only known while the player is in memory, i.e. right now
+        player = self.player_manager.get_player(event['user'])
+        player_event_writer.enqueue(self.server_id, event, player.get('ip') if player else None)
 
     async def _tail_log_file(self):
+        """Fallback log source for recovered processes whose stdout we don't own"""
         log_file_path = os.path.join(self.working_dir, "logs", "latest.log")
         start_time = asyncio.get_event_loop().time()
         
@@ -695,8 +812,9 @@ class MinecraftProcess:
 
         try:
             with open(log_file_path, "r", encoding='utf-8', errors='replace') as f:
-                # Always start from beginning since we rotated the log
-                f.seek(0)
+                # Lines already in the file were handled by the previous manager run;
+                # status and online players come from LogStateReader in get_stats()
+                f.seek(0, os.SEEK_END)
                 
                 while self.is_running():
                     line = f.readline()
@@ -706,35 +824,14 @@ class MinecraftProcess:
                     
                     if not line:
                         await asyncio.sleep(0.5)
-                        if self._status == "STARTING" and (asyncio.get_event_loop().time() - start_time) > 60:
-                            print(f"INFO: Server {self.name} running for >60s without errors, setting to ONLINE")
+                        if self._status == "STARTING" and (asyncio.get_event_loop().time() - start_time) > STARTUP_ONLINE_FALLBACK:
+                            print(f"INFO: Server {self.name} running for >{STARTUP_ONLINE_FALLBACK}s without errors, setting to ONLINE")
                             self._status = "ONLINE"
                         if not self.is_running(): 
                             break
                         continue
                         
-                    cleaned_line = line.strip()
-                    print(f"[{self.name}] {cleaned_line}")
-                    
-                    if "Done (" in cleaned_line:
-                        print(f"INFO: Server {self.name} is now ONLINE")
-                        self._status = "ONLINE"
-                    elif "Dedicated server took" in cleaned_line:
-                        print(f"INFO: Server {self.name} is now ONLINE (Forge detected)")
-                        self._status = "ONLINE"
-                    elif "Server started" in cleaned_line:
-                        print(f"INFO: Server {self.name} is now ONLINE (generic detection)")
-                        self._status = "ONLINE"
-                    elif "Stopping server" in cleaned_line or "Stopping the server" in cleaned_line:
-                        self._status = "STOPPING"
-                        print(f"INFO: Server {self.name} is now STOPPING")
-                    
-                    event = self._parse_line_event(cleaned_line)
-                    if event:
-                        self._add_activity(event['type'], event['user'], event.get('reason'), event.get('timestamp'))
-
-                    for queue in self.log_subscribers:
-                        await queue.put(cleaned_line)
+                    self._handle_log_line(line.strip())
                         
         except Exception as e:
             print(f"ERROR: Error tailing log for {self.name}: {e}")
@@ -743,109 +840,93 @@ class MinecraftProcess:
         self._cleanup_pid()
         self.current_players = 0
 
-    def subscribe_logs(self) -> asyncio.Queue:
-        q = asyncio.Queue()
-        self.log_subscribers.append(q)
-        return q
+    def subscribe_logs(self, replay: bool = False) -> LogSubscription:
+        return self.log_broadcaster.subscribe(replay)
 
-    def unsubscribe_logs(self, q: asyncio.Queue):
-        if q in self.log_subscribers:
-            self.log_subscribers.remove(q)
+    def unsubscribe_logs(self, sub: LogSubscription):
+        self.log_broadcaster.unsubscribe(sub)
 
     def get_stats(self):
         pid = self._get_pid()
         
-        if not pid or not psutil.pid_exists(pid):
+        if not pid or not self.is_process_alive():
             self._status = "OFFLINE"
             return {"status": "OFFLINE", "cpu": 0, "ram": 0, "players": 0}
         
-        log_file = os.path.join(self.working_dir, "logs", "latest.log")
-        status_from_log = "STARTING"  
         players_from_log = 0
-        
-        if not self.process and os.path.exists(log_file):
+        # Server List Ping / UDP Query results from the background pollers (None if no recent answer)
+        ping = status_poller.get(self.name)
+        query = query_poller.get(self.name)
+        
+        if ping or query:
+            # Servers only answer status pings and queries once they finished starting
+            if self._status == "STARTING":
+                print(f"INFO: Server {self.name} is now ONLINE (status ping/query)")
+                self._status = "ONLINE"
+        elif not self.process:
+            # Recovered process: derive state from latest.log, parsing only new bytes
             try:
-                with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    f.seek(0, os.SEEK_END)
-                    file_size = f.tell()
-                    # Read more of log for player tracking (last 50KB)
-                    f.seek(max(0, file_size - 50000))
-                    tail = f.read()
-                    
-                    lines = tail.strip().split('\n')
-                    
-                    has_done = False
-                    has_stopping = False
-                    has_terminated = False
-                    
-                    # Track players if player_manager is empty (recovery mode)
-                    temp_online = set()
-                    
-                    for line in lines:
-                        if "Done (" in line or "Done preparing level" in line:
-                            has_done = True
-                        if "Stopping server" in line or "Stopping the server" in line:
-                            has_stopping = True
-                        if "Awaiting termination" in line or "All RegionFile I/O tasks to complete" in line:
-                            has_terminated = True
-                        
-                        # Parse player join/leave from log
-                        if " joined the game" in line:
-                            match = re.search(r':\s*(\S+)\s+joined the game', line)
-                            if match:
-                                temp_online.add(match.group(1))
-                        if " left the game" in line or " lost connection:" in line:
-                            match = re.search(r':\s*(\S+)\s+(?:left the game|lost connection)', line)
-                            if match:
-                                temp_online.discard(match.group(1))
-                    
-                    if has_terminated or has_stopping:
-                        status_from_log = "STOPPING"
-                        if has_terminated:  
-                            self._status = "OFFLINE"
-                            return {"status": "OFFLINE", "cpu": 0, "ram": 0, "players": 0}
-                    elif has_done:
-                        status_from_log = "ONLINE"
-                    else:
-                        status_from_log = "STARTING"
-                    
-                    self._status = status_from_log
-                    
-                    # Use temp count if player_manager is empty (orphan recovery)
-                    if self.player_manager.get_count() == 0 and len(temp_online) > 0:
-                        players_from_log = len(temp_online)
-                        # Sync to player_manager for consistent API response
-                        for p in temp_online:
-                            # Use add_player for thread safety
-                            self.player_manager.add_player(p, {'joined_at': datetime.now().isoformat(), 'uuid': 'unknown'})
+                if self._log_state is None:
+                    log_file = os.path.join(self.working_dir, "logs", "latest.log")
+                    self._log_state = LogStateReader(log_file, self.mod_loader)
+                state = self._log_state.poll()
+                
+                if state is None:
+                    pass # No latest.log yet, keep the current status
+                elif state.status == "OFFLINE":
+                    self._status = "OFFLINE"
+                    return {"status": "OFFLINE", "cpu": 0, "ram": 0, "players": 0}
+                else:
+                    self._status = state.status
+                
+                # Use log count if player_manager is empty (orphan recovery)
+                if state and self.player_manager.get_count() == 0 and state.online:
+                    players_from_log = len(state.online)
+                    # Sync to player_manager for consistent API response
+                    for p in state.online:
+                        # Use add_player for thread safety
+                        self.player_manager.add_player(p, {'joined_at': datetime.now().isoformat(), 'uuid': 'unknown'})
                         
             except Exception as e:
                 print(f"ERROR: Could not read log file for {self.name}: {e}")
         
         try:
-            sys_proc = psutil.Process(pid)
-            with sys_proc.oneshot():
-                cpu = sys_proc.cpu_percent()
-                mem = int(sys_proc.memory_info().rss / (1024 * 1024))
+            # Served from the background sampler; only the very first poll after start reads psutil
+            sample = metrics_sampler.get_latest(self.name, pid)
+            if sample:
+                cpu = sample["cpu"]
+                mem = int(sample["ram"])
+            else:
+                cpu = 0.0
+                mem = int(psutil.Process(pid).memory_info().rss / (1024 * 1024))
             
-            # Use player_manager count, or recovered count from log
+            # Status ping count, else player_manager count, or recovered count from log
             player_count = self.current_players
-            if player_count == 0 and players_from_log > 0:
+            if query:
+                player_count = query["players_online"]
+            elif ping:
+                player_count = ping["players_online"]
+            elif player_count == 0 and players_from_log > 0:
                 player_count = players_from_log
                 self.current_players = players_from_log  # Update for next call
             
-            stats = {"status": self._status, "cpu": cpu, "ram": mem, "players": player_count, "recent_activity": getattr(self, 'recent_activity', [])}
+            stats = {"status": self._status, "cpu": cpu, "ram": mem, "players": player_count, "recent_activity": getattr(self, 'recent_activity', []), "launch_overhead_ms": self.launch_overhead_ms}
+            if ping:
+                stats["ping"] = ping
+            if query:
+                stats["query"] = query
             
-            # Merge MasterBridge data if available
+            # Merge MasterBridge data if available (last known status, no request from here)
             if self.masterbridge_client:
-                try:
-                    mb_stats = self.masterbridge_client.get_server_stats()
-                    if mb_stats:
-                        stats['mb_ram_used'] = mb_stats.get('ram_used_mb')
-                        stats['mb_ram_max'] = mb_stats.get('ram_max_mb')
-                        stats['mb_tick_time'] = mb_stats.get('tick_time')
-                except Exception as e:
-                    pass  # Silently fail, regular stats are still valid
+                mb_stats = self.masterbridge_client.last_server_status
+                if mb_stats:
+                    stats['mb_ram_used'] = mb_stats.get('ram_used_mb')
+                    stats['mb_ram_max'] = mb_stats.get('ram_max_mb')
+                    stats['mb_tick_time'] = mb_stats.get('tick_time', mb_stats.get('mspt'))
+                stats['mb_cache'] = self.masterbridge_client.cache_stats()
+                stats['mb_health'] = self.masterbridge_client.health()
+                if self.masterbridge_client.stream and self.masterbridge_client.stream.enabled:
+                    stats['mb_stream'] = self.masterbridge_client.stream.stats()
             
             return stats
         except psutil.NoSuchProcess:
@@ -853,25 +934,20 @@ class MinecraftProcess:
             return {"status": "OFFLINE", "cpu": 0, "ram": 0, "players": 0}
 
     def _find_pid_by_scanning(self):
-        try:
-            current_cwd = os.path.abspath(self.working_dir)
-            for p in psutil.process_iter(['pid', 'name', 'cwd']):
-                try:
-                    if p.info['name'] and 'java' in p.info['name'].lower():
-                        p_cwd = p.info['cwd']
-                        if p_cwd and os.path.abspath(p_cwd) == current_cwd:
-                            return p.info['pid']
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    pass
-        except Exception as e:
-            print(f"Error scanning for PID: {e}")
-        return None
+        return index_java_processes().get(os.path.abspath(self.working_dir))
 
-    def attempt_recovery(self):
+    def attempt_recovery(self, java_processes: Dict[str, int] = None):
+        """
+        Re-attach to a server that is still running from a previous manager run.
+        `java_processes` is a prebuilt index_java_processes() result shared by all servers.
+        """
         pid = self._get_pid()
         
         if not pid:
-            pid = self._find_pid_by_scanning()
+            if java_processes is not None:
+                pid = java_processes.get(os.path.abspath(self.working_dir))
+            else:
+                pid = self._find_pid_by_scanning()
             if pid:
                 print(f"DEBUG: Found orphaned server process {pid} for {self.name}")
                 try:
@@ -880,7 +956,11 @@ class MinecraftProcess:
                 except: pass
                 
         if pid and psutil.pid_exists(pid):
-            return True
+            self._mark_alive(pid)
+            # Not our child: the shared poller reports when it exits
+            if process_watcher.watch(pid, lambda: self._on_process_exit(pid)):
+                return True
+            self._alive = False
         
         if pid: self._cleanup_pid()
         return False
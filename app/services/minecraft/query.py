@@ -0,0 +1,216 @@
+"""
+UDP Query Client
+GameSpy4 "full stat" queries (enable-query=true in server.properties) return
+the complete player list, plugins and map in one UDP exchange. A single
+datagram socket serves every server: requests are matched to responses by
+session id, challenge tokens are cached per port, and one background sweep
+queries all servers at once. Results are cached with a short TTL.
+"""
+import asyncio
+import itertools
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.services.minecraft.server_properties import read_server_properties, get_bool, get_int
+
+# Seconds between sweeps
+QUERY_INTERVAL = float(os.getenv("QUERY_INTERVAL", "3"))
+# Results older than this are treated as missing
+QUERY_TTL = float(os.getenv("QUERY_TTL", str(2 * QUERY_INTERVAL)))
+# Deadline for a single server's handshake + stat exchange
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "1.5"))
+# Servers rotate tokens every 30s; refresh a little earlier
+TOKEN_LIFETIME = 25
+
+MAGIC = b"\xFE\xFD"
+TYPE_HANDSHAKE = 0x09
+TYPE_STAT = 0x00
+# Full stat responses start with "splitnum\0\x80\0" and the player section with "\x01player_\0\0"
+STAT_PADDING = 11
+PLAYER_PADDING = 10
+
+
+def parse_full_stat(data: bytes) -> Dict:
+    """Body of a full stat response (after type and session id)"""
+    body = data[STAT_PADDING:]
+    info_part, _, player_part = body.partition(b"\x00\x00\x01player_\x00\x00")
+    fields = info_part.split(b"\x00")
+    info = {}
+    for i in range(0, len(fields) - 1, 2):
+        info[fields[i].decode("latin-1")] = fields[i + 1].decode("utf-8", errors="replace")
+
+    players = [p.decode("utf-8", errors="replace") for p in player_part.split(b"\x00") if p]
+
+    # "plugins" is "<server software>: <plugin>; <plugin>" (empty on vanilla)
+    plugins_raw = info.get("plugins", "")
+    software, _, plugin_list = plugins_raw.partition(":")
+    plugins = [p.strip() for p in plugin_list.split(";") if p.strip()]
+
+    return {
+        "motd": info.get("hostname"),
+        "game_type": info.get("gametype"),
+        "version": info.get("version"),
+        "software": software.strip() or None,
+        "plugins": plugins,
+        "map": info.get("map"),
+        "players_online": int(info.get("numplayers") or 0),
+        "players_max": int(info.get("maxplayers") or 0),
+        "players": players,
+        "time": time.time(),
+    }
+
+
+def session_id_for(counter: int) -> int:
+    """
+    Session id for the n-th request. Servers only keep the low nibble of each
+    byte, so the counter's low 16 bits are spread over those nibbles: 65536
+    distinct ids before they repeat.
+    """
+    counter &= 0xFFFF
+    return ((counter & 0xF) | (counter >> 4 & 0xF) << 8
+            | (counter >> 8 & 0xF) << 16 | (counter >> 12 & 0xF) << 24)
+
+
+class _QueryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client: "QueryClient"):
+        self.client = client
+
+    def datagram_received(self, data: bytes, addr):
+        self.client._on_datagram(data, addr)
+
+    def error_received(self, exc):
+        # ICMP port unreachable etc.; the waiting request just times out
+        pass
+
+
+class QueryClient:
+    """All queries go through one UDP socket"""
+
+    def __init__(self, timeout: float = QUERY_TIMEOUT):
+        self.timeout = timeout
+        self._transport = None
+        self._sessions = itertools.count(1)
+        # (server address, session id) -> future of the response
+        self._waiting: Dict[Tuple[Tuple[str, int], int], asyncio.Future] = {}
+        self._tokens: Dict[Tuple[str, int], Tuple[int, float]] = {}
+
+    async def _ensure_socket(self):
+        if self._transport is None or self._transport.is_closing():
+            loop = asyncio.get_running_loop()
+            self._transport, _ = await loop.create_datagram_endpoint(
+                lambda: _QueryProtocol(self), local_addr=("0.0.0.0", 0)
+            )
+
+    def _on_datagram(self, data: bytes, addr):
+        if len(data) < 5:
+            return
+        session_id = struct.unpack(">i", data[1:5])[0]
+        future = self._waiting.pop((tuple(addr[:2]), session_id), None)
+        if future and not future.done():
+            future.set_result(data)
+
+    async def _request(self, addr: Tuple[str, int], packet_type: int, payload: bytes) -> bytes:
+        session_id = session_id_for(next(self._sessions))
+        key = (addr, session_id)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[key] = future
+        try:
+            self._transport.sendto(MAGIC + bytes([packet_type]) + struct.pack(">i", session_id) + payload, addr)
+            return await future
+        finally:
+            if self._waiting.get(key) is future:
+                del self._waiting[key]
+
+    async def _token(self, addr: Tuple[str, int]) -> int:
+        cached = self._tokens.get(addr)
+        if cached and time.time() - cached[1] < TOKEN_LIFETIME:
+            return cached[0]
+        data = await self._request(addr, TYPE_HANDSHAKE, b"")
+        token = int(data[5:].split(b"\x00")[0])
+        self._tokens[addr] = (token, time.time())
+        return token
+
+    async def full_stat(self, host: str, port: int) -> Dict:
+        await self._ensure_socket()
+        addr = (host, port)
+        token = await self._token(addr)
+        try:
+            data = await self._request(addr, TYPE_STAT, struct.pack(">i", token) + b"\x00\x00\x00\x00")
+        except asyncio.CancelledError:
+            # Most likely an expired token was ignored; get a new one next time
+            self._tokens.pop(addr, None)
+            raise
+        return parse_full_stat(data[5:])
+
+    async def query_many(self, targets: Dict[str, Tuple[str, int]]) -> Dict[str, Dict]:
+        """name -> result for every target that answered before its deadline"""
+        names = list(targets)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self.full_stat(*targets[n]), timeout=self.timeout) for n in names),
+            return_exceptions=True
+        )
+        return {n: r for n, r in zip(names, results) if isinstance(r, dict)}
+
+    def close(self):
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+
+class QueryPoller:
+    def __init__(self, interval: float = QUERY_INTERVAL):
+        self.interval = interval
+        self.client = QueryClient()
+        self._results: Dict[str, Dict] = {}
+        self._processes = None
+        self._task = None
+
+    def start(self, processes: Dict):
+        """Start sweeping. `processes` is the live name -> MinecraftProcess registry."""
+        self._processes = processes
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+        self.client.close()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"ERROR: Query sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self):
+        targets = {}
+        for name, process in list(self._processes.items()):
+            props = read_server_properties(process.working_dir)
+            if process.is_running() and get_bool(props, "enable-query"):
+                port = get_int(props, "query.port") or get_int(props, "server-port", 25565)
+                targets[name] = ("127.0.0.1", port)
+            else:
+                self._results.pop(name, None)
+        if targets:
+            self._results.update(await self.client.query_many(targets))
+
+    def get(self, name: str, max_age: float = QUERY_TTL) -> Optional[Dict]:
+        """Latest full stat of a server if it answered recently"""
+        result = self._results.get(name)
+        if result and time.time() - result["time"] <= max_age:
+            return result
+        return None
+
+    def get_players(self, name: str) -> Optional[List[str]]:
+        result = self.get(name)
+        return result["players"] if result else None
+
+    def forget(self, name: str):
+        self._results.pop(name, None)
+
+
+query_poller = QueryPoller() # Singleton
@@ -0,0 +1,208 @@
+"""
+RCON Client
+asyncio Source RCON client with one persistent, authenticated connection per
+server. Commands are pipelined: each one is written together with a marker
+packet, and the server answers in order, so several commands can be in flight
+and multi-packet responses are reassembled when the marker's reply arrives.
+"""
+import asyncio
+import itertools
+import os
+import struct
+from typing import Dict, Optional, Tuple
+
+from app.services.minecraft.server_properties import read_server_properties, get_bool, get_int
+
+# Seconds to wait for connect/auth and for a command's response
+RCON_TIMEOUT = float(os.getenv("RCON_TIMEOUT", "5"))
+# After a failed connect, don't try again for this many seconds (commands fall back to stdin)
+RCON_RETRY_INTERVAL = float(os.getenv("RCON_RETRY_INTERVAL", "10"))
+
+TYPE_RESPONSE = 0
+TYPE_COMMAND = 2
+TYPE_AUTH = 3
+# Any other type is answered with "Unknown request ..." under the same id: used as end marker
+TYPE_MARKER = 100
+
+MAX_PAYLOAD = 1446  # Vanilla rejects longer request payloads
+
+
+class RconError(Exception):
+    """Connection-level RCON failure"""
+
+
+class RconNotSent(RconError):
+    """The command never reached the server, so another transport may retry it"""
+
+
+class RconAuthError(RconNotSent):
+    """Wrong rcon.password"""
+
+
+def encode_packet(request_id: int, packet_type: int, payload: str) -> bytes:
+    body = struct.pack("<ii", request_id, packet_type) + payload.encode("utf-8") + b"\x00\x00"
+    return struct.pack("<i", len(body)) + body
+
+
+async def read_packet(reader: asyncio.StreamReader) -> Tuple[int, int, str]:
+    (length,) = struct.unpack("<i", await reader.readexactly(4))
+    body = await reader.readexactly(length)
+    request_id, packet_type = struct.unpack("<ii", body[:8])
+    return request_id, packet_type, body[8:-2].decode("utf-8", errors="replace")
+
+
+class RconClient:
+    def __init__(self, host: str, port: int, password: str, timeout: float = RCON_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task = None
+        self._connect_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+        # command id -> (future, fragments); marker id -> command id
+        self._pending: Dict[int, Tuple[asyncio.Future, list]] = {}
+        self._markers: Dict[int, int] = {}
+        self._retry_after = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _ensure_connected(self):
+        if self.connected:
+            return
+        async with self._connect_lock:
+            if self.connected:
+                return
+            loop = asyncio.get_running_loop()
+            if loop.time() < self._retry_after:
+                raise RconNotSent("RCON unavailable (waiting before reconnecting)")
+            try:
+                await asyncio.wait_for(self._connect(), timeout=self.timeout)
+            except RconAuthError:
+                self._retry_after = loop.time() + RCON_RETRY_INTERVAL
+                raise
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                self._retry_after = loop.time() + RCON_RETRY_INTERVAL
+                raise RconNotSent(f"RCON connect to {self.host}:{self.port} failed: {e}")
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        auth_id = next(self._ids)
+        writer.write(encode_packet(auth_id, TYPE_AUTH, self.password))
+        await writer.drain()
+        while True:
+            request_id, packet_type, _ = await read_packet(reader)
+            # Some servers send an empty RESPONSE_VALUE before the auth response
+            if packet_type == TYPE_COMMAND or request_id == -1:
+                break
+        if request_id == -1:
+            writer.close()
+            raise RconAuthError("RCON authentication failed (check rcon.password)")
+
+        self._reader, self._writer = reader, writer
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_loop(reader))
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                request_id, _, payload = await read_packet(reader)
+                if request_id in self._pending:
+                    self._pending[request_id][1].append(payload)
+                elif request_id in self._markers:
+                    command_id = self._markers.pop(request_id)
+                    future, fragments = self._pending.pop(command_id, (None, None))
+                    if future and not future.done():
+                        future.set_result("".join(fragments))
+        except (asyncio.IncompleteReadError, OSError, asyncio.CancelledError) as e:
+            self._fail_pending(RconError(f"RCON connection closed: {e or type(e).__name__}"))
+        finally:
+            self._drop_connection()
+
+    def _fail_pending(self, error: Exception):
+        for future, _ in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        self._markers.clear()
+
+    def _drop_connection(self):
+        if self._writer:
+            try: self._writer.close()
+            except Exception: pass
+        self._reader = self._writer = None
+
+    async def command(self, command: str) -> str:
+        """Run a command and return its response text"""
+        if len(command.encode("utf-8")) > MAX_PAYLOAD:
+            raise RconNotSent("Command too long for RCON")
+        await self._ensure_connected()
+
+        command_id, marker_id = next(self._ids), next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[command_id] = (future, [])
+        self._markers[marker_id] = command_id
+        try:
+            self._writer.write(encode_packet(command_id, TYPE_COMMAND, command) +
+                               encode_packet(marker_id, TYPE_MARKER, ""))
+            await self._writer.drain()
+        except (OSError, AttributeError) as e:
+            self._pending.pop(command_id, None)
+            self._markers.pop(marker_id, None)
+            self._drop_connection()
+            raise RconNotSent(f"RCON send failed: {e}")
+
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._pending.pop(command_id, None)
+            self._markers.pop(marker_id, None)
+            raise RconError(f"RCON command timed out after {self.timeout}s")
+
+    async def close(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+        self._drop_connection()
+
+
+class RconPool:
+    """One RconClient per server, rebuilt when its server.properties RCON settings change"""
+
+    def __init__(self):
+        self._clients: Dict[str, Tuple[tuple, RconClient]] = {}
+
+    def get(self, name: str, working_dir: str) -> Optional[RconClient]:
+        """The server's client, or None if RCON isn't enabled in server.properties"""
+        props = read_server_properties(working_dir)
+        password = props.get("rcon.password", "")
+        if not get_bool(props, "enable-rcon") or not password:
+            entry = self._clients.pop(name, None)
+            if entry:
+                asyncio.ensure_future(entry[1].close())
+            return None
+
+        settings = ("127.0.0.1", get_int(props, "rcon.port", 25575), password)
+        entry = self._clients.get(name)
+        if entry and entry[0] == settings:
+            return entry[1]
+        if entry:
+            asyncio.ensure_future(entry[1].close())
+        client = RconClient(*settings)
+        self._clients[name] = (settings, client)
+        return client
+
+    async def close(self, name: str):
+        entry = self._clients.pop(name, None)
+        if entry:
+            await entry[1].close()
+
+    async def close_all(self):
+        clients, self._clients = self._clients, {}
+        for _, client in clients.values():
+            await client.close()
+
+
+rcon_pool = RconPool() # Singleton
@@ -0,0 +1,198 @@
+"""
+MasterBridge Resource Pack Cache
+pack.zip is streamed from the mod straight to disk and served from that file
+in chunks, so memory use doesn't depend on the pack size or on how many
+clients download it at once. The copy on disk is keyed by the mod's ETag /
+Last-Modified and revalidated with a conditional request at most once per
+RESOURCE_PACK_REVALIDATE seconds; concurrent downloads share one refresh.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Dict, Optional, Tuple
+
+RESOURCE_PACK_DIR = os.getenv(
+    "RESOURCE_PACK_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+                 "database", "instance", "resource_packs")
+)
+# Seconds a cached pack is served without asking the mod whether it changed
+RESOURCE_PACK_REVALIDATE = float(os.getenv("RESOURCE_PACK_REVALIDATE", "60"))
+# Bytes per chunk when sending the pack to a client
+SEND_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class CachedPack:
+    def __init__(self, path: str, size: int, etag: str, last_modified: Optional[str]):
+        self.path = path
+        self.size = size
+        self.etag = etag  # Our own validator for clients (quoted)
+        self.last_modified = last_modified
+
+
+class ResourcePackCache:
+    def __init__(self, cache_dir: str = RESOURCE_PACK_DIR):
+        self.cache_dir = cache_dir
+        self._meta: Dict[str, Dict] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _meta_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def _load_meta(self, name: str) -> Optional[Dict]:
+        meta = self._meta.get(name)
+        if meta is None:
+            try:
+                with open(self._meta_path(name), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                return None
+            meta["validated_at"] = 0  # Revalidate after a restart
+            self._meta[name] = meta
+        if not os.path.exists(os.path.join(self.cache_dir, meta["file"])):
+            self._meta.pop(name, None)
+            return None
+        return meta
+
+    def _save_meta(self, name: str, meta: Dict):
+        self._meta[name] = meta
+        tmp_path = self._meta_path(name) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(name))
+
+    def _cached(self, meta: Dict) -> CachedPack:
+        return CachedPack(os.path.join(self.cache_dir, meta["file"]), meta["size"],
+                          f'"{meta["key"]}"', meta.get("last_modified"))
+
+    async def get(self, name: str, client) -> Optional[CachedPack]:
+        """The server's pack on disk, refreshed from the mod if due; None if there is none"""
+        # Fresh entries are answered from memory, without touching the disk
+        meta = self._meta.get(name)
+        if meta and time.time() - meta["validated_at"] < RESOURCE_PACK_REVALIDATE:
+            return self._cached(meta)
+
+        loop = asyncio.get_running_loop()
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            # Whoever held the lock may have just refreshed it
+            meta = await loop.run_in_executor(None, self._load_meta, name)
+            if meta and time.time() - meta["validated_at"] < RESOURCE_PACK_REVALIDATE:
+                return self._cached(meta)
+            return await self._refresh(name, client, meta)
+
+    async def _refresh(self, name: str, client, meta: Optional[Dict]) -> Optional[CachedPack]:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: os.makedirs(self.cache_dir, exist_ok=True))
+        # Each download gets its own file, so clients still reading the old one aren't disturbed
+        download_path = os.path.join(self.cache_dir, f"{name}.{time.time_ns()}.download")
+        result = await client.download_resource_pack(
+            download_path,
+            etag=meta.get("upstream_etag") if meta else None,
+            last_modified=meta.get("last_modified") if meta else None
+        )
+
+        if result is None:
+            if meta:
+                print(f"WARN: Could not revalidate resource pack of {name}, serving cached copy")
+                meta["validated_at"] = time.time()
+                return self._cached(meta)
+            return None
+
+        if not result["modified"]:
+            meta["validated_at"] = time.time()
+            await loop.run_in_executor(None, self._save_meta, name, meta)
+            return self._cached(meta)
+
+        # Keyed by the mod's validator, or by content (hashed while downloading) when it sends none
+        validator = result["etag"] or result["last_modified"]
+        if validator:
+            key = hashlib.sha1(validator.encode("utf-8")).hexdigest()[:16]
+        else:
+            key = result["sha1"][:16]
+
+        file_name = f"{name}.{key}.zip"
+        old_file = meta["file"] if meta else None
+        await loop.run_in_executor(None, self._install, name, download_path, file_name, {
+            "file": file_name,
+            "key": key,
+            "size": result["size"],
+            "upstream_etag": result["etag"],
+            "last_modified": result["last_modified"],
+            "validated_at": time.time(),
+        }, old_file)
+        return self._cached(self._meta[name])
+
+    def _install(self, name: str, download_path: str, file_name: str, meta: Dict, old_file: Optional[str]):
+        """Move a finished download into place and record it (blocking)"""
+        os.replace(download_path, os.path.join(self.cache_dir, file_name))
+        self._save_meta(name, meta)
+        if old_file and old_file != file_name:
+            self._remove(old_file)
+
+    def _remove(self, file_name: str):
+        try:
+            os.remove(os.path.join(self.cache_dir, file_name))
+        except OSError:
+            pass  # Still open for a download (Windows); replaced files are cleaned up by drop()
+
+    def drop(self, name: str):
+        """Forget a server's cached pack"""
+        self._meta.pop(name, None)
+        self._locks.pop(name, None)
+        if not os.path.isdir(self.cache_dir):
+            return
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.startswith(f"{name}."):
+                self._remove(file_name)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) inclusive for a single "bytes=" range, None to send the whole file.
+    Raises ValueError if the range can't be satisfied.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None  # Malformed or multi-range: ignore it and send everything
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def iter_file(path: str, start: int, end: int):
+    """Bytes start..end (inclusive) of a file as an iterator of SEND_CHUNK_SIZE chunks"""
+    # Opened now, so a refresh replacing the pack before the response starts can't remove it first
+    f = open(path, "rb")
+    return _read_chunks(f, start, end)
+
+
+def _read_chunks(f, start: int, end: int):
+    with f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(SEND_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+resource_pack_cache = ResourcePackCache() # Singleton
@@ -0,0 +1,55 @@
+"""
+server.properties reader
+Parsed once per file modification and shared by the network clients (RCON,
+status ping, query) that need ports and passwords from it.
+"""
+import os
+import threading
+from typing import Dict, Tuple
+
+_cache: Dict[str, Tuple[int, Dict[str, str]]] = {}
+_lock = threading.Lock()
+
+
+def read_server_properties(working_dir: str) -> Dict[str, str]:
+    """key -> raw string value; empty if the file doesn't exist"""
+    path = os.path.join(working_dir, "server.properties")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+
+    with _lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    props = {}
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if "=" in line and not line.startswith("#"):
+                    key, value = line.split("=", 1)
+                    # Values are escaped like Java properties (e.g. motd=A\:B)
+                    props[key.strip()] = value.strip().replace("\\:", ":").replace("\\=", "=")
+    except OSError:
+        return {}
+
+    with _lock:
+        _cache[path] = (mtime, props)
+    return props
+
+
+def get_bool(props: Dict[str, str], key: str, default: bool = False) -> bool:
+    value = props.get(key)
+    if value is None:
+        return default
+    return value.lower() == "true"
+
+
+def get_int(props: Dict[str, str], key: str, default: int = None) -> int:
+    try:
+        return int(props.get(key, ""))
+    except ValueError:
+        return default
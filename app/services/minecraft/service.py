@@ -2,10 +2,17 @@ import os
 import shutil
 import asyncio
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
 from sqlalchemy.orm import Session
 from database.models import Server
-from app.services.minecraft.process import MinecraftProcess
+from app.services.minecraft.process import MinecraftProcess, index_java_processes
+from app.services.minecraft.log_index import drop_log_index
+from app.services.minecraft.rcon import rcon_pool
+
+# Threads used to construct server instances at startup
+STARTUP_WORKERS = int(os.getenv("STARTUP_WORKERS", "16"))
 
 class ServerService:
     _instance = None
@@ -15,38 +22,92 @@ class ServerService:
             cls._instance = super(ServerService, cls).__new__(cls)
             cls._instance.servers = {} # type: Dict[str, MinecraftProcess]
             cls._instance.base_dir = os.path.abspath("servers")
+            cls._instance.startup_report = {}
+            cls._instance.loop = None # Event loop the servers run on (set at startup)
         return cls._instance
 
     def load_servers_from_db(self, db: Session):
+        started = time.perf_counter()
+        self.loop = asyncio.get_running_loop()
         server_records = db.query(Server).all()
-        for record in server_records:
-            jar_path = os.path.join(self.base_dir, record.name, "server.jar")
-            working_dir = os.path.join(self.base_dir, record.name)
-            
-            # Prepare MasterBridge config
-            masterbridge_config = None
-            if record.masterbridge_enabled:
-                masterbridge_config = {
-                    'enabled': True,
-                    'ip': record.masterbridge_ip or '127.0.0.1',
-                    'port': record.masterbridge_port or 8081
-                }
-            
-            instance = MinecraftProcess(
-                name=record.name,
-                ram_mb=record.ram_mb,
-                jar_path=jar_path,
-                working_dir=working_dir,
-                masterbridge_config=masterbridge_config
-            )
-            
+        
+        # One process table pass for every server instead of one scan per server
+        scan_started = time.perf_counter()
+        java_processes = index_java_processes()
+        scan_ms = (time.perf_counter() - scan_started) * 1000
+        
+        # Plain values only: ORM instances stay on this thread
+        specs = [
+            {
+                'id': record.id,
+                'name': record.name,
+                'ram_mb': record.ram_mb,
+                'mod_loader': record.mod_loader,
+                'masterbridge_config': self.masterbridge_config(record)
+            }
+            for record in server_records
+        ]
+        
+        # Constructors are independent (history is loaded later, off the loop), build them concurrently
+        workers = max(1, min(STARTUP_WORKERS, len(specs)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            built = list(pool.map(self._build_process, specs))
+        
+        report = {}
+        for instance, build_ms in built:
             # --- Attempt Recovery ---
-            if instance.attempt_recovery():
-                print(f"INFO: Recovered active server {record.name}")
+            recovery_started = time.perf_counter()
+            recovered = instance.attempt_recovery(java_processes)
+            if recovered:
+                print(f"INFO: Recovered active server {instance.name}")
                 instance._status = "ONLINE"
                 asyncio.create_task(instance._tail_log_file())
+            recovery_ms = (time.perf_counter() - recovery_started) * 1000
                 
-            self.servers[record.name] = instance
+            self.servers[instance.name] = instance
+            report[instance.name] = {
+                'build_ms': round(build_ms, 1),
+                'recovery_ms': round(recovery_ms, 1),
+                'recovered': recovered
+            }
+        
+        total_ms = (time.perf_counter() - started) * 1000
+        self.startup_report = {'total_ms': round(total_ms, 1), 'process_scan_ms': round(scan_ms, 1), 'servers': report}
+        for name, timing in report.items():
+            print(f"INFO: Startup {name}: build {timing['build_ms']}ms, recovery {timing['recovery_ms']}ms{' (recovered)' if timing['recovered'] else ''}")
+        print(f"INFO: Loaded {len(report)} servers in {total_ms:.1f}ms (process scan {scan_ms:.1f}ms)")
+
+    async def load_activity_histories(self):
+        """Load every server's activity history off the event loop, one server at a time"""
+        for process in list(self.servers.values()):
+            await process.load_activity_history()
+
+    def _build_process(self, spec: Dict):
+        started = time.perf_counter()
+        instance = MinecraftProcess(
+            name=spec['name'],
+            ram_mb=spec['ram_mb'],
+            jar_path=os.path.join(self.base_dir, spec['name'], "server.jar"),
+            working_dir=os.path.join(self.base_dir, spec['name']),
+            masterbridge_config=spec['masterbridge_config'],
+            mod_loader=spec['mod_loader'],
+            server_id=spec['id']
+        )
+        return instance, (time.perf_counter() - started) * 1000
+
+    def call_in_loop(self, callback, *args):
+        """Run callback on the servers' event loop; safe from threadpool routes"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    @staticmethod
+    def masterbridge_config(record: Server):
+        if not record.masterbridge_enabled:
+            return None
+        return {
+            'enabled': True,
+            'ip': record.masterbridge_ip or '127.0.0.1',
+            'port': record.masterbridge_port or 8081
+        }
 
     def get_process(self, name: str) -> MinecraftProcess:
         return self.servers.get(name)
@@ -220,7 +281,9 @@ online-mode={'true' if online_mode else 'false'}
             ram_mb=server_db.ram_mb,
             jar_path=os.path.join(self.base_dir, server_db.name, "server.jar"),
             working_dir=os.path.join(self.base_dir, server_db.name),
-            masterbridge_config=masterbridge_config
+            masterbridge_config=masterbridge_config,
+            mod_loader=server_db.mod_loader,
+            server_id=server_db.id
         )
         
         print(f"DEBUG: MinecraftProcess created. masterbridge_client = {process.masterbridge_client}")
@@ -236,6 +299,12 @@ online-mode={'true' if online_mode else 'false'}
                 import time
                 time.sleep(2)
             del self.servers[name]
+            if self.loop:
+                self.call_in_loop(asyncio.ensure_future, rcon_pool.close(name))
+                # Stops the breaker's probe loop and the ingestion task; loop thread only
+                if instance.masterbridge_client:
+                    self.call_in_loop(instance.masterbridge_client.close)
+        drop_log_index(name)
         
         record = db.query(Server).filter(Server.name == name).first()
         if record:
@@ -422,9 +491,12 @@ online-mode={'true' if online_mode else 'false'}
                 ram_mb=2048,
                 jar_path=jar_path,
                 working_dir=final_server_dir,
-                masterbridge_config=masterbridge_config
+                masterbridge_config=masterbridge_config,
+                mod_loader=mod_loader,
+                server_id=new_server.id
             )
             self.servers[server_name] = instance
+            asyncio.create_task(instance.load_activity_history())
             
             print(f"INFO: Server '{server_name}' imported successfully")
             return new_server
@@ -0,0 +1,337 @@
+"""
+Player Stats Watcher
+Watches <level-name>/stats and <level-name>/advancements of every running
+server and feeds the UUIDs of rewritten files into PlayerStatsSyncer, so the
+database follows the game within seconds of each autosave.
+
+On Linux the directories are watched with inotify (through libc, no extra
+dependency); elsewhere, or if inotify can't be set up, the directories are
+polled for (mtime, size) changes. Autosave rewrites every online player's
+files in one burst, so changes are debounced: a server is synced once its
+directories have been quiet for STATS_DEBOUNCE seconds (at most
+STATS_MAX_DELAY after the first change).
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from database.connection import SessionLocal
+from database.models.server import Server
+from app.services.minecraft.player_stats_syncer import get_stats_syncer, get_world_dir
+
+# "auto" (inotify when available), "inotify" or "poll"
+STATS_WATCH_MODE = os.getenv("STATS_WATCH_MODE", "auto").lower()
+# Quiet time after the last change before a server is synced
+STATS_DEBOUNCE = float(os.getenv("STATS_DEBOUNCE", "2"))
+# Longest a change waits while writes keep coming
+STATS_MAX_DELAY = float(os.getenv("STATS_MAX_DELAY", "10"))
+# Seconds between directory scans in polling mode
+STATS_POLL_INTERVAL = float(os.getenv("STATS_POLL_INTERVAL", "5"))
+# Seconds between checks for started/stopped servers and new directories
+STATS_WATCH_RESCAN = 5.0
+TICK = 0.5
+
+WATCHED_FOLDERS = ("stats", "advancements")
+ALL_PLAYERS = "*"
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def player_uuid_from(file_name: str) -> Optional[str]:
+    """UUID of a "<uuid>.json" stats/advancements file name"""
+    if file_name.endswith(".json") and len(file_name) == 41:
+        return file_name[:-5]
+    return None
+
+
+class Inotify:
+    """Minimal inotify binding over libc"""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """(wd, mask, name) of every queued event"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", errors="replace")
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class StatsWatcher:
+    def __init__(self, mode: str = STATS_WATCH_MODE):
+        self.mode = mode
+        self.backend = None  # "inotify" or "poll" once started
+        self._inotify: Optional[Inotify] = None
+        self._processes = None
+        self._task = None
+        # name -> {directory: wd (inotify) or None (poll)}
+        self._watched: Dict[str, Dict[str, Optional[int]]] = {}
+        self._wd_owner: Dict[int, Tuple[str, str]] = {}
+        # directory -> {file name: (mtime_ns, size)} (poll)
+        self._poll_state: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        # name -> changed uuids (or ALL_PLAYERS), first/last change time
+        self._pending: Dict[str, Set[str]] = {}
+        self._first_change: Dict[str, float] = {}
+        self._last_change: Dict[str, float] = {}
+        self._syncing: Set[str] = set()
+        self._server_ids: Dict[str, int] = {}
+        # name -> changes_seen, syncs, players_synced, rows_written, last_sync_ms
+        self._counters: Dict[str, Dict] = {}
+
+    def start(self, processes: Dict):
+        """Start watching. `processes` is the live name -> MinecraftProcess registry."""
+        self._processes = processes
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def _start_backend(self):
+        if self.mode in ("auto", "inotify") and sys.platform.startswith("linux"):
+            try:
+                self._inotify = Inotify()
+                asyncio.get_running_loop().add_reader(self._inotify.fd, self._on_inotify)
+                self.backend = "inotify"
+                return
+            except (OSError, AttributeError) as e:
+                print(f"WARN: inotify unavailable ({e}), polling player stats instead")
+        self.backend = "poll"
+
+    async def _run(self):
+        self._start_backend()
+        next_rescan = next_poll = 0.0
+        while True:
+            try:
+                now = time.monotonic()
+                if now >= next_rescan:
+                    self._rescan()
+                    next_rescan = now + STATS_WATCH_RESCAN
+                if self.backend == "poll" and now >= next_poll:
+                    self._poll()
+                    next_poll = now + STATS_POLL_INTERVAL
+                self._fire_due(now)
+            except Exception as e:
+                print(f"ERROR: Stats watcher failed: {e}")
+            await asyncio.sleep(TICK)
+
+    # --- Watch management ---
+    def _rescan(self):
+        running = {}
+        for name, process in list(self._processes.items()):
+            if process.is_running():
+                world_dir = get_world_dir(process.working_dir)
+                running[name] = [os.path.join(world_dir, folder) for folder in WATCHED_FOLDERS]
+
+        for name in list(self._watched):
+            if name not in running:
+                self._unwatch(name)
+
+        for name, directories in running.items():
+            watched = self._watched.get(name)
+            if watched is None:
+                watched = self._watched[name] = {}
+                # Catch up on whatever changed while nobody was watching
+                self._mark(name, ALL_PLAYERS)
+            for directory in list(watched):
+                if directory not in directories:  # level-name changed
+                    self._drop_watch(watched.pop(directory), directory)
+            for directory in directories:
+                if directory not in watched and os.path.isdir(directory):
+                    self._add_watch(name, directory)
+
+    def _add_watch(self, name: str, directory: str):
+        wd = None
+        if self._inotify:
+            try:
+                wd = self._inotify.add_watch(directory)
+                self._wd_owner[wd] = (name, directory)
+            except OSError as e:
+                print(f"WARN: Cannot watch {directory}: {e}")
+                return
+        else:
+            self._poll_state[directory] = self._scan(directory)
+        self._watched[name][directory] = wd
+        # Files written before the watch existed
+        self._mark(name, ALL_PLAYERS)
+
+    def _drop_watch(self, wd: Optional[int], directory: str):
+        if wd is not None and self._inotify:
+            self._wd_owner.pop(wd, None)
+            try:
+                self._inotify.rm_watch(wd)
+            except OSError:
+                pass
+        self._poll_state.pop(directory, None)
+
+    def _unwatch(self, name: str):
+        for directory, wd in self._watched.pop(name, {}).items():
+            self._drop_watch(wd, directory)
+        self._pending.pop(name, None)
+        self._first_change.pop(name, None)
+        self._last_change.pop(name, None)
+        # Re-resolved on the next start (the server may have been recreated)
+        self._server_ids.pop(name, None)
+
+    # --- Change detection ---
+    def _on_inotify(self):
+        for wd, mask, file_name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: resync everything being watched
+                for name in self._watched:
+                    self._mark(name, ALL_PLAYERS)
+                continue
+            owner = self._wd_owner.get(wd)
+            if not owner:
+                continue
+            name, directory = owner
+            if mask & IN_IGNORED:
+                # Directory deleted (world reset); re-added by the next rescan
+                self._wd_owner.pop(wd, None)
+                self._watched.get(name, {}).pop(directory, None)
+                continue
+            player_uuid = player_uuid_from(file_name)
+            if player_uuid:
+                self._mark(name, player_uuid)
+
+    @staticmethod
+    def _scan(directory: str) -> Dict[str, Tuple[int, int]]:
+        files = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if player_uuid_from(entry.name):
+                        st = entry.stat()
+                        files[entry.name] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+        return files
+
+    def _poll(self):
+        for name, watched in list(self._watched.items()):
+            for directory in watched:
+                previous = self._poll_state.get(directory, {})
+                current = self._scan(directory)
+                for file_name, signature in current.items():
+                    if previous.get(file_name) != signature:
+                        self._mark(name, player_uuid_from(file_name))
+                self._poll_state[directory] = current
+
+    def _mark(self, name: str, player_uuid: str):
+        now = time.monotonic()
+        self._counter(name)["changes_seen"] += 1
+        self._pending.setdefault(name, set()).add(player_uuid)
+        self._first_change.setdefault(name, now)
+        self._last_change[name] = now
+
+    # --- Sync ---
+    def _fire_due(self, now: float):
+        for name in list(self._pending):
+            if name in self._syncing:
+                continue  # Changes keep accumulating for the next run
+            quiet = now - self._last_change[name] >= STATS_DEBOUNCE
+            overdue = now - self._first_change[name] >= STATS_MAX_DELAY
+            if quiet or overdue:
+                uuids = self._pending.pop(name)
+                self._first_change.pop(name, None)
+                self._syncing.add(name)
+                asyncio.get_running_loop().create_task(self._sync(name, uuids))
+
+    def _counter(self, name: str) -> Dict:
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters[name] = {
+                "changes_seen": 0, "syncs": 0, "players_synced": 0, "rows_written": 0, "last_sync_ms": 0.0
+            }
+        return counter
+
+    async def _sync(self, name: str, uuids: Set[str]):
+        counter = self._counter(name)
+        started = time.perf_counter()
+        try:
+            process = self._processes.get(name)
+            if process:
+                written, players = await asyncio.get_running_loop().run_in_executor(
+                    None, self._sync_blocking, name, process.working_dir, uuids
+                )
+                counter["rows_written"] += written
+                counter["players_synced"] += players
+                counter["syncs"] += 1
+        except Exception as e:
+            print(f"ERROR: Stats sync of {name} failed: {e}")
+        finally:
+            counter["last_sync_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self._syncing.discard(name)
+
+    def _sync_blocking(self, name: str, working_dir: str, uuids: Set[str]) -> Tuple[int, int]:
+        server_id = self._server_ids.get(name)
+        if server_id is None:
+            db = SessionLocal()
+            try:
+                server = db.query(Server.id).filter(Server.name == name).first()
+            finally:
+                db.close()
+            if not server:
+                return 0, 0
+            server_id = self._server_ids[name] = server.id
+        syncer = get_stats_syncer(working_dir, server_id)
+        if ALL_PLAYERS in uuids:
+            uuids = set(syncer.known_uuids())
+        return syncer.sync_players(sorted(uuids)), len(uuids)
+
+    def stats(self, name: str) -> Optional[Dict]:
+        if name not in self._watched and name not in self._counters:
+            return None
+        return {
+            "backend": self.backend,
+            "watched_directories": len(self._watched.get(name, {})),
+            "pending_players": len(self._pending.get(name, ())),
+            **self._counter(name),
+        }
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+        if self._inotify:
+            try:
+                asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            except RuntimeError:
+                pass
+            self._inotify.close()
+            self._inotify = None
+
+
+stats_watcher = StatsWatcher() # Singleton
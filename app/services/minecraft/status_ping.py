@@ -0,0 +1,171 @@
+"""
+Server List Ping Poller
+Asks every running server for its status the way the Minecraft client's
+server list does (handshake + status request + ping). One background task
+sweeps all servers concurrently, each with its own deadline, and caches the
+results so get_stats() never touches the network or the log files.
+"""
+import asyncio
+import json
+import os
+import struct
+import time
+from typing import Dict, Optional, Tuple
+
+from app.services.minecraft.server_properties import read_server_properties, get_int
+
+# Seconds between sweeps
+SLP_INTERVAL = float(os.getenv("SLP_INTERVAL", "5"))
+# Deadline for a single server's exchange
+SLP_TIMEOUT = float(os.getenv("SLP_TIMEOUT", "2"))
+# Results older than this are treated as missing
+SLP_MAX_AGE = float(os.getenv("SLP_MAX_AGE", str(3 * SLP_INTERVAL)))
+
+# -1 asks the server to answer with whatever protocol version it speaks
+PROTOCOL_ANY = -1
+
+
+def pack_varint(value: int) -> bytes:
+    value &= 0xFFFFFFFF
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+async def read_varint(reader: asyncio.StreamReader) -> int:
+    result = 0
+    for shift in range(0, 35, 7):
+        byte = (await reader.readexactly(1))[0]
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result - (1 << 32) if result & (1 << 31) else result
+    raise ValueError("VarInt too long")
+
+
+def pack_string(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return pack_varint(len(data)) + data
+
+
+def pack_packet(packet_id: int, payload: bytes = b"") -> bytes:
+    body = pack_varint(packet_id) + payload
+    return pack_varint(len(body)) + body
+
+
+async def read_packet(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    length = await read_varint(reader)
+    data = await reader.readexactly(length)
+    # Packet id is a VarInt, but status packet ids are single bytes
+    return data[0], data[1:]
+
+
+def flatten_motd(description) -> str:
+    """Plain text of a chat component (string, {"text", "extra"} or list)"""
+    if isinstance(description, str):
+        return description
+    if isinstance(description, list):
+        return "".join(flatten_motd(part) for part in description)
+    if isinstance(description, dict):
+        return description.get("text", "") + "".join(flatten_motd(part) for part in description.get("extra", []))
+    return ""
+
+
+async def ping_server(host: str, port: int) -> Dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        handshake = pack_varint(PROTOCOL_ANY) + pack_string(host) + struct.pack(">H", port) + pack_varint(1)
+        writer.write(pack_packet(0x00, handshake) + pack_packet(0x00))
+        await writer.drain()
+
+        _, payload = await read_packet(reader)
+        # Payload is a VarInt-prefixed JSON string
+        offset = 0
+        while payload[offset] & 0x80:
+            offset += 1
+        status = json.loads(payload[offset + 1:].decode("utf-8"))
+
+        sent = time.perf_counter()
+        writer.write(pack_packet(0x01, struct.pack(">q", int(time.time() * 1000))))
+        await writer.drain()
+        await read_packet(reader)
+        latency_ms = (time.perf_counter() - sent) * 1000
+    finally:
+        writer.close()
+
+    players = status.get("players") or {}
+    version = status.get("version") or {}
+    return {
+        "version": version.get("name"),
+        "protocol": version.get("protocol"),
+        "motd": flatten_motd(status.get("description", "")),
+        "players_online": players.get("online", 0),
+        "players_max": players.get("max", 0),
+        "sample": [p.get("name") for p in players.get("sample") or [] if p.get("name")],
+        "latency_ms": round(latency_ms, 2),
+        "time": time.time(),
+    }
+
+
+class StatusPoller:
+    def __init__(self, interval: float = SLP_INTERVAL, timeout: float = SLP_TIMEOUT):
+        self.interval = interval
+        self.timeout = timeout
+        self._results: Dict[str, Dict] = {}
+        self._processes = None
+        self._task = None
+
+    def start(self, processes: Dict):
+        """Start sweeping. `processes` is the live name -> MinecraftProcess registry."""
+        self._processes = processes
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"ERROR: Status ping sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self):
+        targets = {}
+        for name, process in list(self._processes.items()):
+            if process.is_running():
+                props = read_server_properties(process.working_dir)
+                targets[name] = ("127.0.0.1", get_int(props, "server-port", 25565))
+            else:
+                self._results.pop(name, None)
+
+        names = list(targets)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(ping_server(*targets[n]), timeout=self.timeout) for n in names),
+            return_exceptions=True
+        )
+        for name, result in zip(names, results):
+            # Failures (not listening yet, too slow this round) leave the last result to age out
+            if isinstance(result, dict):
+                self._results[name] = result
+
+    def get(self, name: str, max_age: float = SLP_MAX_AGE) -> Optional[Dict]:
+        """Latest status of a server if it answered recently"""
+        result = self._results.get(name)
+        if result and time.time() - result["time"] <= max_age:
+            return result
+        return None
+
+    def forget(self, name: str):
+        self._results.pop(name, None)
+
+
+status_poller = StatusPoller() # Singleton
@@ -0,0 +1,179 @@
+"""
+Write-behind persistence for player events (join, leave, kick, ban...)
+The log tail only enqueues events; one writer task drains the bounded queue
+and applies everything pending in a single transaction per flush: one name
+lookup and one detail lookup per server, then bulk upserts. Mass reconnects
+after a restart become a handful of SQLite write transactions instead of one
+per event.
+"""
+import asyncio
+import datetime
+import os
+import time
+import uuid as uuid_lib
+from typing import Dict, List, Optional
+
+from database.connection import SessionLocal
+from database.models.players.player import Player
+from database.models.players.player_detail import PlayerDetail
+from database.upsert import upsert
+
+# Events held in memory at most; beyond that new events are dropped (and counted)
+PLAYER_EVENT_QUEUE_SIZE = int(os.getenv("PLAYER_EVENT_QUEUE_SIZE", "10000"))
+# Longest an event waits before it is written
+PLAYER_EVENT_FLUSH_INTERVAL = float(os.getenv("PLAYER_EVENT_FLUSH_INTERVAL", "0.5"))
+# Most events applied in one transaction
+PLAYER_EVENT_BATCH = int(os.getenv("PLAYER_EVENT_BATCH", "2000"))
+
+LEAVE_TYPES = ("leave", "kick")
+# Console events written to the database
+PERSISTED_TYPES = ("join", "leave", "kick", "ban", "ban-ip", "unban", "unban-ip")
+
+
+def offline_uuid(username: str) -> str:
+    """UUID used for players seen in the log before their real one is known"""
+    return str(uuid_lib.uuid3(uuid_lib.NAMESPACE_DNS, username))
+
+
+class PlayerEventWriter:
+    def __init__(self, session_factory=SessionLocal, queue_size: int = PLAYER_EVENT_QUEUE_SIZE):
+        self.session_factory = session_factory
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task = None
+        self._batch: List[tuple] = []  # Taken off the queue, not yet handed to the executor
+        self.written = 0
+        self.flushes = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def enqueue(self, server_id: int, event: Dict, ip: str = None):
+        """Queue a player event of `server_id`; never blocks the caller"""
+        if not event.get('user'):
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        try:
+            # Stamped now: the write may happen a little later
+            self._queue.put_nowait((server_id, event, ip, datetime.datetime.now()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                print(f"WARN: Player event queue full, {self.dropped} events dropped so far")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._batch = [await self._queue.get()]
+            deadline = time.monotonic() + PLAYER_EVENT_FLUSH_INTERVAL
+            while len(batch) < PLAYER_EVENT_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._batch = []
+            # Only this task writes, so batches are applied in order
+            await loop.run_in_executor(None, self.apply, batch)
+
+    async def flush(self):
+        """Write everything queued right now (used at shutdown)"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        batch, self._batch = self._batch, []
+        while self._queue is not None and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if batch:
+            await asyncio.get_running_loop().run_in_executor(None, self.apply, batch)
+
+    def apply(self, batch: List[tuple]):
+        """Apply queued (server_id, event, ip, at) tuples in one transaction"""
+        by_server: Dict[int, List[tuple]] = {}
+        for item in batch:
+            by_server.setdefault(item[0], []).append(item)
+
+        session = self.session_factory()
+        try:
+            for server_id, items in by_server.items():
+                self._apply_server(session, server_id, items)
+            session.commit()
+            self.written += len(batch)
+            self.flushes += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"DB Error persisting {len(batch)} player events: {e}")
+            session.rollback()
+        finally:
+            session.close()
+
+    def _apply_server(self, session, server_id: int, items: List[tuple]):
+        names = {event['user'] for _, event, _, _ in items}
+        uuids = dict(session.query(Player.name, Player.uuid).filter(
+            Player.server_id == server_id, Player.name.in_(list(names))
+        ))
+        new_players = [
+            {"uuid": offline_uuid(name), "server_id": server_id, "name": name}
+            for name in names if name not in uuids
+        ]
+        for row in new_players:
+            uuids[row["name"]] = row["uuid"]
+
+        details = {
+            row.player_uuid: {
+                "player_uuid": row.player_uuid,
+                "server_id": server_id,
+                "total_playtime_seconds": row.total_playtime_seconds or 0,
+                "last_joined_at": row.last_joined_at,
+                "last_ip": row.last_ip,
+            }
+            for row in session.query(PlayerDetail).filter(
+                PlayerDetail.server_id == server_id,
+                PlayerDetail.player_uuid.in_(list(uuids.values()))
+            )
+        }
+
+        # Fold the events in order; each player ends up as one row
+        for _, event, ip, at in items:
+            player_uuid = uuids[event['user']]
+            detail = details.get(player_uuid)
+            if detail is None:
+                detail = details[player_uuid] = {
+                    "player_uuid": player_uuid,
+                    "server_id": server_id,
+                    "total_playtime_seconds": 0,
+                    "last_joined_at": None,
+                    "last_ip": None,
+                }
+            if event['type'] == 'join':
+                detail["last_joined_at"] = at
+                if ip:
+                    detail["last_ip"] = ip
+            elif event['type'] in LEAVE_TYPES and event.get('joined_at'):
+                try:
+                    delta = (at - datetime.datetime.fromisoformat(event['joined_at'])).total_seconds()
+                except (TypeError, ValueError):
+                    print(f"WARN: Unparseable joined_at {event['joined_at']!r} for {event['user']}, playtime not counted")
+                    continue
+                if delta > 0:
+                    detail["total_playtime_seconds"] += int(delta)
+
+        upsert(session, Player, new_players, ("uuid", "server_id"), ())
+        upsert(session, PlayerDetail, list(details.values()), ("player_uuid", "server_id"),
+               ("total_playtime_seconds", "last_joined_at", "last_ip"))
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+player_event_writer = PlayerEventWriter() # Singleton
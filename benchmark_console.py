@@ -0,0 +1,120 @@
+import sys
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import contextlib
+
+# Setup path
+sys.path.append(os.getcwd())
+
+# Keep the benchmark's log index out of database/instance
+TEMP_INDEX_DIR = None
+if "LOG_INDEX_DIR" not in os.environ:
+    TEMP_INDEX_DIR = os.environ["LOG_INDEX_DIR"] = tempfile.mkdtemp(prefix="bench_log_index_")
+
+from app.services.minecraft.process import MinecraftProcess
+
+LINES = int(os.getenv("BENCH_LINES", "50000"))
+PACED_LINES = int(os.getenv("BENCH_PACED_LINES", "2000"))
+RATE = float(os.getenv("BENCH_RATE", "1000"))  # Lines/s of the paced (latency) run
+# Same defaults as the console WebSocket in routes/servers.py
+CONSOLE_BATCH_MS = float(os.getenv("CONSOLE_BATCH_MS", "50"))
+CONSOLE_BATCH_LINES = int(os.getenv("CONSOLE_BATCH_LINES", "500"))
+
+# Stand-in for the JVM: writes timestamped console lines to stdout ("-") or to a log file,
+# flushing every line like log4j does
+FAKE_SERVER = r'''
+import sys, time
+count, rate, target = int(sys.argv[1]), float(sys.argv[2]), sys.argv[3]
+out = sys.stdout if target == "-" else open(target, "a")
+start = time.perf_counter()
+for i in range(count):
+    if rate:
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    out.write(f"[12:00:00] [Server thread/INFO]: bench line {i} {time.time_ns()}\n")
+    out.flush()
+'''
+
+
+async def consume(sub, count):
+    """Receive lines the way the console WebSocket does; latency = JVM write -> batch delivered"""
+    latencies = []
+    while len(latencies) + sub.total_dropped < count:
+        lines = await sub.get_batch(CONSOLE_BATCH_LINES, CONSOLE_BATCH_MS / 1000)
+        now = time.time_ns()
+        for line in lines:
+            if " bench line " in line:
+                latencies.append((now - int(line.rsplit(" ", 1)[1])) / 1e6)
+    return latencies
+
+
+async def run_source(source, count, rate, working_dir):
+    process = MinecraftProcess(f"bench_{source}", 1024, "server.jar", working_dir)
+    log_file = os.path.join(working_dir, "logs", "latest.log")
+    sub = process.subscribe_logs()
+    process._status = "STARTING"
+
+    target = "-" if source == "stdout" else log_file
+    if source == "tail":
+        open(log_file, "w").close()
+
+    start = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", FAKE_SERVER, str(count), str(rate), target,
+        stdout=asyncio.subprocess.PIPE if source == "stdout" else asyncio.subprocess.DEVNULL
+    )
+    process._mark_alive(proc.pid)
+    if source == "stdout":
+        process.process = proc
+        reader = asyncio.create_task(process._read_stdout())
+    else:
+        reader = asyncio.create_task(process._tail_log_file())
+
+    latencies = await asyncio.wait_for(consume(sub, count), timeout=max(60, count / max(rate, 1) * 3))
+    elapsed = time.perf_counter() - start
+
+    await proc.wait()
+    process._alive = False  # Ends the tailer; the stdout reader already hit EOF
+    await reader
+    process.log_index.close()
+    process.flush_activity()
+    return elapsed, latencies, sub.total_dropped
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def benchmark():
+    print(f"Console pipeline: {LINES} lines burst, {PACED_LINES} lines at {RATE:.0f} lines/s "
+          f"(WebSocket batches of {CONSOLE_BATCH_LINES} lines / {CONSOLE_BATCH_MS:.0f} ms)")
+    results = []
+    for label, count, rate in (("burst", LINES, 0.0), ("paced", PACED_LINES, RATE)):
+        for source in ("stdout", "tail"):
+            with tempfile.TemporaryDirectory() as working_dir:
+                os.makedirs(os.path.join(working_dir, "logs"))
+                # _handle_log_line echoes every line; keep that off the terminal
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    elapsed, latencies, dropped = await run_source(source, count, rate, working_dir)
+            results.append((label, source, count, elapsed, latencies, dropped))
+
+    for label, source, count, elapsed, latencies, dropped in results:
+        name = "stdout pipe" if source == "stdout" else "latest.log tail"
+        print(f"{label:<6} {name:<16} {count:7d} lines {elapsed:7.2f} s {count / elapsed:10.0f} lines/s  "
+              f"latency p50 {percentile(latencies, 0.5):7.1f} ms  p99 {percentile(latencies, 0.99):7.1f} ms  "
+              f"max {max(latencies, default=0):7.1f} ms  dropped={dropped}")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(benchmark())
+    finally:
+        if TEMP_INDEX_DIR:
+            shutil.rmtree(TEMP_INDEX_DIR, ignore_errors=True)
@@ -0,0 +1,147 @@
+import sys
+import os
+import re
+import gzip
+import time
+import random
+from collections import Counter
+
+# Setup path
+sys.path.append(os.getcwd())
+
+from app.services.minecraft.log_classifier import get_classifier
+from app.services.minecraft.player_manager import PlayerManager
+
+# A captured latest.log (or .log.gz); a synthetic log of BENCH_LINES lines otherwise
+LOG_PATH = os.getenv("BENCH_LOG")
+LINES = int(os.getenv("BENCH_LINES", "2000000"))
+MOD_LOADER = os.getenv("BENCH_LOADER", "VANILLA")
+
+NOISE = [
+    "[12:00:{s:02d}] [Server thread/INFO]: [STDOUT]: Loaded chunk {n} in region r.{m}.{m}.mca",
+    "[12:00:{s:02d}] [Server thread/WARN]: Can't keep up! Is the server overloaded? Running {n}ms or {m} ticks behind",
+    "[12:00:{s:02d}] [Worker-Main-{m}/INFO]: Preparing spawn area: {m}%",
+    "[12:00:{s:02d}] [Server thread/INFO]: <Player{m}> anyone got iron? {n}",
+    "[12:00:{s:02d}] [Server thread/INFO]: [create]: Contraption {n} assembled at {m}, 64, {m}",
+    "[12:00:{s:02d}] [Server thread/INFO]: Saving chunks for level 'ServerLevel[world]'/minecraft:overworld",
+]
+EVENTS = [
+    "[12:00:{s:02d}] [User Authenticator #{m}/INFO]: UUID of player Player{m} is 00000000-0000-0000-0000-{n:012d}",
+    "[12:00:{s:02d}] [Server thread/INFO]: Player{m}[/10.0.{m}.1:5{m:04d}] logged in with entity id {n} at (0.5, 64.0, 0.5)",
+    "[12:00:{s:02d}] [Server thread/INFO]: Player{m} joined the game",
+    "[12:00:{s:02d}] [Server thread/INFO]: Player{m} lost connection: Disconnected",
+    "[12:00:{s:02d}] [Server thread/INFO]: Player{m} left the game",
+    "[12:00:{s:02d}] [Server thread/INFO]: Kicked Player{m}: Flying is not enabled on this server",
+    "[12:00:{s:02d}] [Server thread/INFO]: Banned Player{m}: Griefing",
+]
+EVENT_RATIO = 0.005  # Player events are rare next to chunk/mod chatter
+
+
+def synthetic_log(count):
+    rng = random.Random(42)
+    lines = []
+    for i in range(count):
+        templates = EVENTS if rng.random() < EVENT_RATIO else NOISE
+        lines.append(rng.choice(templates).format(s=i % 60, n=i, m=rng.randrange(100)))
+    return lines
+
+
+def load_log(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        return [line.rstrip("\n") for line in f]
+
+
+def legacy_parse(line):
+    """The previous chain of re.search calls (stateless: update_state=False)"""
+    cleaned_line = line.strip()
+    if "UUID of player" in cleaned_line:
+        if re.search(r'UUID of player (\S+) is ([a-f0-9-]+)', cleaned_line):
+            return None
+    match = re.search(r':\s(\S+)\[/([0-9.]+):\d+\]\slogged\sin', cleaned_line)
+    if match:
+        return ("join", match.group(1))
+    match = re.search(r':\s(\S+)\sjoined\sthe\sgame', cleaned_line)
+    if match:
+        return ("join", match.group(1))
+    match = re.search(r':\s(\S+)\slost\sconnection:\s(.*)', cleaned_line)
+    if match:
+        reason = match.group(2)
+        return ("kick" if "Kicked" in reason or "kicked" in reason else "leave", match.group(1))
+    match = re.search(r':\s(\S+)\sleft\sthe\sgame', cleaned_line)
+    if match:
+        return ("leave", match.group(1))
+    if "Kicked " in cleaned_line and " lost connection" not in cleaned_line:
+        match = re.search(r'Kicked ([a-zA-Z0-9_]+): (.*)', cleaned_line)
+        if match:
+            return ("kick", match.group(1))
+    if "Banned " in cleaned_line and " IP " not in cleaned_line:
+        match = re.search(r'Banned ([a-zA-Z0-9_]+): (.*)', cleaned_line)
+        if match:
+            return ("ban", match.group(1))
+    if "Banned IP " in cleaned_line:
+        match = re.search(r'Banned IP ([0-9.]+): (.*)', cleaned_line)
+        if match:
+            return ("ban-ip", match.group(1))
+    if "Unbanned " in cleaned_line and " IP " not in cleaned_line:
+        match = re.search(r'Unbanned ([a-zA-Z0-9_]+)', cleaned_line)
+        if match:
+            return ("unban", match.group(1))
+    if "Unbanned IP " in cleaned_line:
+        match = re.search(r'Unbanned IP ([0-9.]+)', cleaned_line)
+        if match:
+            return ("unban-ip", match.group(1))
+    return None
+
+
+def run(label, fn, lines):
+    events = Counter()
+    start = time.perf_counter()
+    for line in lines:
+        event = fn(line)
+        if event:
+            events[event[0]] += 1
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {elapsed:7.2f} s {len(lines) / elapsed:12.0f} lines/s  {dict(sorted(events.items()))}")
+    return events
+
+
+def benchmark():
+    if LOG_PATH:
+        lines = load_log(LOG_PATH)
+        source = LOG_PATH
+    else:
+        lines = synthetic_log(LINES)
+        source = f"synthetic, {EVENT_RATIO:.1%} player events"
+    print(f"Classifying {len(lines)} lines ({source}), {MOD_LOADER} format")
+
+    classifier = get_classifier(MOD_LOADER)
+    manager = PlayerManager(MOD_LOADER)
+
+    def classify(line):
+        match = classifier.classify(line.strip())
+        if not match or match.kind == "uuid":
+            return None
+        kind = match.kind
+        if kind == "login":
+            kind = "join"
+        elif kind == "left":
+            kind = "leave"
+        elif kind == "lost":
+            reason = match.fields["reason"]
+            kind = "kick" if "Kicked" in reason or "kicked" in reason else "leave"
+        return (kind, match.fields.get("user"))
+
+    def parse(line):
+        event = manager.parse_log_line(line, update_state=False)
+        return (event["type"], event["user"]) if event else None
+
+    before = run("re.search chain (before)", legacy_parse, lines)
+    run("LogClassifier.classify (after)", classify, lines)
+    after = run("PlayerManager.parse_log_line (after)", parse, lines)
+    if before != after:
+        print(f"WARN: event counts differ: before={dict(before)} after={dict(after)}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,107 @@
+import sys
+import os
+import time
+import asyncio
+
+# Setup path
+sys.path.append(os.getcwd())
+
+from app.services.minecraft.log_broadcaster import LogBroadcaster
+
+SUBSCRIBERS = int(os.getenv("BENCH_SUBSCRIBERS", "200"))
+STALLED = int(os.getenv("BENCH_STALLED", "20"))  # Tabs that stopped reading (dead or frozen)
+LINES = int(os.getenv("BENCH_LINES", "20000"))
+CHUNK = 100  # Lines published between yields, like one stdout read
+# Same defaults as the console WebSocket in routes/servers.py
+CONSOLE_BATCH_MS = float(os.getenv("CONSOLE_BATCH_MS", "50"))
+CONSOLE_BATCH_LINES = int(os.getenv("CONSOLE_BATCH_LINES", "500"))
+
+
+def line(i):
+    return f"[12:00:00] [Server thread/INFO]: stress line {i} " + "x" * 60
+
+
+async def reader(sub, received):
+    """A live viewer: batches like the WebSocket pump"""
+    try:
+        while True:
+            lines = await sub.get_batch(CONSOLE_BATCH_LINES, CONSOLE_BATCH_MS / 1000)
+            received[0] += len(lines)
+    except Exception:
+        pass
+
+
+async def run_broadcaster():
+    broadcaster = LogBroadcaster()
+    live = [broadcaster.subscribe() for _ in range(SUBSCRIBERS - STALLED)]
+    stalled = [broadcaster.subscribe() for _ in range(STALLED)]
+    received = [0]
+    tasks = [asyncio.create_task(reader(sub, received)) for sub in live]
+
+    publish_time = 0.0
+    for start in range(0, LINES, CHUNK):
+        started = time.perf_counter()
+        for i in range(start, min(start + CHUNK, LINES)):
+            broadcaster.publish(line(i))
+        publish_time += time.perf_counter() - started
+        await asyncio.sleep(0)
+    await asyncio.sleep(CONSOLE_BATCH_MS / 1000 * 2)
+
+    stats = broadcaster.get_stats()
+    live_dropped = sum(sub.total_dropped for sub in live)
+    stalled_dropped = sum(sub.total_dropped for sub in stalled)
+
+    # Viewers disconnecting: the WebSocket's finally releases the subscription
+    for sub in live + stalled:
+        broadcaster.unsubscribe(sub)
+    await asyncio.gather(*tasks)
+
+    print(f"{'bounded broadcaster':<24} publish {publish_time * 1e6 / LINES:7.1f} us/line  "
+          f"buffered {stats['buffered_lines']:8d} lines  "
+          f"live received {received[0]:9d} dropped {live_dropped:7d}  stalled dropped {stalled_dropped:7d}  "
+          f"subscribers after disconnect {broadcaster.subscriber_count}")
+
+
+async def run_unbounded_queues():
+    """The previous design: one unbounded asyncio.Queue per viewer, awaited one after another"""
+    queues = [asyncio.Queue() for _ in range(SUBSCRIBERS)]
+    live, stalled = queues[:SUBSCRIBERS - STALLED], queues[SUBSCRIBERS - STALLED:]
+    received = [0]
+
+    async def queue_reader(queue):
+        while True:
+            await queue.get()
+            received[0] += 1
+
+    tasks = [asyncio.create_task(queue_reader(q)) for q in live]
+
+    publish_time = 0.0
+    for start in range(0, LINES, CHUNK):
+        started = time.perf_counter()
+        for i in range(start, min(start + CHUNK, LINES)):
+            text = line(i)
+            for queue in queues:
+                await queue.put(text)
+        publish_time += time.perf_counter() - started
+        await asyncio.sleep(0)
+    await asyncio.sleep(CONSOLE_BATCH_MS / 1000 * 2)
+
+    buffered = sum(q.qsize() for q in queues)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Nothing ever unsubscribed, so every queue stays referenced
+    print(f"{'unbounded queues':<24} publish {publish_time * 1e6 / LINES:7.1f} us/line  "
+          f"buffered {buffered:8d} lines  "
+          f"live received {received[0]:9d} dropped {0:7d}  stalled dropped {0:7d}  "
+          f"subscribers after disconnect {len(queues)}")
+
+
+def benchmark():
+    print(f"Console fan-out: {SUBSCRIBERS} subscribers ({STALLED} stalled), {LINES} lines")
+    asyncio.run(run_unbounded_queues())
+    asyncio.run(run_broadcaster())
+
+
+if __name__ == "__main__":
+    benchmark()
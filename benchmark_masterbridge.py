@@ -0,0 +1,187 @@
+import sys
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+import threading
+
+# Setup path
+sys.path.append(os.getcwd())
+
+# Every dashboard refresh should reach the mods; the TTL cache would hide that
+os.environ.setdefault("MB_TTL_STATUS", "0")
+os.environ.setdefault("MB_TTL_PLAYERS", "0")
+
+import httpx
+
+from app.services.minecraft.masterbridge_client import (
+    MasterBridgeClient, close_http_client, MB_MAX_CONNECTIONS, MB_MAX_KEEPALIVE
+)
+
+# Per-request INFO lines and timeout warnings would drown the results
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("app.services.minecraft.masterbridge_client").setLevel(logging.ERROR)
+
+SERVERS = int(os.getenv("BENCH_SERVERS", "50"))
+HUNG = int(os.getenv("BENCH_HUNG", "2"))  # Mod accepts connections but never answers
+DOWN = int(os.getenv("BENCH_DOWN", "3"))  # Nothing listening (server stopped, mod missing)
+DELAY_MS = float(os.getenv("BENCH_DELAY_MS", "10"))  # Answer delay of healthy mods
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+LEGACY_TIMEOUT = 5.0  # requests.get(..., timeout=5) of the previous client
+
+# What one server card of the dashboard asks its mod for
+ENDPOINTS = ("/api/server-status", "/api/online-players")
+
+
+class FakeMod:
+    """Local MasterBridge stand-in: keep-alive HTTP/1.1 serving canned JSON"""
+
+    def __init__(self, index: int, delay: float = 0.0, hang: bool = False):
+        self.routes = {
+            "/api/server-status": {"online_players": index % 8, "max_players": 20, "motd": f"Server {index}",
+                                   "version": "1.20.1", "mspt": 12.5},
+            "/api/online-players": [
+                {"name": f"Player{i}", "uuid": f"00000000-0000-0000-0000-{i:012d}", "ping": 30,
+                 "health": 20.0, "food": 20, "level": i, "dimension": "minecraft:overworld",
+                 "pos": {"x": i, "y": 64, "z": -i}}
+                for i in range(index % 8)
+            ],
+            "/api/full-state": {"online_count": index % 8, "max_players": 20, "players": []},
+        }
+        self.delay = delay
+        self.hang = hang
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value.strip())
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+                if self.hang:
+                    await reader.read()  # Until the client gives up
+                    break
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                path = request_line.split()[1].decode()
+                body = json.dumps(self.routes.get(path, {"error": "not found"})).encode()
+                status = "200 OK" if path in self.routes else "404 Not Found"
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mods():
+    """Run the stand-ins on their own loop thread, so a blocking client can't stall them"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    async def start_all():
+        mods, ports = [], []
+        for i in range(SERVERS):
+            if i < DOWN:
+                ports.append(unused_port())
+                continue
+            mod = FakeMod(i, delay=DELAY_MS / 1000, hang=i < DOWN + HUNG)
+            ports.append(await mod.start())
+            mods.append(mod)
+        return mods, ports
+
+    mods, ports = asyncio.run_coroutine_threadsafe(start_all(), loop).result()
+    return loop, mods, ports
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def timed(coro):
+    started = time.perf_counter()
+    await coro
+    return (time.perf_counter() - started) * 1000
+
+
+async def legacy_card(port):
+    """The previous client: a blocking request per call, made from async code"""
+    for endpoint in ENDPOINTS:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}{endpoint}", timeout=LEGACY_TIMEOUT).json()
+        except httpx.HTTPError:
+            pass
+
+
+async def async_card(client):
+    await asyncio.gather(client.get_server_status(), client.get_online_players_detailed())
+
+
+async def refresh(cards, healthy):
+    """All server cards load at once, like the dashboard's per-card requests"""
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(timed(card) for card in cards))
+    elapsed = (time.perf_counter() - started) * 1000
+    healthy_latencies = [latencies[i] for i in healthy]
+    return elapsed, percentile(healthy_latencies, 0.5), percentile(healthy_latencies, 0.99)
+
+
+async def benchmark():
+    print(f"Dashboard refresh: {SERVERS} MasterBridge servers ({HUNG} hung, {DOWN} down, "
+          f"healthy mods answer after {DELAY_MS:.0f} ms), {len(ENDPOINTS)} requests per server, "
+          f"pool {MB_MAX_CONNECTIONS} connections / {MB_MAX_KEEPALIVE} keep-alive")
+    loop, mods, ports = start_mods()
+    healthy = range(DOWN + HUNG, SERVERS)
+
+    elapsed, p50, p99 = await refresh([legacy_card(port) for port in ports], healthy)
+    # Cards run back to back here: each one blocks the event loop until it is done
+    print(f"{'blocking client':<22} round 1  {elapsed:8.1f} ms  healthy card p50 {p50:8.1f} ms  p99 {p99:8.1f} ms")
+
+    clients = [MasterBridgeClient("127.0.0.1", port) for port in ports]
+    for round_number in range(1, ROUNDS + 1):
+        elapsed, p50, p99 = await refresh([async_card(client) for client in clients], healthy)
+        open_circuits = sum(1 for client in clients if client.breaker.is_open)
+        print(f"{'async pooled client':<22} round {round_number}  {elapsed:8.1f} ms  healthy card p50 {p50:8.1f} ms  "
+              f"p99 {p99:8.1f} ms  open circuits {open_circuits}")
+
+    connections = sum(mod.connections for mod in mods)
+    requests = sum(mod.requests for mod in mods)
+    print(f"Stand-ins saw {requests} requests over {connections} connections "
+          f"(the blocking client opens one per request)")
+
+    for client in clients:
+        client.close()
+    await close_http_client()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
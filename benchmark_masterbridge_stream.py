@@ -0,0 +1,195 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import logging
+import contextlib
+from collections import Counter
+
+# Setup path
+sys.path.append(os.getcwd())
+
+from app.services.minecraft.masterbridge_client import MasterBridgeClient, close_http_client
+from app.services.minecraft.masterbridge_stream import MasterBridgeStream, MB_STREAM_PATH, MB_POLL_INTERVAL
+
+# Timeout warnings of stopped streams would drown the results
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+SERVERS = int(os.getenv("BENCH_SERVERS", "5"))
+VIEWERS = int(os.getenv("BENCH_VIEWERS", "10"))  # Open server pages, each polling every endpoint
+UI_INTERVAL = float(os.getenv("BENCH_UI_INTERVAL", "1"))
+DURATION = float(os.getenv("BENCH_DURATION", "10"))
+CHANGE_INTERVAL = float(os.getenv("BENCH_CHANGE_INTERVAL", "1"))  # How often the game state changes
+
+# What a server page polls (/masterbridge/* routes)
+VIEWER_READS = ("get_online_players_detailed", "get_server_status", "get_chat_log", "get_active_events")
+
+
+class FakeEmitter:
+    """
+    Local MasterBridge stand-in with an event stream: the read endpoints over
+    keep-alive HTTP/1.1, plus a Server-Sent Events endpoint that sends every
+    endpoint once on connect and then pushes each change as it happens
+    """
+
+    def __init__(self, index: int, stream: bool = True):
+        self.index = index
+        self.stream = stream
+        self.tick = 0
+        self.chat = []
+        self.requests = Counter()
+        self.events_sent = 0
+        self.closed = False
+        self._changed = asyncio.Condition()
+        self._handlers = set()
+        self._server = None
+        self._ticker = None
+
+    def state(self, endpoint: str):
+        online = (self.index + self.tick) % 8
+        return {
+            "/api/full-state": {"online_count": online, "max_players": 20,
+                                "players": [f"Player{i}" for i in range(online)]},
+            "/api/online-players": [{"name": f"Player{i}", "uuid": f"00000000-0000-0000-0000-{i:012d}",
+                                     "ping": 30 + self.tick % 10, "health": 20.0, "level": i,
+                                     "dimension": "minecraft:overworld", "pos": {"x": self.tick, "y": 64, "z": i}}
+                                    for i in range(online)],
+            "/api/server-status": {"online_players": online, "max_players": 20, "motd": f"Server {self.index}",
+                                   "version": "1.20.1", "mspt": 10.0 + self.tick % 5},
+            "/api/chat-log": self.chat[-50:],
+            "/api/active-events": {"wave_events": [], "cinematics": [], "special_event_active": False},
+        }.get(endpoint)
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self._ticker = asyncio.create_task(self._tick())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def _tick(self):
+        """The game: players move every CHANGE_INTERVAL, somebody chats every other change"""
+        while True:
+            await asyncio.sleep(CHANGE_INTERVAL)
+            self.tick += 1
+            if self.tick % 2 == 0:
+                self.chat.append({"sender": f"Player{self.tick % 3}", "message": f"hello {self.tick}"})
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def _handle(self, reader, writer):
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                path = request_line.split()[1].decode()
+                self.requests[path] += 1
+                if path == MB_STREAM_PATH and self.stream:
+                    await self._serve_stream(writer)
+                    break
+                data = self.state(path)
+                body = json.dumps(data if data is not None else {"error": "not found"}).encode()
+                status = "200 OK" if data is not None else "404 Not Found"
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self._handlers.discard(asyncio.current_task())
+
+    def _event(self, writer, name: str, data):
+        payload = f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+        writer.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+        self.events_sent += 1
+
+    async def _serve_stream(self, writer):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n")
+        for endpoint in ("/api/full-state", "/api/online-players", "/api/server-status",
+                         "/api/chat-log", "/api/active-events"):
+            self._event(writer, endpoint[5:], self.state(endpoint))
+        await writer.drain()
+        chat_sent = len(self.chat)
+        while True:
+            async with self._changed:
+                await self._changed.wait()
+            if self.closed:
+                writer.write(b"0\r\n\r\n")  # End of the chunked body
+                await writer.drain()
+                return
+            for endpoint in ("/api/full-state", "/api/online-players", "/api/server-status"):
+                self._event(writer, endpoint[5:], self.state(endpoint))
+            for message in self.chat[chat_sent:]:
+                self._event(writer, "chat", message)
+            chat_sent = len(self.chat)
+            await writer.drain()
+
+    async def close(self):
+        self.closed = True
+        self._ticker.cancel()
+        self._server.close()
+        async with self._changed:
+            self._changed.notify_all()
+        if self._handlers:
+            await asyncio.wait(self._handlers, timeout=1)
+
+
+async def viewer(clients, stop_at, served):
+    while time.monotonic() < stop_at:
+        for client in clients:
+            results = await asyncio.gather(*(getattr(client, read)() for read in VIEWER_READS))
+            served["answered"] += sum(1 for r in results if r is not None)
+            served["missing"] += sum(1 for r in results if r is None)
+        await asyncio.sleep(UI_INTERVAL)
+
+
+async def run_mode(mode: str):
+    emitters = [FakeEmitter(i, stream=(mode == "sse")) for i in range(SERVERS)]
+    clients = []
+    for emitter in emitters:
+        client = MasterBridgeClient("127.0.0.1", await emitter.start())
+        client.stream = MasterBridgeStream(client, mode)
+        client.stream.start()
+        clients.append(client)
+    if mode != "off":
+        await asyncio.sleep(0.5)  # First snapshot
+
+    served = Counter()
+    started = time.monotonic()
+    await asyncio.gather(*(viewer(clients, started + DURATION, served) for _ in range(VIEWERS)))
+    elapsed = time.monotonic() - started
+
+    upstream = sum(sum(e.requests.values()) for e in emitters)
+    events = sum(e.events_sent for e in emitters)
+    label = {"off": "on demand (TTL cache)", "poll": f"poll every {MB_POLL_INTERVAL:g} s", "sse": "SSE stream"}[mode]
+    result = (f"{label:<24} {upstream:6d} upstream requests ({upstream / elapsed / SERVERS:6.2f}/s per server)  "
+              f"{events:5d} events pushed  {served['answered']:6d} reads answered  {served['missing']:4d} missing")
+
+    # Clients first: closing the pool ends the keep-alive and stream connections
+    for client in clients:
+        client.close()
+    await close_http_client()
+    for emitter in emitters:
+        await emitter.close()
+    return result
+
+
+async def benchmark():
+    print(f"MasterBridge ingestion: {SERVERS} servers, {VIEWERS} viewers per server page polling "
+          f"{len(VIEWER_READS)} endpoints every {UI_INTERVAL:g} s for {DURATION:g} s, state changes every {CHANGE_INTERVAL:g} s")
+    results = []
+    for mode in ("off", "poll", "sse"):
+        # Stream connects/drops print DEBUG lines; keep them off the results
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results.append(await run_mode(mode))
+    for line in results:
+        print(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
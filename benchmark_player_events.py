@@ -0,0 +1,101 @@
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import datetime
+
+# Setup path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, Server, PlayerDetail
+from app.services.player_event_writer import PlayerEventWriter
+
+EVENTS = int(os.getenv("BENCH_EVENTS", "20000"))
+SERVERS = int(os.getenv("BENCH_SERVERS", "4"))
+PLAYERS = int(os.getenv("BENCH_PLAYERS", "500"))
+
+
+def make_engine(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30})
+
+    # Same pragmas as database/connection.py
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def make_events(server_ids, count):
+    """Alternating join/leave events of PLAYERS players per server, like a reconnect storm"""
+    joined_at = (datetime.datetime.now() - datetime.timedelta(minutes=5)).isoformat()
+    events = []
+    for i in range(count):
+        server_id = server_ids[i % len(server_ids)]
+        user = f"Player{(i // len(server_ids)) % PLAYERS}"
+        if (i // (len(server_ids) * PLAYERS)) % 2 == 0:
+            events.append((server_id, {"type": "join", "user": user}, "127.0.0.1"))
+        else:
+            events.append((server_id, {"type": "leave", "user": user, "joined_at": joined_at}, None))
+    return events
+
+
+async def run_writer(writer, events):
+    for server_id, ev, ip in events:
+        # Producer faster than the writer: wait instead of overflowing the queue
+        while writer._queue is not None and writer._queue.full():
+            await asyncio.sleep(0.001)
+        writer.enqueue(server_id, ev, ip)
+    # Sustained rate: until the last event is committed
+    while writer.written + writer.dropped < len(events) and not writer.errors:
+        await asyncio.sleep(0.01)
+    await writer.flush()
+
+
+def benchmark():
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, per_event in (("one transaction per event", True), ("write-behind batches", False)):
+            engine = make_engine(os.path.join(tmp, f"{'single' if per_event else 'batched'}.db"))
+            Session = sessionmaker(bind=engine)
+            db = Session()
+            servers = [Server(name=f"bench_{i}", port=30000 + i) for i in range(SERVERS)]
+            db.add_all(servers)
+            db.commit()
+            server_ids = [s.id for s in servers]
+            db.close()
+
+            count = EVENTS // 10 if per_event else EVENTS
+            events = make_events(server_ids, count)
+            writer = PlayerEventWriter(session_factory=Session)
+
+            start = time.perf_counter()
+            if per_event:
+                now = datetime.datetime.now()
+                for server_id, ev, ip in events:
+                    writer.apply([(server_id, ev, ip, now)])
+            else:
+                asyncio.run(run_writer(writer, events))
+            elapsed = time.perf_counter() - start
+
+            db = Session()
+            details = db.query(PlayerDetail).count()
+            playtime = db.query(func.sum(PlayerDetail.total_playtime_seconds)).scalar() or 0
+            db.close()
+            print(f"{label:<28} {count:7d} events {elapsed:7.2f} s {count / elapsed:10.0f} events/s "
+                  f"{writer.flushes:6d} transactions  {details} detail rows  {playtime / 3600:.1f} h playtime  "
+                  f"dropped={writer.dropped}")
+            if not playtime and any(ev["type"] == "leave" for _, ev, _ in events):
+                print("WARN: leave events added no playtime")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    benchmark()
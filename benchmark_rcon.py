@@ -0,0 +1,175 @@
+import sys
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import contextlib
+
+# Setup path
+sys.path.append(os.getcwd())
+
+# Keep the benchmark's log index out of database/instance
+TEMP_INDEX_DIR = None
+if "LOG_INDEX_DIR" not in os.environ:
+    TEMP_INDEX_DIR = os.environ["LOG_INDEX_DIR"] = tempfile.mkdtemp(prefix="bench_log_index_")
+
+from app.services.minecraft.process import MinecraftProcess
+from app.services.minecraft.rcon import (
+    rcon_pool, encode_packet, read_packet, TYPE_AUTH, TYPE_COMMAND, TYPE_RESPONSE
+)
+
+COMMANDS = int(os.getenv("BENCH_COMMANDS", "500"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "20"))  # Commands in flight for the pipelined run
+PASSWORD = "bench"
+RESPONSE = "There are 3 of a max of 20 players online: Alice, Bob, Carol"
+FRAGMENT = 4096  # Vanilla splits responses into packets of this many bytes
+
+# Stand-in for the JVM console: answers every stdin command with a log line on stdout
+FAKE_CONSOLE = r'''
+import sys
+for line in sys.stdin:
+    if line.strip():
+        sys.stdout.write("[12:00:00] [Server thread/INFO]: %s\n" % sys.argv[1])
+        sys.stdout.flush()
+'''
+
+
+class FakeRconServer:
+    """Local RCON stand-in: auth, commands, fragmented responses, "Unknown request" for other types"""
+
+    def __init__(self, password: str = PASSWORD, response: str = RESPONSE):
+        self.password = password
+        self.response = response
+        self.connections = 0
+        self.commands = 0
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        authed = False
+        try:
+            while True:
+                request_id, packet_type, payload = await read_packet(reader)
+                if packet_type == TYPE_AUTH:
+                    authed = payload == self.password
+                    writer.write(encode_packet(request_id if authed else -1, TYPE_COMMAND, ""))
+                elif not authed:
+                    writer.write(encode_packet(-1, TYPE_COMMAND, ""))
+                elif packet_type == TYPE_COMMAND:
+                    self.commands += 1
+                    data = self.response
+                    for start in range(0, max(len(data), 1), FRAGMENT):
+                        writer.write(encode_packet(request_id, TYPE_RESPONSE, data[start:start + FRAGMENT]))
+                else:
+                    writer.write(encode_packet(request_id, TYPE_RESPONSE, f"Unknown request {packet_type:x}"))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def report(label, latencies, elapsed):
+    return (f"{label:<32} {len(latencies):6d} commands {elapsed:7.2f} s {len(latencies) / elapsed:9.0f} cmd/s  "
+            f"p50 {percentile(latencies, 0.5):7.2f} ms  p99 {percentile(latencies, 0.99):7.2f} ms")
+
+
+async def timed(coro):
+    started = time.perf_counter()
+    await coro
+    return (time.perf_counter() - started) * 1000
+
+
+async def run_rcon(working_dir):
+    server = FakeRconServer()
+    port = await server.start()
+    with open(os.path.join(working_dir, "server.properties"), "w") as f:
+        f.write(f"enable-rcon=true\nrcon.port={port}\nrcon.password={PASSWORD}\n")
+
+    process = MinecraftProcess("bench_rcon", 1024, "server.jar", working_dir)
+    process._mark_alive(os.getpid())  # write() only uses RCON for running servers
+    assert await process.write("list") == RESPONSE  # Connect and authenticate once
+    results = []
+
+    started = time.perf_counter()
+    latencies = [await timed(process.write("list")) for _ in range(COMMANDS)]
+    results.append(report("RCON, one at a time", latencies, time.perf_counter() - started))
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def limited():
+        async with semaphore:
+            return await timed(process.write("list"))
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(limited() for _ in range(COMMANDS)))
+    results.append(report(f"RCON, {CONCURRENCY} in flight", latencies, time.perf_counter() - started))
+    results.append(f"{'':<32} stand-in saw {server.connections} connection(s), {server.commands} commands")
+
+    await rcon_pool.close(process.name)
+    await server.close()
+    return results
+
+
+async def run_stdin(working_dir):
+    """stdin write, then wait for the answer on the console stream (what callers had to do before)"""
+    process = MinecraftProcess("bench_stdin", 1024, "server.jar", working_dir)
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", FAKE_CONSOLE, RESPONSE,
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE
+    )
+    process.process = proc
+    process._mark_alive(proc.pid)
+    reader = asyncio.create_task(process._read_stdout())
+    sub = process.subscribe_logs()
+
+    async def scrape():
+        await process.write("list")
+        while RESPONSE not in await sub.get():
+            pass
+
+    await scrape()
+    started = time.perf_counter()
+    latencies = [await timed(scrape()) for _ in range(COMMANDS)]
+    result = report("stdin + console scrape", latencies, time.perf_counter() - started)
+
+    proc.stdin.close()
+    await reader
+    process.log_index.close()
+    process.flush_activity()
+    return [result]
+
+
+async def benchmark():
+    print(f"Console command round-trips: {COMMANDS} 'list' commands against local stand-ins")
+    results = []
+    for run in (run_rcon, run_stdin):
+        with tempfile.TemporaryDirectory() as working_dir:
+            os.makedirs(os.path.join(working_dir, "logs"))
+            # MinecraftProcess echoes console lines; keep them off the terminal
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results += await run(working_dir)
+    for line in results:
+        print(line)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(benchmark())
+    finally:
+        if TEMP_INDEX_DIR:
+            shutil.rmtree(TEMP_INDEX_DIR, ignore_errors=True)
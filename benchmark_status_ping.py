@@ -0,0 +1,149 @@
+import sys
+import os
+import json
+import time
+import socket
+import asyncio
+import tempfile
+
+# Setup path
+sys.path.append(os.getcwd())
+
+from app.services.minecraft.status_ping import StatusPoller, ping_server, read_packet, pack_packet, pack_string
+
+SERVERS = int(os.getenv("BENCH_SERVERS", "50"))
+HUNG = int(os.getenv("BENCH_HUNG", "5"))  # Accept the connection but never answer (frozen JVM)
+DOWN = int(os.getenv("BENCH_DOWN", "5"))  # Nothing listening on the port
+DELAY_MS = float(os.getenv("BENCH_DELAY_MS", "20"))  # Answer delay of the healthy servers (busy tick)
+TIMEOUT = float(os.getenv("BENCH_TIMEOUT", "1"))
+SWEEPS = int(os.getenv("BENCH_SWEEPS", "3"))
+
+
+class FakeSlpServer:
+    """Local Server List Ping stand-in: handshake, status JSON, ping/pong"""
+
+    def __init__(self, index: int, delay: float = 0.0, hang: bool = False):
+        self.status = {
+            "version": {"name": "1.20.4", "protocol": 765},
+            "players": {"max": 20, "online": index % 5,
+                        "sample": [{"name": f"Player{i}", "id": f"00000000-0000-0000-0000-{i:012d}"}
+                                   for i in range(index % 5)]},
+            "description": {"text": f"Bench server {index}", "extra": [{"text": " (fake)"}]},
+        }
+        self.delay = delay
+        self.hang = hang
+        self.requests = 0
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        self.requests += 1
+        try:
+            await read_packet(reader)  # Handshake
+            await read_packet(reader)  # Status request
+            if self.hang:
+                await reader.read()  # Until the client gives up
+                return
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            writer.write(pack_packet(0x00, pack_string(json.dumps(self.status))))
+            await writer.drain()
+            _, payload = await read_packet(reader)  # Ping
+            writer.write(pack_packet(0x01, payload))
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+class FakeProcess:
+    """What the poller needs from MinecraftProcess"""
+
+    def __init__(self, working_dir: str):
+        self.working_dir = working_dir
+
+    def is_running(self):
+        return True
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def sequential_sweep(targets):
+    """One server after another, each with the same deadline"""
+    results = {}
+    for name, (host, port) in targets.items():
+        try:
+            results[name] = await asyncio.wait_for(ping_server(host, port), timeout=TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            pass
+    return results
+
+
+async def benchmark():
+    healthy = SERVERS - HUNG - DOWN
+    print(f"Server List Ping: {SERVERS} servers ({healthy} answering after {DELAY_MS:.0f} ms, "
+          f"{HUNG} hung, {DOWN} down), {TIMEOUT:.1f} s deadline")
+
+    fakes = []
+    processes = {}
+    targets = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(SERVERS):
+            if i < DOWN:
+                port = unused_port()
+            else:
+                fake = FakeSlpServer(i, delay=DELAY_MS / 1000, hang=i < DOWN + HUNG)
+                port = await fake.start()
+                fakes.append(fake)
+            working_dir = os.path.join(tmp, f"server_{i}")
+            os.makedirs(working_dir)
+            with open(os.path.join(working_dir, "server.properties"), "w") as f:
+                f.write(f"server-port={port}\n")
+            processes[f"server_{i}"] = FakeProcess(working_dir)
+            targets[f"server_{i}"] = ("127.0.0.1", port)
+
+        started = time.perf_counter()
+        results = await sequential_sweep(targets)
+        elapsed = time.perf_counter() - started
+        print(f"{'sequential pings':<28} {elapsed * 1000:9.1f} ms/sweep  {len(results):3d} answered")
+
+        poller = StatusPoller(timeout=TIMEOUT)
+        poller._processes = processes
+        timings = []
+        for _ in range(SWEEPS):
+            started = time.perf_counter()
+            await poller.sweep()
+            timings.append(time.perf_counter() - started)
+        answered = sum(1 for name in processes if poller.get(name))
+        print(f"{'StatusPoller.sweep':<28} {sum(timings) / len(timings) * 1000:9.1f} ms/sweep  {answered:3d} answered "
+              f"(best {min(timings) * 1000:.1f} ms over {SWEEPS} sweeps)")
+
+        started = time.perf_counter()
+        for _ in range(1000):
+            for name in processes:
+                poller.get(name)
+        elapsed = time.perf_counter() - started
+        print(f"{'cached lookup (get_stats)':<28} {elapsed / (1000 * SERVERS) * 1e6:9.2f} us/server")
+
+        latencies = sorted(poller.get(name)["latency_ms"] for name in processes if poller.get(name))
+        if latencies:
+            print(f"Reported ping latency: min {latencies[0]:.2f} ms, max {latencies[-1]:.2f} ms")
+
+        for fake in fakes:
+            await fake.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
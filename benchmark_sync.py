@@ -0,0 +1,73 @@
+import sys
+import os
+import time
+
+# Setup path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, Server, Player, PlayerDetail
+from app.services.masterbridge_sync_service import MasterBridgeSyncService
+
+PLAYERS = int(os.getenv("BENCH_PLAYERS", "500"))
+
+
+def make_players(count):
+    return [
+        {
+            "name": f"Player{i}",
+            "uuid": f"00000000-0000-0000-0000-{i:012d}",
+            "health": 20.0,
+            "level": i % 30,
+            "dimension": "minecraft:overworld",
+            "pos": {"x": i * 1.5, "y": 64.0, "z": -i * 2.0}
+        }
+        for i in range(count)
+    ]
+
+
+def run(label, fn, stats):
+    stats["statements"] = 0
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<40} {elapsed:8.1f} ms {stats['statements']:6d} statements  {result}")
+
+
+def benchmark():
+    url = os.getenv("BENCH_DB_URL", "sqlite://")
+    print(f"Benchmarking MasterBridge sync against {url} ({PLAYERS} players)")
+    engine = create_engine(url)
+    stats = {"statements": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*args):
+        stats["statements"] += 1
+
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        server = Server(name="benchmark_sync", port=25599)
+        db.add(server)
+        db.commit()
+        server_id = server.id
+
+        players = make_players(PLAYERS)
+
+        run("sync_players (all new)", lambda: MasterBridgeSyncService.sync_players(db, server_id, players), stats)
+        run("sync_players (unchanged)", lambda: MasterBridgeSyncService.sync_players(db, server_id, players), stats)
+        for p in players[::10]:
+            p["pos"]["x"] += 10
+        run("sync_players (10% moved)", lambda: MasterBridgeSyncService.sync_players(db, server_id, players), stats)
+
+        print(f"Rows: {db.query(Player).count()} players, {db.query(PlayerDetail).count()} details")
+    finally:
+        db.close()
+        if url != "sqlite://":
+            Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    benchmark()
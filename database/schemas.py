@@ -53,6 +53,23 @@ class ServerStats(BaseModel):
     status: str
     cpu: float
     ram: float
+    players: Optional[int] = 0
+    # Time the manager spent in start() before the JVM was exec'd
+    launch_overhead_ms: Optional[float] = None
+    # Server List Ping: version, motd, players_online/max, sample, latency_ms
+    ping: Optional[dict] = None
+    # UDP Query: players, plugins, map, software
+    query: Optional[dict] = None
+    # MasterBridge read cache counters: hits, misses, coalesced, hit_ratio
+    mb_cache: Optional[dict] = None
+    # MasterBridge circuit breaker: state (CLOSED/OPEN), consecutive_failures, last_error...
+    mb_health: Optional[dict] = None
+    # MasterBridge push/poll ingestion (MB_STREAM_MODE): mode, connected, upstream_requests...
+    mb_stream: Optional[dict] = None
+    # MasterBridge -> database sync: lag_seconds, last_duration_ms, rows_written, rows_skipped...
+    mb_sync: Optional[dict] = None
+    # Player stats file watcher: backend, changes_seen, syncs, players_synced, rows_written...
+    stats_watch: Optional[dict] = None
 
 class Token(BaseModel):
     access_token: str
@@ -0,0 +1,61 @@
+"""
+Set-based INSERT ... ON CONFLICT helpers
+One statement per table instead of a SELECT + INSERT/UPDATE per row, using
+the native upsert of SQLite, PostgreSQL or MySQL/MariaDB.
+"""
+from typing import Dict, List, Sequence
+
+from sqlalchemy import insert as generic_insert, tuple_
+from sqlalchemy.orm import Session
+
+
+def upsert(db: Session, model, rows: List[Dict], key_columns: Sequence[str], update_columns: Sequence[str]) -> None:
+    """
+    Insert `rows` into `model`'s table, updating `update_columns` of rows whose
+    `key_columns` (the primary key or a unique constraint) already exist.
+    Runs inside the caller's transaction; committing is up to the caller.
+    """
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(model)
+        if update_columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_={c: stmt.excluded[c] for c in update_columns}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(key_columns))
+        db.execute(stmt, rows)
+
+    elif dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(model)
+        # MySQL needs at least one assignment; re-assigning a key column is a no-op
+        columns = list(update_columns) or [key_columns[0]]
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columns})
+        db.execute(stmt, rows)
+
+    else:
+        # No native upsert (key_columns must be the primary key here): find which
+        # keys exist, then bulk insert the new rows and bulk update the rest
+        table = model.__table__
+        key_cols = [table.c[k] for k in key_columns]
+        keys = [tuple(r[k] for k in key_columns) for r in rows]
+        existing = set()
+        for start in range(0, len(keys), 500):
+            existing.update(tuple(r) for r in db.execute(
+                table.select().with_only_columns(*key_cols).where(tuple_(*key_cols).in_(keys[start:start + 500]))
+            ))
+        new_rows = [r for r, k in zip(rows, keys) if k not in existing]
+        old_rows = [r for r, k in zip(rows, keys) if k in existing]
+        if new_rows:
+            db.execute(generic_insert(model), new_rows)
+        if old_rows and update_columns:
+            db.bulk_update_mappings(model, old_rows)
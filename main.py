@@ -91,6 +91,71 @@ async def startup_event():
         print(f"Error loading servers: {e}")
     finally:
         db.close()
+    
+    # Activity history (may parse archived logs) is loaded in the background
+    asyncio.create_task(server_service.load_activity_histories())
+    
+    # Background CPU/RAM sampling for all servers
+    from app.services.minecraft.metrics_sampler import metrics_sampler
+    metrics_sampler.start(server_service.servers)
+    
+    # Server List Ping sweep: status, player counts, version/MOTD
+    from app.services.minecraft.status_ping import status_poller
+    status_poller.start(server_service.servers)
+    
+    # UDP Query sweep for servers with enable-query: full player and plugin lists
+    from app.services.minecraft.query import query_poller
+    query_poller.start(server_service.servers)
+    
+    # MasterBridge push/poll ingestion, when MB_STREAM_MODE enables it
+    for process in server_service.servers.values():
+        if process.masterbridge_client:
+            process.masterbridge_client.start_stream()
+    
+    # Background MasterBridge -> database sync (the player routes read the database)
+    from app.services.masterbridge_sync_scheduler import mb_sync_scheduler
+    mb_sync_scheduler.start(server_service.servers)
+    
+    # Player stats/advancements files -> database, driven by filesystem changes
+    from app.services.minecraft.stats_watcher import stats_watcher
+    stats_watcher.start(server_service.servers)
+    
+    # Index archived logs for search without blocking startup
+    from app.services.minecraft.log_index import backfill_all
+    asyncio.create_task(backfill_all(server_service.servers))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Write out buffered activity log lines
+    for process in server_service.servers.values():
+        process.flush_activity()
+    
+    from app.services.minecraft.log_index import flush_all
+    flush_all()
+    
+    from app.services.player_event_writer import player_event_writer
+    await player_event_writer.flush()
+    
+    from app.services.minecraft.stats_watcher import stats_watcher
+    stats_watcher.stop()
+    
+    from app.services.minecraft.metrics_sampler import metrics_sampler
+    metrics_sampler.stop()
+    
+    from app.services.minecraft.status_ping import status_poller
+    status_poller.stop()
+    
+    from app.services.minecraft.query import query_poller
+    query_poller.stop()
+    
+    from app.services.masterbridge_sync_scheduler import mb_sync_scheduler
+    mb_sync_scheduler.stop()
+    
+    from app.services.minecraft.rcon import rcon_pool
+    await rcon_pool.close_all()
+    
+    from app.services.minecraft.masterbridge_client import close_http_client
+    await close_http_client()
 
 # Page Routes
 @app.get("/")
@@ -159,5 +224,7 @@ if __name__ == "__main__":
         port=port, 
         reload=False, 
         ws="websockets",
+        # Compress console frames (permessage-deflate) for clients that offer it
+        ws_per_message_deflate=os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true",
         log_level="info"
     )
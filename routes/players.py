@@ -8,6 +8,7 @@ from database.models.players.player_stat import PlayerStat
 from database.models.players.player_ban import PlayerBan
 from database.models.players.player_achievement import PlayerAchievement
 from app.services.minecraft import server_service
+import asyncio
 import datetime
 
 router = APIRouter(prefix="/api/players", tags=["players"])
@@ -18,19 +19,32 @@ def get_server_by_name(db: Session, name: str):
         raise HTTPException(status_code=404, detail="Server not found")
     return server
 
+def _load_players(db: Session, server_name: str):
+    """All players of a server with their details, as plain dicts (blocking)"""
+    server = get_server_by_name(db, server_name)
+    players = []
+    for p in db.query(Player).filter(Player.server_id == server.id).all():
+        detail = p.detail
+        players.append({
+            "uuid": p.uuid,
+            "name": p.name,
+            "last_played": detail.last_joined_at if detail else None,
+            "playtime_seconds": detail.total_playtime_seconds if detail and detail.total_playtime_seconds else 0,
+            "ip": detail.last_ip if detail else None
+        })
+    return players
+
 @router.get("/{server_name}")
-def get_players(server_name: str, db: Session = Depends(get_db)):
+async def get_players(server_name: str, db: Session = Depends(get_db)):
     """Get all players for a server (Online + History)"""
-    server = get_server_by_name(db, server_name)
+    # Get All Players from DB (sync SQLAlchemy, kept off the event loop)
+    db_players = await asyncio.get_running_loop().run_in_executor(None, _load_players, db, server_name)
     
     # Get Online Players from Service
     process = server_service.get_process(server_name)
     online_players = []
     if process:
-        online_players = process.get_online_players() # [{username, ip, joined_at, uuid}]
-        
-    # Get All Players from DB
-    db_players = db.query(Player).filter(Player.server_id == server.id).all()
+        online_players = await process.get_online_players() # [{username, ip, joined_at, uuid}]
     
     # Merge Data
     result = []
@@ -39,28 +53,23 @@ def get_players(server_name: str, db: Session = Depends(get_db)):
     online_map = {p['username']: p for p in online_players}
     
     for p in db_players:
-        is_online = p.name in online_map
-        online_info = online_map.get(p.name, {})
-        
-        # Details
-        detail = p.detail
-        last_played = detail.last_joined_at if detail else None
+        is_online = p["name"] in online_map
         
         # Format total playtime
-        playtime_seconds = detail.total_playtime_seconds if detail and detail.total_playtime_seconds else 0
+        playtime_seconds = p["playtime_seconds"]
         hours = playtime_seconds // 3600
         minutes = (playtime_seconds % 3600) // 60
         seconds = playtime_seconds % 60
         playtime_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
         
         result.append({
-            "uuid": p.uuid,
-            "name": p.name,
+            "uuid": p["uuid"],
+            "name": p["name"],
             "is_online": is_online,
-            "last_played": last_played,
+            "last_played": p["last_played"],
             "total_playtime": playtime_str,
-            "ip": detail.last_ip if detail else None, # Maybe hide IP for regular users?
-            "avatar_url": f"https://minotar.net/avatar/{p.name}/64.png" # External API for avatars
+            "ip": p["ip"], # Maybe hide IP for regular users?
+            "avatar_url": f"https://minotar.net/avatar/{p['name']}/64.png" # External API for avatars
         })
         
     # Sort: Online first, then by last_played
@@ -1,7 +1,10 @@
+import asyncio
+import os
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, File, UploadFile, Request
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from database.connection import get_db
 from app.controllers.server_controller import ServerController
 from app.services.audit_service import AuditService
@@ -11,6 +14,10 @@ from database.models.server import Server
 from routes.auth import get_current_user
 
 router = APIRouter(prefix="/api/servers", tags=["Servers"])
+
+# Console lines are coalesced into one frame every CONSOLE_BATCH_MS or CONSOLE_BATCH_LINES lines
+CONSOLE_BATCH_MS = float(os.getenv("CONSOLE_BATCH_MS", "50"))
+CONSOLE_BATCH_LINES = int(os.getenv("CONSOLE_BATCH_LINES", "500"))
 server_controller = ServerController()
 
 @router.get("/", response_model=List[ServerResponse])
@@ -76,29 +83,85 @@ async def control_server(name: str, action: str, request: Request, db: Session =
 def get_server_stats(name: str, current_user: User = Depends(get_current_user)):
     return server_controller.get_server_stats(name)
 
+@router.get("/{name}/stats/history")
+def get_server_stats_history(name: str, minutes: float = 10, resolution: float = None, current_user: User = Depends(get_current_user)):
+    """CPU/RAM/threads/FDs/IO samples of the last N minutes, optionally averaged to `resolution` seconds"""
+    history = server_controller.get_server_stats_history(name, minutes, resolution)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Server not found")
+    return history
+
+@router.get("/{name}/logs/search")
+def search_server_logs(
+    name: str,
+    q: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    level: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    current_user: User = Depends(get_current_user)
+):
+    """Search live and archived console logs, newest first. `level` is a comma-separated list (e.g. WARN,ERROR)."""
+    levels = [l.strip().upper() for l in level.split(",") if l.strip()] if level else None
+    try:
+        result = server_controller.search_logs(
+            name, q,
+            since.timestamp() if since else None,
+            until.timestamp() if until else None,
+            levels, cursor, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Server not found")
+    return result
+
 @router.post("/{name}/command")
 async def send_command(name: str, command: dict, request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     cmd_text = command.get("command")
+    response = None
     if cmd_text:
-        await server_controller.send_command(name, cmd_text)
+        response = await server_controller.send_command(name, cmd_text)
         AuditService.log_action(db, current_user, "SEND_COMMAND", request.client.host, f"Sent command to {name}: {cmd_text}")
-    return {"message": "Command sent"}
+    # `response` is only available when the command went through RCON
+    return {"message": "Command sent", "response": response}
 
 @router.websocket("/{name}/console")
-async def websocket_endpoint(websocket: WebSocket, name: str):
+async def websocket_endpoint(websocket: WebSocket, name: str, replay: bool = True):
     await websocket.accept()
-    queue = server_controller.get_console_queue(name)
+    # Starts with the recent console history unless ?replay=false
+    queue = server_controller.get_console_queue(name, replay)
     
-    if not queue:
+    if queue is None:
         await websocket.close(code=4004, reason="Server not found")
         return
     
-    try:
+    async def pump_logs():
+        # One frame per batch of lines instead of one per line
         while True:
-            log_line = await queue.get()
-            await websocket.send_text(log_line)
-    except WebSocketDisconnect:
-        pass
+            lines = await queue.get_batch(CONSOLE_BATCH_LINES, CONSOLE_BATCH_MS / 1000)
+            dropped = queue.take_dropped()
+            if dropped:
+                lines.insert(0, f"[... {dropped} lines dropped ...]")
+            await websocket.send_text("\n".join(lines) + "\n")
+
+    async def watch_disconnect():
+        # Returns as soon as the client goes away, even if no logs are flowing
+        while True:
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                return
+
+    tasks = [asyncio.create_task(pump_logs()), asyncio.create_task(watch_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Collect results so send/receive errors on a dead socket aren't reported as unhandled
+        await asyncio.gather(*tasks, return_exceptions=True)
+        server_controller.release_console_queue(name, queue)
 
 @router.get("/{name}/export")
 async def export_server(name: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -137,10 +200,10 @@ async def import_server(
 
 # --- Player Management Endpoints ---
 @router.get("/{name}/players")
-def get_players_data(name: str, current_user: User = Depends(get_current_user)):
+async def get_players_data(name: str, current_user: User = Depends(get_current_user)):
     """Get complete player data: online players, banned users, and banned IPs"""
     try:
-        online_players = server_controller.get_online_players(name)
+        online_players = await server_controller.get_online_players(name)
         print(f"DEBUG: API get_players for {name}: {online_players}")
         bans = server_controller.get_bans(name)
         recent = server_controller.get_recent_activity(name)
@@ -194,7 +257,7 @@ async def ban_player(
             success = await server_controller.ban_user(name, username, reason, expires)
         elif mode == "ip":
             # Get player's IP first
-            players = server_controller.get_online_players(name)
+            players = await server_controller.get_online_players(name)
             player = next((p for p in players if p.get("username") == username), None)
             if player and player.get("ip"):
                 success = await server_controller.ban_ip(name, player["ip"], reason, username=username)
@@ -203,7 +266,7 @@ async def ban_player(
         elif mode == "both":
             # Ban both username and IP
             success1 = await server_controller.ban_user(name, username, reason, expires)
-            players = server_controller.get_online_players(name)
+            players = await server_controller.get_online_players(name)
             player = next((p for p in players if p.get("username") == username), None)
             if player and player.get("ip"):
                 success2 = await server_controller.ban_ip(name, player["ip"], reason, username=username)
@@ -318,64 +381,53 @@ async def send_chat_message(
 
 # --- MasterBridge Data Endpoints ---
 @router.get("/{name}/masterbridge/players")
-def get_mb_players(name: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Get detailed player information from MasterBridge mod and sync to database"""
-    from app.services.masterbridge_sync_service import sync_service
-    
-    # Get server record
+def get_mb_players(name: str, include_offline: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Online players reported by MasterBridge, as of the last background sync.
+    Entries have the mod's name/uuid/health/level/pos plus online, playtime and
+    updated_at; include_offline=true also lists every stored player of the server.
+    """
     server = db.query(Server).filter(Server.name == name).first()
     if not server:
         raise HTTPException(status_code=404, detail="Server not found")
     
-    # Get data from MasterBridge
-    data = server_controller.get_mb_detailed_players(name)
+    data = server_controller.get_mb_detailed_players(db, server, include_offline)
     if data is None:
         raise HTTPException(status_code=503, detail="MasterBridge not available or not enabled")
-    
-    # Sync to database
-    try:
-        sync_service.sync_players(db, server.id, data)
-    except Exception as e:
-        print(f"WARN: Failed to sync players to DB: {e}")
-    
     return data
 
 @router.get("/{name}/masterbridge/chat")
-def get_mb_chat(name: str, current_user: User = Depends(get_current_user)):
+async def get_mb_chat(name: str, current_user: User = Depends(get_current_user)):
     """Get chat log from MasterBridge mod"""
-    data = server_controller.get_mb_chat(name)
+    data = await server_controller.get_mb_chat(name)
     if data is None:
         raise HTTPException(status_code=503, detail="MasterBridge not available or not enabled")
     return data
 
 @router.get("/{name}/masterbridge/achievements")
 def get_mb_achievements(name: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Get player achievements from MasterBridge mod and sync to database"""
-    from app.services.masterbridge_sync_service import sync_service
-    from database.models.server import Server as ServerModel
-    
-    # Get server record
-    server = db.query(ServerModel).filter(ServerModel.name == name).first()
+    """Get recorded player achievements from the database"""
+    server = db.query(Server).filter(Server.name == name).first()
     if not server:
         raise HTTPException(status_code=404, detail="Server not found")
     
-    # Get data from MasterBridge
-    data = server_controller.get_mb_achievements(name)
+    data = server_controller.get_mb_achievements(db, server)
     if data is None:
         raise HTTPException(status_code=503, detail="MasterBridge not available or not enabled")
-    
-    # Sync to database
-    try:
-        sync_service.sync_achievements(db, server.id, data)
-    except Exception as e:
-        print(f"WARN: Failed to sync achievements to DB: {e}")
-    
+    return data
+
+@router.get("/{name}/masterbridge/sync")
+def get_mb_sync_status(name: str, current_user: User = Depends(get_current_user)):
+    """Lag and cost of the background MasterBridge -> database sync"""
+    data = server_controller.get_mb_sync_status(name)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Server has not been synced")
     return data
 
 @router.get("/{name}/masterbridge/state")
-def get_mb_full_state(name: str, current_user: User = Depends(get_current_user)):
+async def get_mb_full_state(name: str, current_user: User = Depends(get_current_user)):
     """Get full server state from MasterBridge mod"""
-    data = server_controller.get_mb_full_state(name)
+    data = await server_controller.get_mb_full_state(name)
     if data is None:
         raise HTTPException(status_code=503, detail="MasterBridge not available or not enabled")
     return data
@@ -452,50 +504,74 @@ async def trigger_mb_special(
 
 # --- Additional MasterBridge Endpoints ---
 @router.get("/{name}/masterbridge/chat-log")
-def get_mb_chat_log(name: str, current_user: User = Depends(get_current_user)):
+async def get_mb_chat_log(name: str, current_user: User = Depends(get_current_user)):
     """Get complete chat history from MasterBridge"""
-    data = server_controller.get_mb_chat_log(name)
+    data = await server_controller.get_mb_chat_log(name)
     if data is None:
         raise HTTPException(status_code=503, detail="MasterBridge not available or not enabled")
     return data
 
 @router.get("/{name}/masterbridge/players-detailed")
-def get_mb_players_detailed(name: str, current_user: User = Depends(get_current_user)):
+async def get_mb_players_detailed(name: str, current_user: User = Depends(get_current_user)):
     """Get detailed player information (health, ping, position, etc)"""
-    data = server_controller.get_mb_online_players_detailed(name)
+    data = await server_controller.get_mb_online_players_detailed(name)
     if data is None:
         raise HTTPException(status_code=503, detail="MasterBridge not available or not enabled")
     return data
 
 @router.get("/{name}/masterbridge/server-status")
-def get_mb_server_status(name: str, current_user: User = Depends(get_current_user)):
+async def get_mb_server_status(name: str, current_user: User = Depends(get_current_user)):
     """Get detailed server status (MSPT, TPS, etc)"""
-    data = server_controller.get_mb_server_status(name)
+    data = await server_controller.get_mb_server_status(name)
     if data is None:
         raise HTTPException(status_code=503, detail="MasterBridge not available or not enabled")
     return data
 
 @router.get("/{name}/masterbridge/active-events")
-def get_mb_active_events(name: str, current_user: User = Depends(get_current_user)):
+async def get_mb_active_events(name: str, current_user: User = Depends(get_current_user)):
     """Get currently active events (wave_events, cinematics, special events)"""
-    data = server_controller.get_mb_active_events(name)
+    data = await server_controller.get_mb_active_events(name)
     if data is None:
         raise HTTPException(status_code=503, detail="MasterBridge not available or not enabled")
     return data
 
 @router.get("/{name}/masterbridge/resource-pack")
-def download_mb_resource_pack(name: str, current_user: User = Depends(get_current_user)):
-    """Download server resource pack"""
-    from fastapi.responses import Response
+async def download_mb_resource_pack(name: str, request: Request, current_user: User = Depends(get_current_user)):
+    """Download server resource pack (streamed from the on-disk cache, supports Range)"""
+    from fastapi.responses import Response, StreamingResponse
+    from app.services.minecraft.resource_pack import parse_range, iter_file
     
-    data = server_controller.get_mb_resource_pack(name)
-    if data is None:
+    pack = await server_controller.get_mb_resource_pack(name)
+    if pack is None:
         raise HTTPException(status_code=503, detail="MasterBridge not available or resource pack not found")
     
-    return Response(
-        content=data,
-        media_type="application/zip",
-        headers={
-            "Content-Disposition": f"attachment; filename={name}_pack.zip"
-        }
-    )
+    headers = {
+        "Content-Disposition": f"attachment; filename={name}_pack.zip",
+        "Accept-Ranges": "bytes",
+        "ETag": pack.etag,
+    }
+    if pack.last_modified:
+        headers["Last-Modified"] = pack.last_modified
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or pack.etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    
+    # A Range only applies if If-Range (when sent) still matches this version
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range not in (pack.etag, pack.last_modified):
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, pack.size)
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{pack.size}"})
+    
+    start, end = byte_range or (0, pack.size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    status_code = 200
+    if byte_range:
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{pack.size}"
+    return StreamingResponse(iter_file(pack.path, start, end), status_code=status_code,
+                             media_type="application/zip", headers=headers)
@@ -0,0 +1,59 @@
+import sys
+import os
+import datetime
+
+# Setup path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, Server, PlayerDetail
+from app.services.minecraft.player_manager import PlayerManager, log_datetime
+from app.services.player_event_writer import PlayerEventWriter
+
+JOIN = "[12:00:00] [Server thread/INFO]: Alice[/10.0.0.1:51234] logged in with entity id 42 at (0.5, 64.0, 0.5)"
+LEAVE = [
+    "[12:30:00] [Server thread/INFO]: Alice lost connection: Disconnected",
+    "[12:30:00] [Server thread/INFO]: Alice left the game",
+]
+
+
+def verify_playtime():
+    print("Verifying join -> leave playtime...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    server = Server(name="verify_playtime", port=25565)
+    db.add(server)
+    db.commit()
+    server_id = server.id
+    db.close()
+
+    manager = PlayerManager()
+    writer = PlayerEventWriter(session_factory=Session)
+
+    join = manager.parse_log_line(JOIN)
+    joined_at = manager.get_player("Alice")["joined_at"]
+    datetime.datetime.fromisoformat(joined_at)  # Must be a full ISO datetime
+    print(f"joined_at = {joined_at}")
+
+    # Stamped as the live pipeline would: when each line is read
+    batch = [(server_id, join, "10.0.0.1", datetime.datetime.fromisoformat(log_datetime("12:00:00")))]
+    for line in LEAVE:
+        event = manager.parse_log_line(line)
+        batch.append((server_id, event, None, datetime.datetime.fromisoformat(log_datetime("12:30:00"))))
+    writer.apply(batch)
+
+    db = Session()
+    detail = db.query(PlayerDetail).filter_by(server_id=server_id).one()
+    db.close()
+    print(f"total_playtime_seconds = {detail.total_playtime_seconds}, last_ip = {detail.last_ip}")
+    assert writer.errors == 0, "writer failed"
+    assert detail.total_playtime_seconds == 30 * 60, "playtime not counted (or counted twice)"
+    print("SUCCESS: playtime counted once")
+
+
+if __name__ == "__main__":
+    verify_playtime()